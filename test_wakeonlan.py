@@ -3,12 +3,89 @@ Tests for wakeonlan.
 
 """
 
+import array
+import asyncio
+import contextlib
+import datetime
+import functools
+import io
+import json
+import os
 import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
 import warnings
+from collections.abc import Iterable, Iterator
 from unittest import mock
 
-from wakeonlan import create_magic_packet, create_socket, main, send_magic_packet, wake
+from wakeonlan import (
+    IPV6_ALL_NODES,
+    Destination,
+    Histogram,
+    MacResult,
+    Metrics,
+    Pacer,
+    PacketCache,
+    PacketTemplate,
+    RecentWakes,
+    ResolveCache,
+    WakeError,
+    WakeEvent,
+    WakeResult,
+    WakeSender,
+    bench,
+    create_magic_packet,
+    create_magic_packets,
+    create_socket,
+    hooks,
+    main,
+    parse_mac,
+    read_macs,
+    read_targets,
+    send_magic_packet,
+    send_packets,
+    wake,
+    wake_many,
+    wake_stream,
+)
+from wakeonlan.aio import (
+    AsyncWakeSender,
+    VerifyResult,
+    async_wake,
+    probe_tcp,
+    probe_udp,
+    wake_and_verify,
+)
+from wakeonlan.ethernet import (
+    ETH_P_WOL,
+    EthernetTransport,
+    build_frames,
+    create_ethernet_socket,
+)
+from wakeonlan.interfaces import (
+    InterfaceAddress,
+    InterfaceCache,
+    broadcast_destinations,
+    read_interfaces,
+    wake_all_interfaces,
+)
+from wakeonlan.inventory import (
+    Inventory,
+    InventoryEntry,
+    build_index,
+    load_inventory,
+    read_csv,
+    read_ethers,
+)
+from wakeonlan.neighbors import NeighborCache, read_arp_table
+from wakeonlan.schedule import CronSchedule, Scheduler, read_jobs
+from wakeonlan.server import Coalescer, WakeClient, WakeServer
 
 
 class TestCreateMagicPacket(unittest.TestCase):
@@ -254,6 +331,146 @@ class TestCreateMagicPacket(unittest.TestCase):
             create_magic_packet('01:23:45:67:89:ab/invalid')
 
 
+class TestParseMac(unittest.TestCase):
+    """
+    Test :func:`parse_mac`.
+
+    """
+
+    def test_formats(self) -> None:
+        """
+        Test whether all supported formats are parsed.
+
+        """
+        for mac in [
+            '0123456789ab',
+            '01:23:45:67:89:AB',
+            '01-23-45-67-89-ab',
+            '0123.4567.89ab',
+        ]:
+            self.assertEqual(parse_mac(mac), b'\x01\x23\x45\x67\x89\xab')
+
+    def test_invalid(self) -> None:
+        """
+        Test whether invalid mac addresses are rejected.
+
+        """
+        for mac in [
+            '',
+            '0123456789',
+            '0123456789gg',
+            '01:23:45:67:89-ab',
+            '0123.4567:89ab',
+            '01 23 45 67 89',
+            '0123 4567 89',
+        ]:
+            with self.assertRaisesRegex(ValueError, 'Incorrect MAC address format'):
+                parse_mac(mac)
+
+
+class TestPacketCache(unittest.TestCase):
+    """
+    Test :class:`PacketCache`.
+
+    """
+
+    def test_cache(self) -> None:
+        """
+        Test whether packets are cached up to maxsize.
+
+        """
+        cache = PacketCache(maxsize=2)
+        packet = cache.get('01:23:45:67:89:ab')
+        self.assertIs(cache.get('01:23:45:67:89:ab'), packet)
+        self.assertEqual(packet, create_magic_packet('0123456789ab'))
+        cache.get('000000000000')
+        cache.get('111111111111')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self) -> None:
+        """
+        Test whether nothing is cached by default.
+
+        """
+        cache = PacketCache()
+        cache.get('01:23:45:67:89:ab')
+        self.assertEqual(len(cache), 0)
+
+    def test_create_magic_packet(self) -> None:
+        """
+        Test whether create_magic_packet uses the shared cache.
+
+        """
+        with mock.patch('wakeonlan.packet_cache', PacketCache(maxsize=8)) as cache:
+            create_magic_packet('01:23:45:67:89:ab')
+            create_magic_packet('01:23:45:67:89:ab')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+class TestCreateMagicPackets(unittest.TestCase):
+    """
+    Test :func:`create_magic_packets`.
+
+    """
+
+    def test_strings(self) -> None:
+        """
+        Test whether packets are created from mac address strings.
+
+        """
+        macs = ['01:23:45:67:89:ab', '000000000000', 'ffff.ffff.ffff']
+        packets = create_magic_packets(iter(macs))
+        self.assertEqual(len(packets), 3)
+        self.assertEqual(len(packets.buffer), 306)
+        self.assertEqual(
+            [bytes(packet) for packet in packets],
+            [create_magic_packet(mac) for mac in macs],
+        )
+        self.assertEqual(bytes(packets[-1]), create_magic_packet(macs[-1]))
+        self.assertEqual(
+            [bytes(packet) for packet in packets[1:]],
+            [create_magic_packet(mac) for mac in macs[1:]],
+        )
+
+    def test_integers(self) -> None:
+        """
+        Test whether packets are created from 48-bit integers.
+
+        """
+        packets = create_magic_packets(array.array('Q', [0x0123456789AB, 1]))
+        self.assertEqual(bytes(packets[0]), create_magic_packet('0123456789ab'))
+        self.assertEqual(bytes(packets[1]), create_magic_packet('000000000001'))
+        for value in [-1, 1 << 48]:
+            with self.assertRaisesRegex(ValueError, 'Incorrect MAC address format'):
+                create_magic_packets([value])
+
+    def test_secureon(self) -> None:
+        """
+        Test whether packets with and without SecureOn passwords may be mixed.
+
+        """
+        for macs in [
+            ['01:23:45:67:89:ab/ff:ff:ff:ff:ff:ff', '000000000000/010203040506'],
+            ['01:23:45:67:89:ab/ff:ff:ff:ff:ff:ff', '000000000000'],
+        ]:
+            packets = create_magic_packets(macs)
+            self.assertEqual(
+                [bytes(packet) for packet in packets],
+                [create_magic_packet(mac) for mac in macs],
+            )
+
+    def test_invalid(self) -> None:
+        """
+        Test whether invalid mac addresses are rejected.
+
+        """
+        with self.assertRaisesRegex(ValueError, 'Incorrect MAC address format'):
+            create_magic_packets(['000000000000', 'invalid'])
+
+
 class TestCreateSocket(unittest.TestCase):
     """
     Test :func:`create_socket`.
@@ -331,6 +548,113 @@ class TestCreateSocket(unittest.TestCase):
             self.assertEqual(data, b'Hello server!')
             self.assertEqual(addr[0], '::1')
 
+    def test_ipv6_no_broadcast(self) -> None:
+        """
+        Test if SO_BROADCAST is only set for IPv4.
+
+        """
+        with create_socket(host='::1', port=1234) as sock:
+            self.assertEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST), 0)
+        with create_socket(host='127.0.0.1', port=1234) as sock:
+            self.assertNotEqual(
+                sock.getsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST), 0
+            )
+
+    def test_ipv6_multicast(self) -> None:
+        """
+        Test if the interface and hop limit of IPv6 multicast are set.
+
+        """
+        name = socket.if_indextoname(1)
+        for host, interface, hops in [
+            (IPV6_ALL_NODES, name, 3),
+            (IPV6_ALL_NODES, '1', None),
+            (f'{IPV6_ALL_NODES}%{name}', None, None),
+        ]:
+            with mock.patch('socket.socket') as socket_type:
+                create_socket(host=host, interface=interface, hops=hops)
+            sock = socket_type.return_value
+            socket_type.assert_called_once_with(
+                socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_UDP
+            )
+            calls = [mock.call(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, 1)]
+            if hops is not None:
+                calls.append(
+                    mock.call(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, hops)
+                )
+            self.assertEqual(sock.setsockopt.mock_calls, calls)
+            sock.bind.assert_not_called()
+            sock.connect.assert_called_once_with((IPV6_ALL_NODES, 9, 0, 1))
+
+        with mock.patch('socket.socket') as socket_type:
+            create_socket(host=IPV6_ALL_NODES, interface='fd00::2')
+        socket_type.return_value.bind.assert_called_once_with(('fd00::2', 0))
+        with self.assertRaises(ValueError):
+            create_socket(host=IPV6_ALL_NODES, hops=256)
+
+
+class TestResolveCache(unittest.TestCase):
+    """
+    Test :class:`ResolveCache`.
+
+    """
+
+    @mock.patch('socket.getaddrinfo', wraps=socket.getaddrinfo)
+    def test_disabled(self, getaddrinfo: mock.Mock) -> None:
+        """
+        Test whether nothing is cached by default.
+
+        """
+        cache = ResolveCache()
+        cache.getaddrinfo('127.0.0.1', 1234)
+        cache.getaddrinfo('127.0.0.1', 1234)
+        self.assertEqual(getaddrinfo.call_count, 2)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    @mock.patch('socket.getaddrinfo', wraps=socket.getaddrinfo)
+    def test_ttl(self, getaddrinfo: mock.Mock) -> None:
+        """
+        Test whether results are cached until the ttl expires.
+
+        """
+        cache = ResolveCache(ttl=10)
+        with mock.patch('time.monotonic', return_value=0) as monotonic:
+            first = cache.getaddrinfo('127.0.0.1', 1234)
+            # Cached results are shared, so they must be immutable.
+            self.assertIsInstance(first, tuple)
+            self.assertEqual(cache.getaddrinfo('127.0.0.1', 1234), first)
+            self.assertEqual(getaddrinfo.call_count, 1)
+            monotonic.return_value = 11
+            cache.getaddrinfo('127.0.0.1', 1234)
+            self.assertEqual(getaddrinfo.call_count, 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    @mock.patch('socket.getaddrinfo', wraps=socket.getaddrinfo)
+    def test_maxsize_and_invalidate(self, getaddrinfo: mock.Mock) -> None:
+        """
+        Test whether the cache size is limited and results can be removed.
+
+        """
+        cache = ResolveCache(ttl=10, maxsize=2)
+        cache.getaddrinfo('127.0.0.1', 1)
+        cache.getaddrinfo('127.0.0.1', 2)
+        cache.getaddrinfo('::1', 3)
+        self.assertEqual(len(cache), 2)
+        cache.invalidate('127.0.0.1')
+        self.assertEqual(len(cache), 1)
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_create_socket(self) -> None:
+        """
+        Test whether create_socket uses the shared cache.
+
+        """
+        with mock.patch('wakeonlan.resolve_cache', ResolveCache(ttl=10)) as cache:
+            create_socket(host='127.0.0.1', port=1234).close()
+            create_socket(host='127.0.0.1', port=1234).close()
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
 
 class TestWake(unittest.TestCase):
     """
@@ -451,6 +775,34 @@ class TestWake(unittest.TestCase):
                 b'\x00\x00\x00\x00\x00\x00',
             )
 
+    def test_repeat(self) -> None:
+        """
+        Test whether repetitions are interleaved across hosts.
+
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            with (
+                mock.patch('time.sleep') as sleep,
+                mock.patch('random.uniform', return_value=0.25) as uniform,
+            ):
+                wake(
+                    '133713371337',
+                    '000000000000',
+                    host='127.0.0.1',
+                    port=1234,
+                    repeat=3,
+                    interval=0.5,
+                    jitter=0.5,
+                )
+            self.assertEqual(sleep.mock_calls, [mock.call(0.75), mock.call(0.75)])
+            self.assertEqual(uniform.mock_calls, [mock.call(0, 0.5)] * 2)
+            for index in range(3):
+                self.assertEqual(sock.recv(1024), create_magic_packet('133713371337'))
+                self.assertEqual(sock.recv(1024), create_magic_packet('000000000000'))
+        with self.assertRaises(ValueError):
+            wake('133713371337', repeat=0)
+
     def test_wake_interface(self) -> None:
         """
         Test whether the magic packets are broadcasted to the specified network via specified interface.
@@ -594,93 +946,2230 @@ class TestWake(unittest.TestCase):
             )
 
 
-class TestSendMagicPacket(unittest.TestCase):
+class TestSendPackets(unittest.TestCase):
     """
-    Test :func:`send_magic_packet`.
+    Test :func:`send_packets`.
 
     """
 
-    @mock.patch('wakeonlan.wake')
-    def test_main(self, wake: mock.Mock) -> None:
+    def test_send_packets(self) -> None:
         """
-        Test if processed arguments are passed to wake.
+        Test whether all packets are sent in order.
 
         """
-        warnings.filterwarnings('ignore')
-        send_magic_packet('00:11:22:33:44:55')
-        send_magic_packet(
-            '00:11:22:33:44:55',
-            ip_address='example.com',
-            port=1234,
-            interface='192.168.1.1',
-            address_family=socket.AF_INET,
+        packets = [create_magic_packet(f'{index:012x}') for index in range(3000)]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+            sock.bind(('127.0.0.1', 1234))
+            with create_socket(host='127.0.0.1', port=1234) as client:
+                counts = send_packets(client, packets)
+            self.assertEqual(sum(counts), len(packets))
+            self.assertLess(len(counts), len(packets))
+            for packet in packets:
+                self.assertEqual(sock.recv(1024), packet)
+
+    def test_send_buffer(self) -> None:
+        """
+        Test whether packets from a single buffer are sent.
+
+        """
+        packets = create_magic_packets(range(2000))
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+            sock.bind(('127.0.0.1', 1234))
+            with create_socket(host='127.0.0.1', port=1234) as client:
+                counts = send_packets(client, packets)
+            self.assertEqual(sum(counts), len(packets))
+            for packet in packets:
+                self.assertEqual(sock.recv(1024), packet)
+
+    def test_wake_batch(self) -> None:
+        """
+        Test whether wake can send packets in batches.
+
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            wake(
+                '133713371337', '000000000000', host='127.0.0.1', port=1234, batch=True
+            )
+            self.assertEqual(sock.recv(1024), create_magic_packet('133713371337'))
+            self.assertEqual(sock.recv(1024), create_magic_packet('000000000000'))
+
+    def test_template(self) -> None:
+        """
+        Test whether a packet template is patched for each mac address.
+
+        """
+        template = PacketTemplate()
+        self.assertEqual(
+            bytes(template.fill(parse_mac('133713371337'))),
+            create_magic_packet('133713371337'),
         )
         self.assertEqual(
-            wake.mock_calls,
+            bytes(template.fill(b'\x00' * 6)), create_magic_packet('000000000000')
+        )
+        template = PacketTemplate('01-02-03-04-05-06')
+        self.assertEqual(
+            bytes(template.fill(parse_mac('133713371337'))),
+            create_magic_packet('133713371337/01-02-03-04-05-06'),
+        )
+        with self.assertRaises(ValueError):
+            template.fill(b'\x00' * 5)
+        with self.assertRaises(ValueError):
+            PacketTemplate('invalid')
+
+    def test_template_send(self) -> None:
+        """
+        Test whether a packet template sends a packet per mac address.
+
+        """
+        macs = ['133713371337', '000000000000', 'ffffffffffff']
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            with create_socket(host='127.0.0.1', port=1234) as client:
+                PacketTemplate().send(client, map(parse_mac, macs))
+            for mac in macs:
+                self.assertEqual(sock.recv(1024), create_magic_packet(mac))
+
+    def test_template_allocations(self) -> None:
+        """
+        Test whether sending from a packet template doesn’t allocate memory per packet.
+
+        """
+        macs = [index.to_bytes(6, 'big') for index in range(10000)]
+        template = PacketTemplate()
+        with (
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock,
+            create_socket(host='127.0.0.1', port=1234) as client,
+        ):
+            sock.bind(('127.0.0.1', 1234))
+            template.send(client, macs[:10])
+            tracemalloc.start()
+            try:
+                before = tracemalloc.get_traced_memory()[0]
+                template.send(client, macs)
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        self.assertEqual(current, before)
+        # Only the iterator over the mac addresses is allocated.
+        self.assertLess(peak - before, 512)
+
+
+class TestPacer(unittest.TestCase):
+    """
+    Test :class:`Pacer`.
+
+    """
+
+    def test_rate(self) -> None:
+        """
+        Test whether the rate is limited after the initial burst.
+
+        """
+        pacer = Pacer(rate=2000, burst=10)
+        start = time.perf_counter()
+        for index in range(110):
+            pacer.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_waves(self) -> None:
+        """
+        Test whether waves are spaced by the wave interval.
+
+        """
+        pacer = Pacer(wave_size=3, wave_interval=0.02)
+        start = time.perf_counter()
+        pacer.acquire(3)
+        self.assertLess(time.perf_counter() - start, 0.02)
+        pacer.acquire(2)
+        pacer.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.02)
+        pacer.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
+
+    def test_chunk_size(self) -> None:
+        """
+        Test whether no more packets than the chunk size may be acquired.
+
+        """
+        self.assertEqual(Pacer(rate=10, burst=5, wave_size=3).chunk_size, 3)
+        self.assertEqual(Pacer(rate=10, burst=5, wave_size=8).chunk_size, 5)
+        with self.assertRaises(ValueError):
+            Pacer(rate=10, burst=5).acquire(6)
+        with self.assertRaises(ValueError):
+            Pacer(rate=0)
+
+    def test_wake(self) -> None:
+        """
+        Test whether wake sends all packets through the pacer.
+
+        """
+        macs = [f'{index:012x}' for index in range(5)]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            for batch in [False, True]:
+                pacer = Pacer(rate=1000, burst=2)
+                with mock.patch.object(pacer, 'acquire', wraps=pacer.acquire):
+                    wake(*macs, host='127.0.0.1', port=1234, batch=batch, pacer=pacer)
+                    self.assertEqual(
+                        pacer.acquire.mock_calls,  # type: ignore[attr-defined]
+                        [mock.call(2), mock.call(2), mock.call(1)]
+                        if batch
+                        else [mock.call()] * 5,
+                    )
+                for mac in macs:
+                    self.assertEqual(sock.recv(1024), create_magic_packet(mac))
+
+
+class TestReadMacs(unittest.TestCase):
+    """
+    Test :func:`read_macs`.
+
+    """
+
+    def test_read_macs(self) -> None:
+        """
+        Test whether separators and comments are handled.
+
+        """
+        lines = [
+            '# inventory\n',
+            '01:23:45:67:89:ab, 000000000000  # rack 1\n',
+            '\n',
+            'ffff.ffff.ffff 111111111111/222222222222\n',
+        ]
+        self.assertEqual(
+            list(read_macs(lines)),
             [
-                mock.call(
-                    '00:11:22:33:44:55',
-                    host='255.255.255.255',
-                    port=9,
-                    interface=None,
-                    family=socket.AF_UNSPEC,
-                ),
-                mock.call(
-                    '00:11:22:33:44:55',
-                    host='example.com',
+                '01:23:45:67:89:ab',
+                '000000000000',
+                'ffff.ffff.ffff',
+                '111111111111/222222222222',
+            ],
+        )
+
+
+class TestWakeStream(unittest.TestCase):
+    """
+    Test :func:`wake_stream`.
+
+    """
+
+    def test_chunks(self) -> None:
+        """
+        Test whether mac addresses are consumed in chunks.
+
+        """
+        macs = [f'{index:012x}' for index in range(10)]
+        consumed = []
+
+        def generate() -> Iterator[str]:
+            for mac in macs:
+                consumed.append(mac)
+                yield mac
+
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            with mock.patch(
+                'wakeonlan.create_magic_packets', wraps=create_magic_packets
+            ) as create:
+                sent = wake_stream(
+                    generate(), host='127.0.0.1', port=1234, chunk_size=4
+                )
+            self.assertEqual(sent, 10)
+            self.assertEqual(create.call_count, 4)
+            for mac in macs:
+                self.assertEqual(sock.recv(1024), create_magic_packet(mac))
+
+    def test_error(self) -> None:
+        """
+        Test whether a failed chunk is reported in a :class:`WakeError`.
+
+        """
+        macs = [f'{index:012x}' for index in range(10)]
+        sock = mock.MagicMock()
+        sock.__enter__.return_value = sock
+        error = OSError(101, 'Network is unreachable')
+        sock.send.side_effect = [None] * 5 + [error]
+        with mock.patch('wakeonlan.create_socket', return_value=sock):
+            with self.assertRaises(WakeError) as context:
+                wake_stream(macs, chunk_size=4)
+        self.assertIs(context.exception.__cause__, error)
+        self.assertEqual(context.exception.errno, 101)
+        result = context.exception.result
+        self.assertEqual(result.macs, macs[4:8])
+        self.assertEqual(result.failed, macs[5:8])
+
+
+class TestWakeResult(unittest.TestCase):
+    """
+    Test :class:`WakeResult`.
+
+    """
+
+    def test_result(self) -> None:
+        """
+        Test whether wake reports what was sent.
+
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            with mock.patch('time.sleep'):
+                result = wake(
+                    '133713371337',
+                    '000000000000/ffffffffffff',
+                    host='127.0.0.1',
                     port=1234,
-                    interface='192.168.1.1',
-                    family=socket.AF_INET,
+                    repeat=2,
+                )
+        self.assertTrue(result.ok)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(
+            list(result),
+            [
+                MacResult('133713371337', Destination('127.0.0.1', 1234), 204, None),
+                MacResult(
+                    '000000000000/ffffffffffff',
+                    Destination('127.0.0.1', 1234),
+                    216,
+                    None,
                 ),
             ],
         )
+        summary = result.summary()
+        self.assertEqual(
+            (summary['sent'], summary['failed'], summary['bytes_sent']), (2, 0, 420)
+        )
+        self.assertEqual(summary['failures'], [])
 
+    def test_partial(self) -> None:
+        """
+        Test whether a send error is reported along with what was sent.
 
-class TestMain(unittest.TestCase):
+        """
+        sock = mock.MagicMock()
+        sock.__enter__.return_value = sock
+        sock.send.side_effect = [102, OSError(55, 'No buffer space available')]
+        with mock.patch('wakeonlan.create_socket', return_value=sock):
+            with self.assertRaises(WakeError) as context:
+                wake('133713371337', '000000000000', '111111111111')
+        result = context.exception.result
+        self.assertIsInstance(result, WakeResult)
+        self.assertEqual(context.exception.errno, 55)
+        self.assertEqual(list(result.bytes_sent), [102, 0, 0])
+        self.assertEqual(result.failed, ['000000000000', '111111111111'])
+        self.assertEqual(
+            result.summary()['failures'][0],
+            {
+                'mac': '000000000000',
+                'host': '255.255.255.255',
+                'port': 9,
+                'interface': None,
+                'error': '[Errno 55] No buffer space available',
+            },
+        )
+
+    def test_partial_batch(self) -> None:
+        """
+        Test whether packets sent by earlier system calls of a batch are reported.
+
+        """
+        sock = mock.MagicMock()
+        sock.__enter__.return_value = sock
+        error = OSError(55, 'No buffer space available')
+        sendmmsg = mock.Mock(side_effect=[1024, error, 1024, error])
+        macs = [f'{index:012x}' for index in range(2000)]
+        with (
+            mock.patch('wakeonlan.create_socket', return_value=sock),
+            mock.patch('wakeonlan._load_sendmmsg', return_value=sendmmsg),
+        ):
+            with self.assertRaises(WakeError) as context:
+                wake(*macs, batch=True)
+            # send_packets() raises the error itself.
+            with self.assertRaises(OSError) as raised:
+                send_packets(sock, create_magic_packets(macs))
+        result = context.exception.result
+        self.assertEqual(sendmmsg.call_count, 4)
+        self.assertEqual(result.failed, macs[1024:])
+        self.assertEqual(result.summary()['sent'], 1024)
+        self.assertIs(raised.exception, error)
+
+    def test_failed_repetition(self) -> None:
+        """
+        Test whether a mac address missing a repetition counts as failed.
+
+        """
+        macs = ['133713371337', '000000000000']
+        error = OSError(101, 'Network is unreachable')
+        for sends, failed in [(2, macs), (4, macs), (5, macs[1:])]:
+            with self.subTest(sends=sends):
+                sock = mock.MagicMock()
+                sock.__enter__.return_value = sock
+                sock.send.side_effect = [None] * sends + [error]
+                with mock.patch('wakeonlan.create_socket', return_value=sock):
+                    with self.assertRaises(WakeError) as context:
+                        wake(*macs, repeat=3, interval=0)
+                result = context.exception.result
+                self.assertFalse(result.ok)
+                self.assertEqual(result.failed, failed)
+                self.assertEqual(sum(result.bytes_sent), sends * 102)
+
+
+class TestHooks(unittest.TestCase):
     """
-    Test :func:`main`.
+    Test :data:`hooks` and :class:`Metrics`.
 
     """
 
-    @mock.patch('wakeonlan.wake')
-    def test_main(self, wake: mock.Mock) -> None:
+    def register(self, callback: mock.Mock | Metrics, *events: str) -> None:
         """
-        Test if processed arguments are passed to wake.
+        Register a callback for the duration of the test.
 
         """
-        main(['00:11:22:33:44:55'])
-        main(['00:11:22:33:44:55', '-o', 'host.example', '-p', '1337'])
-        main(
+        if events:
+            hooks.register(callback, events)
+        else:
+            hooks.register(callback)
+        self.addCleanup(hooks.unregister, callback)
+
+    def test_register(self) -> None:
+        """
+        Test whether hooks are only active while callbacks are registered.
+
+        """
+        self.assertFalse(hooks.active)
+        callback = mock.Mock()
+        self.register(callback, 'error')
+        self.assertTrue(hooks.active)
+        with self.assertRaises(ValueError):
+            hooks.register(callback, ['parse', 'unknown'])
+        hooks.emit(WakeEvent('send', None, 0.0))
+        callback.assert_not_called()
+        hooks.unregister(callback)
+        self.assertFalse(hooks.active)
+
+    def test_events(self) -> None:
+        """
+        Test which events are emitted by wake.
+
+        """
+        callback = mock.Mock()
+        self.register(callback)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            wake('133713371337', '000000000000', host='127.0.0.1', port=1234)
+        events = [call.args[0] for call in callback.call_args_list]
+        destination = Destination('127.0.0.1', 1234)
+        self.assertEqual(
+            [(event.name, event.destination, event.packets) for event in events],
             [
-                '00:11:22:33:44:55',
-                '-o',
-                'host.example',
-                '-p',
-                '1337',
-                '-n',
-                '192.168.0.2',
-            ]
+                ('parse', None, 2),
+                ('resolve', destination, 0),
+                ('socket_open', destination, 0),
+                ('send', destination, 2),
+            ],
         )
-        main(['00:11:22:33:44:55', '-o', 'host.example', '-p', '1337', '-4'])
-        main(['00:11:22:33:44:55', '-o', 'host.example', '-p', '1337', '-6'])
-        main(['00:11:22:33:44:55', '-o', 'host.example', '-p', '1337', '-6', '-4'])
+
+    def test_error(self) -> None:
+        """
+        Test whether errors are emitted.
+
+        """
+        callback = mock.Mock()
+        self.register(callback, 'error')
+        error = socket.gaierror(-2, 'Name or service not known')
+        with mock.patch('socket.getaddrinfo', side_effect=error):
+            with self.assertRaises(WakeError):
+                wake('133713371337', host='example.invalid')
+        event = callback.call_args.args[0]
+        self.assertEqual(event.name, 'error')
+        self.assertEqual(event.destination, Destination('example.invalid'))
+        self.assertIs(event.error, error)
+
+    def test_metrics(self) -> None:
+        """
+        Test whether metrics are collected from events.
+
+        """
+        metrics = Metrics()
+        self.register(metrics)
+        sock = mock.MagicMock()
+        sock.__enter__.return_value = sock
+        sock.send.side_effect = [102, 102, OSError('Failed')]
+        with mock.patch('socket.socket', return_value=sock):
+            wake('133713371337', host='127.0.0.1', repeat=2, interval=0)
+            with self.assertRaises(WakeError):
+                wake('000000000000', host='127.0.0.1')
+        snapshot = metrics.snapshot()
         self.assertEqual(
-            wake.mock_calls,
-            [
-                mock.call(
-                    '00:11:22:33:44:55',
-                    host='255.255.255.255',
-                    port=9,
-                    interface=None,
-                    family=socket.AF_UNSPEC,
-                ),
-                mock.call(
-                    '00:11:22:33:44:55',
-                    host='host.example',
-                    port=1337,
-                    interface=None,
-                    family=socket.AF_UNSPEC,
-                ),
+            snapshot['events'],
+            {'parse': 2, 'resolve': 2, 'socket_open': 2, 'send': 3, 'error': 1},
+        )
+        self.assertEqual(snapshot['packets_parsed'], 2)
+        self.assertEqual(snapshot['packets_sent'], 2)
+        self.assertEqual(snapshot['latency']['send']['count'], 3)
+        self.assertEqual(json.loads(json.dumps(snapshot)), snapshot)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()['packets_sent'], 0)
+
+    def test_histogram(self) -> None:
+        """
+        Test the quantile estimates of a histogram.
+
+        """
+        histogram = Histogram()
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        for duration in [0.00001] * 98 + [0.05, 20]:
+            histogram.observe(duration)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.00001)
+        self.assertAlmostEqual(histogram.quantile(0.99), 10**-1.25)
+        self.assertEqual(histogram.quantile(1), float('inf'))
+
+
+class TestEthernet(unittest.TestCase):
+    """
+    Test :mod:`wakeonlan.ethernet`.
+
+    """
+
+    def test_build_frames(self) -> None:
+        """
+        Test whether magic packets are wrapped in Ethernet frames.
+
+        """
+        packets = create_magic_packets(['133713371337', '000000000000/ffffffffffff'])
+        source = bytes.fromhex('020000000001')
+        frames = build_frames(packets, source)
+        self.assertEqual([len(frame) for frame in frames], [116, 122])
+        self.assertEqual(bytes(frames[0][:14]), b'\xff' * 6 + source + b'\x08\x42')
+        self.assertEqual(bytes(frames[1][14:]), packets[1])
+        frames = build_frames(packets, source, broadcast=False)
+        self.assertEqual(bytes(frames[0][:6]), bytes.fromhex('133713371337'))
+        self.assertEqual(bytes(frames[1][:6]), bytes(6))
+        with self.assertRaises(ValueError):
+            build_frames(packets, b'')
+
+    def test_create_ethernet_socket(self) -> None:
+        """
+        Test whether a raw socket is bound to the network interface.
+
+        """
+        with mock.patch('socket.socket') as socket_type:
+            sock = create_ethernet_socket('veth0')
+        socket_type.assert_called_once_with(
+            socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_WOL)
+        )
+        self.assertIs(sock, socket_type.return_value)
+        socket_type.return_value.bind.assert_called_once_with(('veth0', ETH_P_WOL))
+        with mock.patch('socket.socket') as socket_type:
+            socket_type.return_value.bind.side_effect = OSError
+            with self.assertRaises(OSError):
+                create_ethernet_socket('missing')
+        socket_type.return_value.close.assert_called_once_with()
+
+    def test_frame(self) -> None:
+        """
+        Test whether frames are sent from the address of the interface.
+
+        """
+        sock = mock.Mock()
+        sock.getsockname.return_value = ('veth0', ETH_P_WOL, 0, 1, b'\x02' * 6)
+        frames = EthernetTransport('veth0').frame(
+            sock, create_magic_packets(['133713371337'])
+        )
+        self.assertEqual(bytes(frames[0][6:12]), b'\x02' * 6)
+
+    def test_wake(self) -> None:
+        """
+        Test whether prebuilt frames are sent in batches.
+
+        """
+        sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        source = bytes.fromhex('020000000001')
+        with (
+            receiver,
+            mock.patch(
+                'wakeonlan.ethernet.create_ethernet_socket', return_value=sender
+            ) as create,
+        ):
+            result = wake(
+                '133713371337',
+                '000000000000',
+                batch=True,
+                repeat=2,
+                interval=0,
+                transport=EthernetTransport('veth0', source=source),
+            )
+            frames = [receiver.recv(200) for _ in range(4)]
+        create.assert_called_once_with('veth0')
+        self.assertEqual(sender.fileno(), -1)
+        self.assertEqual(result.summary()['bytes_sent'], 4 * 116)
+        self.assertEqual(
+            [frame[14:] for frame in frames],
+            [
+                create_magic_packet('133713371337'),
+                create_magic_packet('000000000000'),
+            ]
+            * 2,
+        )
+
+    def test_error(self) -> None:
+        """
+        Test whether failing to open the raw socket is reported.
+
+        """
+        with mock.patch(
+            'wakeonlan.ethernet.create_ethernet_socket',
+            side_effect=PermissionError(1, 'Operation not permitted'),
+        ):
+            with self.assertRaises(WakeError) as context:
+                wake('133713371337', transport=EthernetTransport('veth0'))
+        self.assertEqual(context.exception.result.failed, ['133713371337'])
+
+
+def _netlink_message(kind: int, payload: bytes) -> bytes:
+    message = struct.pack('=IHHII', 16 + len(payload), kind, 0, 1, 0) + payload
+    return message + bytes(-len(message) % 4)
+
+
+def _netlink_address(
+    index: int, scope: int, family: int = socket.AF_INET, **attributes: bytes
+) -> bytes:
+    kinds = {'address': 1, 'local': 2, 'label': 3, 'broadcast': 4}
+    payload = struct.pack('=BBBBI', family, 24, 0, scope, index)
+    for name, value in attributes.items():
+        attribute = struct.pack('=HH', 4 + len(value), kinds[name]) + value
+        payload += attribute + bytes(-len(attribute) % 4)
+    return _netlink_message(20, payload)
+
+
+class TestInterfaces(unittest.TestCase):
+    """
+    Test :mod:`wakeonlan.interfaces`.
+
+    """
+
+    def setUp(self) -> None:
+        """
+        Disable caching of the interfaces.
+
+        """
+        patcher = mock.patch(
+            'wakeonlan.interfaces.interface_cache', InterfaceCache(ttl=0)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read(self, *responses: bytes) -> list[InterfaceAddress]:
+        """
+        Read the interfaces from mocked rtnetlink responses.
+
+        """
+        with mock.patch('socket.socket') as socket_type:
+            sock = socket_type.return_value.__enter__.return_value
+            sock.recv.side_effect = responses
+            interfaces = read_interfaces()
+        socket_type.assert_called_once_with(
+            socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE
+        )
+        request = sock.send.call_args.args[0]
+        self.assertEqual(struct.unpack_from('=IH', request), (24, 22))
+        return interfaces
+
+    def test_read_interfaces(self) -> None:
+        """
+        Test whether the broadcast addresses are read from rtnetlink.
+
+        """
+        interfaces = self.read(
+            _netlink_address(
+                1,
+                254,
+                local=socket.inet_aton('127.0.0.1'),
+                label=b'lo\0',
+            )
+            + _netlink_address(
+                2,
+                0,
+                address=socket.inet_aton('192.168.1.2'),
+                local=socket.inet_aton('192.168.1.2'),
+                broadcast=socket.inet_aton('192.168.1.255'),
+                label=b'eth0\0',
+            ),
+            _netlink_address(
+                3,
+                0,
+                address=socket.inet_aton('10.0.0.1'),
+                local=socket.inet_aton('10.0.0.2'),
+                label=b'ppp0\0',
+            )
+            + _netlink_address(4, 0, family=socket.AF_INET6)
+            + _netlink_address(
+                1,
+                0,
+                address=socket.inet_aton('10.1.0.2'),
+                broadcast=socket.inet_aton('10.1.255.255'),
+            )
+            + _netlink_message(3, bytes(4)),
+        )
+        self.assertEqual(
+            interfaces,
+            [
+                InterfaceAddress('eth0', '192.168.1.2', '192.168.1.255'),
+                InterfaceAddress(socket.if_indextoname(1), '10.1.0.2', '10.1.255.255'),
+            ],
+        )
+
+    def test_error(self) -> None:
+        """
+        Test whether a netlink error is raised.
+
+        """
+        with self.assertRaises(PermissionError):
+            self.read(_netlink_message(2, struct.pack('=i', -1) + bytes(16)))
+
+    def test_cache(self) -> None:
+        """
+        Test whether the interfaces are enumerated once per ttl.
+
+        """
+        interface = InterfaceAddress('eth0', '192.168.1.2', '192.168.1.255')
+        cache = InterfaceCache(ttl=60)
+        with mock.patch(
+            'wakeonlan.interfaces.read_interfaces', return_value=[interface]
+        ) as read:
+            self.assertEqual(cache.get(), [interface])
+            self.assertEqual(cache.get(), [interface])
+            self.assertEqual(read.call_count, 1)
+            cache.invalidate()
+            cache.get()
+            self.assertEqual(read.call_count, 2)
+            cache.configure(ttl=0)
+            cache.get()
+            cache.get()
+            self.assertEqual(read.call_count, 4)
+        with self.assertRaises(ValueError):
+            cache.configure(ttl=-1)
+
+    def test_wake_all_interfaces(self) -> None:
+        """
+        Test whether the magic packets are sent on every interface.
+
+        """
+        interfaces = [
+            InterfaceAddress('lo0', '127.0.0.1', '127.0.0.1'),
+            InterfaceAddress('lo1', '127.0.0.2', '127.0.0.1'),
+        ]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+            with mock.patch(
+                'wakeonlan.interfaces.read_interfaces', return_value=interfaces
+            ):
+                self.assertEqual(
+                    broadcast_destinations(port),
+                    [
+                        Destination('127.0.0.1', port, '127.0.0.1', socket.AF_INET),
+                        Destination('127.0.0.1', port, '127.0.0.2', socket.AF_INET),
+                    ],
+                )
+                result = wake_all_interfaces('133713371337', port=port)
+            received = {sock.recvfrom(1024)[1][0] for _ in range(2)}
+        self.assertTrue(result.ok)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(received, {'127.0.0.1', '127.0.0.2'})
+        with mock.patch('wakeonlan.interfaces.read_interfaces', return_value=[]):
+            with self.assertRaises(OSError):
+                wake_all_interfaces('133713371337')
+
+
+class TestInventory(unittest.TestCase):
+    """
+    Test :mod:`wakeonlan.inventory`.
+
+    """
+
+    def test_read_ethers(self) -> None:
+        """
+        Test reading an /etc/ethers style file.
+
+        """
+        entries = list(
+            read_ethers(
+                [
+                    '# mac address host name\n',
+                    '00:11:22:33:44:55 alpha\n',
+                    '\n',
+                    '66:77:88:99:aa:bb beta b @rack12 # comment\n',
+                ]
+            )
+        )
+        self.assertEqual(
+            entries,
+            [
+                InventoryEntry('00:11:22:33:44:55', 'alpha'),
+                InventoryEntry('66:77:88:99:aa:bb', 'beta', ('b',), ('rack12',)),
+            ],
+        )
+        with self.assertRaises(ValueError):
+            list(read_ethers(['00:11:22:33:44:55\n']))
+
+    def test_read_csv(self) -> None:
+        """
+        Test reading a CSV inventory.
+
+        """
+        entries = list(
+            read_csv(
+                [
+                    'Name,MAC,Tags,Location\n',
+                    'alpha,00:11:22:33:44:55,rack12;db,basement\n',
+                    'beta,66:77:88:99:aa:bb\n',
+                ]
+            )
+        )
+        self.assertEqual(
+            entries,
+            [
+                InventoryEntry('00:11:22:33:44:55', 'alpha', (), ('rack12', 'db')),
+                InventoryEntry('66:77:88:99:aa:bb', 'beta'),
+            ],
+        )
+        with self.assertRaises(ValueError):
+            list(read_csv(['name,address\n']))
+
+    def test_lookup(self) -> None:
+        """
+        Test looking up host names, aliases and tags.
+
+        """
+        inventory = Inventory.from_entries(
+            [
+                InventoryEntry('00-11-22-33-44-55', 'Alpha', ('a',), ('rack',)),
+                InventoryEntry('66:77:88:99:aa:bb', 'beta', (), ('rack', 'db')),
+                InventoryEntry('001122334455', 'alpha-2'),
+            ]
+        )
+        self.assertEqual(len(inventory), 2)
+        self.assertEqual(inventory.lookup('ALPHA'), ['00:11:22:33:44:55'])
+        self.assertEqual(inventory.lookup('a'), ['00:11:22:33:44:55'])
+        self.assertEqual(inventory.lookup('alpha-2'), ['00:11:22:33:44:55'])
+        self.assertEqual(
+            inventory.lookup('@rack'), ['00:11:22:33:44:55', '66:77:88:99:aa:bb']
+        )
+        self.assertEqual(inventory.lookup('rack'), [])
+        self.assertIn('@db', inventory)
+        self.assertNotIn('gamma', inventory)
+        with self.assertRaises(ValueError):
+            Inventory.from_entries([InventoryEntry('invalid', 'alpha')])
+        with self.assertRaises(ValueError):
+            Inventory(b'invalid')
+
+    def test_cache(self) -> None:
+        """
+        Test whether the index is cached until the inventory changes.
+
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/inventory.csv'
+            with open(path, 'w') as file:
+                file.write('mac,hostname\n00:11:22:33:44:55,alpha\n')
+            inventory = load_inventory(path, cache_dir=directory)
+            self.assertEqual(inventory.lookup('alpha'), ['00:11:22:33:44:55'])
+            inventory.close()
+
+            with mock.patch('wakeonlan.inventory.read_csv') as read:
+                inventory = load_inventory(path, cache_dir=directory)
+            read.assert_not_called()
+            self.assertEqual(inventory.lookup('alpha'), ['00:11:22:33:44:55'])
+            inventory.close()
+
+            with open(path, 'a') as file:
+                file.write('66:77:88:99:aa:bb,beta\n')
+            inventory = load_inventory(path, cache_dir=directory)
+            self.assertEqual(inventory.lookup('beta'), ['66:77:88:99:aa:bb'])
+            inventory.close()
+
+            with mock.patch(
+                'wakeonlan.inventory.build_index', wraps=build_index
+            ) as build:
+                load_inventory(path, cache=False).close()
+            build.assert_called_once()
+
+
+ARP_TABLE = """\
+IP address       HW type     Flags       HW address            Mask     Device
+192.168.1.10     0x1         0x2         00:11:22:33:44:55     *        eth0
+192.168.1.11     0x1         0x0         00:00:00:00:00:00     *        eth0
+192.168.1.12     0x1         0x6         66:77:88:99:AA:BB     *        eth0
+"""
+
+
+class TestNeighborCache(unittest.TestCase):
+    """
+    Test :mod:`wakeonlan.neighbors`.
+
+    """
+
+    def setUp(self) -> None:
+        """
+        Create a fake neighbor table.
+
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.table = f'{directory.name}/arp'
+        self.path = f'{directory.name}/cache/neighbors.json'
+        with open(self.table, 'w') as file:
+            file.write(ARP_TABLE)
+
+    def test_read_arp_table(self) -> None:
+        """
+        Test whether only complete entries are read.
+
+        """
+        self.assertEqual(
+            read_arp_table(ARP_TABLE.splitlines()),
+            {
+                '192.168.1.10': '00:11:22:33:44:55',
+                '192.168.1.12': '66:77:88:99:aa:bb',
+            },
+        )
+
+    def test_lookup(self) -> None:
+        """
+        Test whether mac addresses are kept after they expire.
+
+        """
+        cache = NeighborCache(self.path, table=self.table)
+        self.assertEqual(
+            cache.lookup(['192.168.1.10', '192.168.1.11', '10.0.0.1']),
+            {'192.168.1.10': '00:11:22:33:44:55'},
+        )
+        with open(self.table, 'w') as file:
+            file.write(ARP_TABLE.splitlines()[0] + '\n')
+        self.assertEqual(
+            cache.lookup(['192.168.1.12']), {'192.168.1.12': '66:77:88:99:aa:bb'}
+        )
+        os.unlink(self.table)
+        self.assertEqual(
+            NeighborCache(self.path, table=self.table).lookup(['192.168.1.10']),
+            {'192.168.1.10': '00:11:22:33:44:55'},
+        )
+        with self.assertRaises(ValueError):
+            cache.lookup(['host.example'])
+
+    def test_table_read_once(self) -> None:
+        """
+        Test whether bulk lookups read the neighbor table only once.
+
+        """
+        cache = NeighborCache(self.path, table=self.table)
+        with mock.patch(
+            'wakeonlan.neighbors.read_arp_table', wraps=read_arp_table
+        ) as read:
+            result = cache.lookup(['192.168.1.10', '192.168.1.12'] * 100)
+        read.assert_called_once()
+        self.assertEqual(len(result), 2)
+
+    @mock.patch('wakeonlan.wake')
+    def test_main(self, wake: mock.Mock) -> None:
+        """
+        Test if ip addresses given on the command line are looked up.
+
+        """
+        with mock.patch('wakeonlan.neighbors.ARP_TABLE', self.table):
+            with mock.patch.dict(
+                'os.environ', {'XDG_CACHE_HOME': os.path.dirname(self.path)}
+            ):
+                main(['192.168.1.10', 'ffffffffffff'])
+                with mock.patch('sys.stderr', new_callable=io.StringIO):
+                    with self.assertRaises(SystemExit):
+                        main(['192.168.1.11'])
+        self.assertEqual(wake.call_args.args, ('00:11:22:33:44:55', 'ffffffffffff'))
+
+
+class TestDeduplicate(unittest.TestCase):
+    """
+    Test deduplication and :class:`RecentWakes`.
+
+    """
+
+    def setUp(self) -> None:
+        """
+        Bind a socket to receive the magic packets.
+
+        """
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(('127.0.0.1', 0))
+        self.sink.setblocking(False)
+        self.addCleanup(self.sink.close)
+        self.port = self.sink.getsockname()[1]
+
+    def received(self) -> list[bytes]:
+        """
+        Get the magic packets received so far.
+
+        """
+        packets = []
+        with contextlib.suppress(BlockingIOError):
+            while True:
+                packets.append(self.sink.recv(1024))
+        return packets
+
+    def test_duplicates(self) -> None:
+        """
+        Test whether mac addresses in different notations are sent once.
+
+        """
+        result = wake(
+            '00:11:22:33:44:55',
+            '00-11-22-33-44-55',
+            '0011.2233.4455',
+            '001122334455/ffffffffffff',
+            '66:77:88:99:aa:bb',
+            '001122334455',
+            host='127.0.0.1',
+            port=self.port,
+        )
+        self.assertEqual(
+            result.macs,
+            ['00:11:22:33:44:55', '001122334455/ffffffffffff', '66:77:88:99:aa:bb'],
+        )
+        self.assertEqual(result.duplicates, 3)
+        self.assertEqual(result.summary()['duplicates'], 3)
+        self.assertEqual(len(self.received()), 3)
+
+        result = wake(
+            '001122334455',
+            '00:11:22:33:44:55',
+            host='127.0.0.1',
+            port=self.port,
+            deduplicate=False,
+        )
+        self.assertEqual((len(result), result.duplicates), (2, 0))
+        self.assertEqual(len(self.received()), 2)
+
+    def test_recent(self) -> None:
+        """
+        Test whether recently woken mac addresses are suppressed.
+
+        """
+        recent = RecentWakes(60)
+        options = {'host': '127.0.0.1', 'port': self.port, 'recent': recent}
+        wake('001122334455', **options)
+        result = wake('00:11:22:33:44:55', '66:77:88:99:aa:bb', **options)
+        self.assertEqual(result.macs, ['66:77:88:99:aa:bb'])
+        self.assertEqual(result.suppressed, 1)
+        result = wake('001122334455', **options)
+        self.assertEqual((len(result), result.suppressed), (0, 1))
+        result = wake('001122334455', **{**options, 'port': self.port + 1})
+        self.assertEqual((len(result), result.suppressed), (1, 0))
+        self.assertEqual(len(self.received()), 2)
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 61):
+            result = wake('001122334455', **options)
+        self.assertEqual(result.suppressed, 0)
+
+    def test_release(self) -> None:
+        """
+        Test whether mac addresses that failed aren’t suppressed.
+
+        """
+        recent = RecentWakes(60)
+        options = {'host': '127.0.0.1', 'port': self.port, 'recent': recent}
+        with mock.patch('socket.socket.send', side_effect=OSError('Failed')):
+            with self.assertRaises(WakeError):
+                wake('001122334455', **options)
+            result = wake_many(
+                {'66:77:88:99:aa:bb': Destination('127.0.0.1', self.port)},
+                recent=recent,
+            )
+        self.assertFalse(result.ok)
+        self.assertEqual(len(recent), 0)
+        wake('001122334455', '66:77:88:99:aa:bb', **options)
+        self.assertEqual(len(self.received()), 2)
+        with self.assertRaises(ValueError):
+            RecentWakes(-1)
+
+    def test_wake_many(self) -> None:
+        """
+        Test whether wake_many deduplicates per destination.
+
+        """
+        destination = Destination('127.0.0.1', self.port)
+        other = Destination('127.0.0.1', self.port + 1)
+        result = wake_many(
+            [
+                ('001122334455', destination),
+                ('00:11:22:33:44:55', destination),
+                ('00:11:22:33:44:55', other),
+            ]
+        )
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result.duplicates, 1)
+        recent = RecentWakes(60)
+        recent.claim([create_magic_packet('001122334455')], destination)
+        with mock.patch('wakeonlan.create_socket') as create_socket:
+            result = wake_many({'001122334455': destination}, recent=recent)
+        create_socket.assert_not_called()
+        self.assertEqual((len(result), result.suppressed), (0, 1))
+
+
+class TestDestination(unittest.TestCase):
+    """
+    Test :class:`Destination`.
+
+    """
+
+    def test_parse(self) -> None:
+        """
+        Test whether hosts and subnets are parsed.
+
+        """
+        self.assertEqual(Destination.parse('example.com'), Destination('example.com'))
+        self.assertEqual(
+            Destination.parse('192.168.1.0/24', port=7, interface='192.168.1.2'),
+            Destination('192.168.1.255', 7, '192.168.1.2', socket.AF_INET),
+        )
+        with self.assertRaises(ValueError):
+            Destination.parse('fe80::/64')
+
+    def test_read_targets(self) -> None:
+        """
+        Test whether targets are read from lines of text.
+
+        """
+        lines = [
+            '# mac, destination, port, interface\n',
+            '01:23:45:67:89:ab, 10.0.1.0/24\n',
+            '000000000000 10.0.2.255 7 10.0.2.2  # rack 2\n',
+        ]
+        self.assertEqual(
+            list(read_targets(lines)),
+            [
+                (
+                    '01:23:45:67:89:ab',
+                    Destination('10.0.1.255', 9, None, socket.AF_INET),
+                ),
+                ('000000000000', Destination('10.0.2.255', 7, '10.0.2.2')),
+            ],
+        )
+        with self.assertRaises(ValueError):
+            list(read_targets(['01:23:45:67:89:ab\n']))
+
+
+class TestWakeMany(unittest.TestCase):
+    """
+    Test :func:`wake_many`.
+
+    """
+
+    def test_wake_many(self) -> None:
+        """
+        Test whether packets are grouped and sent to each destination.
+
+        """
+        macs = [f'{index:012x}' for index in range(100)]
+        with (
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as first,
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as second,
+        ):
+            first.bind(('127.0.0.1', 1234))
+            second.bind(('127.0.0.1', 1235))
+            with mock.patch('wakeonlan.create_socket', wraps=create_socket) as create:
+                wake_many(
+                    {
+                        mac: Destination('127.0.0.1', 1234 + index % 2)
+                        for index, mac in enumerate(macs)
+                    }
+                )
+            self.assertEqual(create.call_count, 2)
+            for mac in macs[0::2]:
+                self.assertEqual(first.recv(1024), create_magic_packet(mac))
+            for mac in macs[1::2]:
+                self.assertEqual(second.recv(1024), create_magic_packet(mac))
+
+    def test_errors(self) -> None:
+        """
+        Test whether errors are collected per destination.
+
+        """
+        broken = Destination('127.0.0.1', 1235, '192.0.2.1')
+        for max_workers in [None, 2]:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.bind(('127.0.0.1', 1234))
+                result = wake_many(
+                    [
+                        ('000000000000', broken),
+                        ('133713371337', Destination('127.0.0.1', 1234)),
+                    ],
+                    max_workers=max_workers,
+                )
+                self.assertFalse(result.ok)
+                self.assertEqual(result.failed, ['000000000000'])
+                self.assertEqual(list(result.destination_errors), [broken])
+                self.assertIsInstance(result[0].error, OSError)
+                self.assertEqual(result[0].bytes_sent, 0)
+                self.assertEqual(
+                    result[1],
+                    MacResult(
+                        '133713371337', Destination('127.0.0.1', 1234), 102, None
+                    ),
+                )
+                self.assertEqual(sock.recv(1024), create_magic_packet('133713371337'))
+
+    def test_max_workers(self) -> None:
+        """
+        Test whether each destination is woken in its own task.
+
+        """
+        with mock.patch('wakeonlan.create_socket') as create:
+            result = wake_many(
+                {'000000000000': '10.0.0.1', '111111111111': '10.0.0.2'},
+                max_workers=2,
+            )
+        self.assertTrue(result.ok)
+        self.assertEqual(list(result.bytes_sent), [102, 102])
+        self.assertEqual(
+            sorted(call.kwargs['host'] for call in create.mock_calls if call.kwargs),
+            ['10.0.0.1', '10.0.0.2'],
+        )
+
+    def test_invalid_mac(self) -> None:
+        """
+        Test whether nothing is sent if any mac address is invalid.
+
+        """
+        with mock.patch('wakeonlan.create_socket') as create:
+            with self.assertRaises(ValueError):
+                wake_many([('000000000000', '127.0.0.1'), ('invalid', '127.0.0.2')])
+        create.assert_not_called()
+
+
+class TestWakeSender(unittest.TestCase):
+    """
+    Test :class:`WakeSender`.
+
+    """
+
+    def test_reuse_socket(self) -> None:
+        """
+        Test whether sockets are reused for the same destination.
+
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            with WakeSender() as sender:
+                with mock.patch(
+                    'wakeonlan.create_socket', wraps=create_socket
+                ) as create:
+                    sender.wake('133713371337', host='127.0.0.1', port=1234)
+                    sender.wake('000000000000', host='127.0.0.1', port=1234)
+                self.assertEqual(create.call_count, 1)
+                self.assertEqual(len(sender), 1)
+            self.assertEqual(len(sender), 0)
+            self.assertEqual(sock.recv(1024), create_magic_packet('133713371337'))
+            self.assertEqual(sock.recv(1024), create_magic_packet('000000000000'))
+
+    def test_multicast_scope(self) -> None:
+        """
+        Test whether sockets are pooled per IPv6 multicast scope.
+
+        """
+        with (
+            WakeSender() as sender,
+            mock.patch(
+                'wakeonlan.create_socket', side_effect=lambda **kwargs: mock.Mock()
+            ) as create,
+        ):
+            get_socket = functools.partial(
+                sender.get_socket, host=IPV6_ALL_NODES, family=socket.AF_INET6
+            )
+            first = get_socket(interface='eth0')
+            self.assertIs(get_socket(interface='eth0'), first)
+            get_socket(interface='eth1')
+            get_socket(interface='eth0', hops=8)
+            self.assertEqual(len(sender), 3)
+            self.assertEqual(create.call_args.kwargs['hops'], 8)
+            sender.discard(
+                host=IPV6_ALL_NODES, interface='eth0', family=socket.AF_INET6, hops=8
+            )
+            self.assertEqual(len(sender), 2)
+
+    def test_lru(self) -> None:
+        """
+        Test whether the least recently used socket is closed.
+
+        """
+        with WakeSender(max_sockets=2) as sender:
+            first = sender.get_socket(host='127.0.0.1', port=1234)
+            second = sender.get_socket(host='127.0.0.1', port=1235)
+            self.assertIs(sender.get_socket(host='127.0.0.1', port=1234), first)
+            sender.get_socket(host='127.0.0.1', port=1236)
+            self.assertEqual(len(sender), 2)
+            self.assertEqual(second.fileno(), -1)
+            self.assertNotEqual(first.fileno(), -1)
+
+    def test_idle_timeout(self) -> None:
+        """
+        Test whether idle sockets are replaced.
+
+        """
+        with (
+            WakeSender(idle_timeout=10) as sender,
+            mock.patch('time.monotonic', return_value=0) as monotonic,
+        ):
+            first = sender.get_socket(host='127.0.0.1', port=1234)
+            monotonic.return_value = 20
+            second = sender.get_socket(host='127.0.0.1', port=1234)
+            self.assertIsNot(first, second)
+            self.assertEqual(first.fileno(), -1)
+
+    def test_create_without_lock(self) -> None:
+        """
+        Test whether sockets are created without holding the pool lock.
+
+        """
+        first = mock.Mock()
+        second = mock.Mock()
+        sockets = [first, second]
+        with WakeSender() as sender:
+
+            def create(**kwargs: object) -> mock.Mock:
+                self.assertFalse(sender._lock.locked())
+                sock = sockets.pop(0)
+                if sockets:
+                    # Another thread creates a socket for the same destination
+                    # in the meantime.
+                    self.assertIs(sender.get_socket(port=1234), second)
+                return sock
+
+            with mock.patch('wakeonlan.create_socket', side_effect=create):
+                self.assertIs(sender.get_socket(port=1234), second)
+            self.assertEqual(len(sender), 1)
+            first.close.assert_called_once_with()
+            second.close.assert_not_called()
+
+    def test_recover(self) -> None:
+        """
+        Test whether a failing socket is replaced.
+
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            with WakeSender() as sender:
+                sender.get_socket(host='127.0.0.1', port=1234).close()
+                sender.wake('133713371337', host='127.0.0.1', port=1234)
+            self.assertEqual(sock.recv(1024), create_magic_packet('133713371337'))
+
+
+class TestAsyncWake(unittest.IsolatedAsyncioTestCase):
+    """
+    Test :func:`wakeonlan.aio.async_wake`.
+
+    """
+
+    async def test_async_wake(self) -> None:
+        """
+        Test whether magic packets are sent without a sender.
+
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            await async_wake('133713371337', host='127.0.0.1', port=1234)
+            self.assertEqual(sock.recv(1024), create_magic_packet('133713371337'))
+
+    async def test_shared_endpoint(self) -> None:
+        """
+        Test whether concurrent wakes share a single endpoint.
+
+        """
+        macs = [f'{index:012x}' for index in range(200)]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 1234))
+            async with AsyncWakeSender() as sender:
+                loop = asyncio.get_running_loop()
+                with mock.patch.object(
+                    loop,
+                    'create_datagram_endpoint',
+                    wraps=loop.create_datagram_endpoint,
+                ) as create_datagram_endpoint:
+                    await asyncio.gather(
+                        *(
+                            async_wake(mac, host='127.0.0.1', port=1234, sender=sender)
+                            for mac in macs
+                        )
+                    )
+                self.assertEqual(create_datagram_endpoint.call_count, 1)
+            received = {sock.recv(1024) for mac in macs}
+            self.assertEqual(received, {create_magic_packet(mac) for mac in macs})
+
+
+def _free_port(type: socket.SocketKind) -> int:
+    with socket.socket(socket.AF_INET, type) as sock:
+        sock.bind(('127.0.0.1', 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+class _EchoServer(asyncio.DatagramProtocol):
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:  # type: ignore[override]
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple[str | int, ...]) -> None:
+        self.transport.sendto(data, addr)
+
+
+class TestWakeAndVerify(unittest.IsolatedAsyncioTestCase):
+    """
+    Test :func:`wakeonlan.aio.wake_and_verify`.
+
+    """
+
+    async def asyncSetUp(self) -> None:
+        """
+        Bind a socket to receive the magic packets.
+
+        """
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(('127.0.0.1', 0))
+        self.sink.setblocking(False)
+        self.addCleanup(self.sink.close)
+        self.destination = {'host': '127.0.0.1', 'port': self.sink.getsockname()[1]}
+
+    def received(self) -> list[bytes]:
+        """
+        Get the magic packets received so far.
+
+        """
+        packets = []
+        with contextlib.suppress(BlockingIOError):
+            while True:
+                packets.append(self.sink.recv(1024))
+        return packets
+
+    async def test_probe_tcp(self) -> None:
+        """
+        Test the TCP probe against a local listener.
+
+        """
+        server = await asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', 0)
+        async with server:
+            port = server.sockets[0].getsockname()[1]
+            self.assertTrue(await probe_tcp('127.0.0.1', port))
+        self.assertFalse(await probe_tcp('127.0.0.1', port))
+
+    async def test_probe_udp(self) -> None:
+        """
+        Test the UDP probe against a local echo service.
+
+        """
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(
+            _EchoServer, local_addr=('127.0.0.1', 0)
+        )
+        port = transport.get_extra_info('sockname')[1]
+        self.assertTrue(await probe_udp('127.0.0.1', port, timeout=1))
+        transport.close()
+        self.assertFalse(await probe_udp('127.0.0.1', port, timeout=0.1))
+
+    async def test_up(self) -> None:
+        """
+        Test whether hosts which are already up are reported immediately.
+
+        """
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(
+            _EchoServer, local_addr=('127.0.0.1', 0)
+        )
+        self.addCleanup(transport.close)
+        results = await wake_and_verify(
+            {'133713371337': '127.0.0.1'},
+            probe='udp',
+            probe_port=transport.get_extra_info('sockname')[1],
+            **self.destination,
+        )
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].up)
+        self.assertEqual(results[0].attempts, 1)
+        self.assertEqual(self.received(), [create_magic_packet('133713371337')])
+
+    async def test_resend(self) -> None:
+        """
+        Test whether magic packets are sent again until a host comes up.
+
+        """
+        port = _free_port(socket.SOCK_STREAM)
+        servers = []
+
+        async def start_server() -> None:
+            servers.append(
+                await asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', port)
+            )
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.3, lambda: loop.create_task(start_server()))
+        results = await wake_and_verify(
+            [('133713371337', '127.0.0.1'), ('000000000000', '127.0.0.1')],
+            probe_port=port,
+            probe_interval=0.02,
+            resend_delay=0.05,
+            backoff=2,
+            max_resend_delay=0.1,
+            timeout=5,
+            **self.destination,
+        )
+        for server in servers:
+            server.close()
+        self.assertEqual(
+            [result.mac for result in results], ['133713371337', '000000000000']
+        )
+        for result in results:
+            self.assertTrue(result.up)
+            assert result.time_to_up is not None
+            self.assertGreaterEqual(result.time_to_up, 0.3)
+            # Resends are due after 0.05, 0.15 and 0.25 seconds. Allow for
+            # the last one to be late on a busy machine.
+            self.assertGreaterEqual(result.attempts, 3)
+        self.assertEqual(
+            len(self.received()), sum(result.attempts for result in results)
+        )
+
+    async def test_down(self) -> None:
+        """
+        Test whether hosts which don’t come up are reported as down.
+
+        """
+        results = await wake_and_verify(
+            {'133713371337': '127.0.0.1'},
+            probe_port=_free_port(socket.SOCK_STREAM),
+            probe_interval=0.05,
+            timeout=0.2,
+            **self.destination,
+        )
+        self.assertEqual(results, [VerifyResult('133713371337', '127.0.0.1', None, 1)])
+        self.assertFalse(results[0].up)
+
+    async def test_invalid(self) -> None:
+        """
+        Test whether invalid arguments are rejected before anything is sent.
+
+        """
+        with self.assertRaises(ValueError):
+            await wake_and_verify({'133713371337': '127.0.0.1'}, probe='icmp')
+        with self.assertRaises(ValueError):
+            await wake_and_verify({'invalid': '127.0.0.1'}, **self.destination)
+        self.assertEqual(self.received(), [])
+
+
+class TestServer(unittest.TestCase):
+    """
+    Test :mod:`wakeonlan.server`.
+
+    """
+
+    def setUp(self) -> None:
+        """
+        Start a server sending to a local socket.
+
+        """
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(('127.0.0.1', 0))
+        self.sink.settimeout(1)
+        self.addCleanup(self.sink.close)
+        self.port = self.sink.getsockname()[1]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/wakeonlan.sock'
+        self.sender = WakeSender()
+        self.addCleanup(self.sender.close)
+        self.server = WakeServer(self.path, sender=self.sender, delay=0.05)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_wake(self) -> None:
+        """
+        Test whether the server sends magic packets for clients.
+
+        """
+        with WakeClient(self.path) as client:
+            response = client.wake('133713371337', host='127.0.0.1', port=self.port)
+            self.assertEqual(
+                response,
+                {
+                    'sent': 1,
+                    'failed': 0,
+                    'duplicates': 0,
+                    'suppressed': 0,
+                    'failures': [],
+                },
+            )
+            self.assertEqual(self.sink.recv(1024), create_magic_packet('133713371337'))
+
+            # The same mac address in a different format is suppressed.
+            response = client.wake(
+                '13-37-13-37-13-37',
+                '000000000000',
+                '00:00:00:00:00:00',
+                host='127.0.0.1',
+                port=self.port,
+            )
+            self.assertEqual(
+                (response['sent'], response['duplicates'], response['suppressed']),
+                (1, 1, 1),
+            )
+            self.assertEqual(self.sink.recv(1024), create_magic_packet('000000000000'))
+
+            with self.assertRaises(ValueError):
+                client.wake('invalid')
+
+    def test_coalesce(self) -> None:
+        """
+        Test whether concurrent requests are sent together.
+
+        """
+        macs = [f'{index:012x}' for index in range(10)]
+        responses = []
+
+        def wake(mac: str) -> None:
+            with WakeClient(self.path) as client:
+                responses.append(client.wake(mac, host='127.0.0.1', port=self.port))
+
+        with mock.patch.object(self.sender, 'wake', wraps=self.sender.wake) as send:
+            threads = [threading.Thread(target=wake, args=(mac,)) for mac in macs]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertLess(send.call_count, len(macs))
+        self.assertEqual(sum(response['sent'] for response in responses), 10)
+        received = {self.sink.recv(1024) for mac in macs}
+        self.assertEqual(received, {create_magic_packet(mac) for mac in macs})
+
+    def test_failure(self) -> None:
+        """
+        Test whether failed mac addresses aren’t deduplicated.
+
+        """
+        coalescer = Coalescer(self.sender, delay=0, window=60)
+        destination = Destination('127.0.0.1', self.port)
+        with mock.patch('socket.socket.send', side_effect=OSError('Failed')):
+            response = coalescer.submit(['133713371337'], destination)
+        self.assertEqual(response['failed'], 1)
+        self.assertEqual(response['failures'][0]['error'], 'Failed')
+        response = coalescer.submit(['133713371337'], destination)
+        self.assertEqual((response['sent'], response['failed']), (1, 0))
+
+    def test_send_exception(self) -> None:
+        """
+        Test whether an exception while sending fails the whole batch.
+
+        """
+        coalescer = Coalescer(self.sender, delay=0.05, window=60)
+        destination = Destination('127.0.0.1', self.port)
+        errors: list[Exception] = []
+
+        def submit(mac: str) -> None:
+            try:
+                coalescer.submit([mac], destination)
+            except ValueError as error:
+                errors.append(error)
+
+        with mock.patch.object(
+            self.sender, 'wake', side_effect=ValueError('Failed')
+        ) as wake:
+            threads = [
+                threading.Thread(target=submit, args=(mac,))
+                for mac in ('133713371337', '000000000000')
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        wake.assert_called_once()
+        self.assertEqual([str(error) for error in errors], ['Failed', 'Failed'])
+        # None of the mac addresses were sent, so they may be retried.
+        response = coalescer.submit(['133713371337', '000000000000'], destination)
+        self.assertEqual((response['sent'], response['suppressed']), (2, 0))
+
+    def test_invalid_destination(self) -> None:
+        """
+        Test whether invalid destinations are rejected before sending.
+
+        """
+        with WakeClient(self.path) as client:
+            with self.assertRaisesRegex(ValueError, 'port'):
+                client.wake('133713371337', host='127.0.0.1', port=65536)
+            with self.assertRaisesRegex(ValueError, 'hops'):
+                client.wake('133713371337', host='127.0.0.1', port=self.port, hops=256)
+            response = client.wake('133713371337', host='127.0.0.1', port=self.port)
+            self.assertEqual(response['sent'], 1)
+
+    @mock.patch('wakeonlan.server.WakeClient')
+    def test_main(self, client: mock.Mock) -> None:
+        """
+        Test if the command line forwards to the server.
+
+        """
+        wake = client.return_value.__enter__.return_value.wake
+        wake.return_value = {
+            'sent': 1,
+            'failed': 0,
+            'duplicates': 0,
+            'suppressed': 0,
+            'failures': [],
+        }
+        main(['--server', self.path, '133713371337'])
+        client.assert_called_with(self.path)
+        wake.assert_called_with(
+            '133713371337',
+            host='255.255.255.255',
+            port=9,
+            interface=None,
+            family=socket.AF_UNSPEC,
+        )
+        main(['133713371337', '--server'])
+        client.assert_called_with(None)
+        with mock.patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                main(['--server', self.path, '--repeat', '2', '133713371337'])
+
+
+class TestSchedule(unittest.TestCase):
+    """
+    Test :mod:`wakeonlan.schedule`.
+
+    """
+
+    def setUp(self) -> None:
+        """
+        Create a sender and a state file sending to a local socket.
+
+        """
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(('127.0.0.1', 0))
+        self.sink.settimeout(1)
+        self.addCleanup(self.sink.close)
+        self.destination = Destination('127.0.0.1', self.sink.getsockname()[1])
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/state/schedule.json'
+        self.sender = WakeSender()
+        self.addCleanup(self.sender.close)
+
+    def test_cron_schedule(self) -> None:
+        """
+        Test finding the next time matching a cron expression.
+
+        """
+
+        def next_after(expression: str, moment: str) -> str:
+            timestamp = datetime.datetime.fromisoformat(moment).timestamp()
+            result = CronSchedule(expression).next_after(timestamp)
+            return datetime.datetime.fromtimestamp(result).isoformat()
+
+        # A Saturday
+        start = '2026-10-17T12:34:56'
+        self.assertEqual(next_after('* * * * *', start), '2026-10-17T12:35:00')
+        self.assertEqual(next_after('*/15 * * * *', start), '2026-10-17T12:45:00')
+        self.assertEqual(next_after('30 7 * * 1-5', start), '2026-10-19T07:30:00')
+        self.assertEqual(next_after('0 8,20 * * *', start), '2026-10-17T20:00:00')
+        self.assertEqual(next_after('@hourly', start), '2026-10-17T13:00:00')
+        self.assertEqual(next_after('@weekly', start), '2026-10-18T00:00:00')
+        self.assertEqual(next_after('0 0 * * 7', start), '2026-10-18T00:00:00')
+        self.assertEqual(next_after('@yearly', start), '2027-01-01T00:00:00')
+        self.assertEqual(next_after('0 0 29 2 *', start), '2028-02-29T00:00:00')
+        self.assertEqual(next_after('0 0 31 * *', start), '2026-10-31T00:00:00')
+        self.assertEqual(
+            next_after('0 0 31 * *', '2026-10-31T00:00'), '2026-12-31T00:00:00'
+        )
+        # If both the day of month and the day of week are restricted, either
+        # may match.
+        self.assertEqual(next_after('0 0 1 * 1', start), '2026-10-19T00:00:00')
+        self.assertEqual(next_after('0 0 1 * 0', start), '2026-10-18T00:00:00')
+        self.assertEqual(
+            next_after('0 0 1 * 0', '2026-10-25T00:00'), '2026-11-01T00:00:00'
+        )
+
+    def test_cron_schedule_dst(self) -> None:
+        """
+        Test whether the next time is in the future while the clocks go back.
+
+        """
+        patcher = mock.patch.dict('os.environ', {'TZ': 'America/New_York'})
+        patcher.start()
+        self.addCleanup(time.tzset)
+        self.addCleanup(patcher.stop)
+        time.tzset()
+
+        def utc(
+            year: int, month: int, day: int, hour: int, minute: int = 0, second: int = 0
+        ) -> float:
+            return datetime.datetime(
+                year, month, day, hour, minute, second, tzinfo=datetime.timezone.utc
+            ).timestamp()
+
+        # 01:30:30 EST, the second time 01:30 occurs on this day.
+        now = utc(2025, 11, 2, 6, 30, 30)
+        self.assertEqual(CronSchedule('* * * * *').next_after(now), now + 30)
+        daily = CronSchedule('30 1 * * *')
+        self.assertEqual(daily.next_after(utc(2025, 11, 2, 5)), utc(2025, 11, 2, 5, 30))
+        self.assertEqual(
+            daily.next_after(utc(2025, 11, 2, 5, 30)), utc(2025, 11, 3, 6, 30)
+        )
+
+        runs = []
+        with Scheduler(
+            self.path, sender=mock.Mock(), on_run=lambda job, result: runs.append(job)
+        ) as scheduler:
+            with mock.patch('time.time', return_value=now - 3600):
+                scheduler.add('minutely', ['133713371337'], cron='* * * * *')
+            self.assertEqual(len(scheduler.run_pending(now)), 1)
+            self.assertEqual(scheduler.next_run(), now + 30)
+        self.assertEqual(len(runs), 1)
+
+    def test_cron_schedule_invalid(self) -> None:
+        """
+        Test whether invalid cron expressions are rejected.
+
+        """
+        for expression in (
+            '* * * *',
+            '60 * * * *',
+            '* 24 * * *',
+            '* * 0 * *',
+            '* * * 13 *',
+            '* * * * 8',
+            '5-1 * * * *',
+            '*/0 * * * *',
+            'a * * * *',
+            '@often',
+        ):
+            with self.subTest(expression):
+                with self.assertRaises(ValueError):
+                    CronSchedule(expression)
+        with self.assertRaises(ValueError):
+            CronSchedule('0 0 31 2 *').next_after(time.time())
+
+    def test_one_shot(self) -> None:
+        """
+        Test whether a one-shot job runs once when it’s due.
+
+        """
+        runs = []
+        with Scheduler(
+            self.path, sender=self.sender, on_run=lambda *args: runs.append(args)
+        ) as scheduler:
+            now = time.time()
+            scheduler.add(
+                'once', ['133713371337'], at=now + 60, destination=self.destination
+            )
+            self.assertEqual(scheduler.next_run(), now + 60)
+            self.assertEqual(scheduler.run_pending(now), [])
+            (job,) = scheduler.run_pending(now + 60)
+            self.assertEqual(job.name, 'once')
+            self.assertEqual(self.sink.recv(1024), create_magic_packet('133713371337'))
+            self.assertEqual(runs[0][0], job)
+            self.assertTrue(runs[0][1].ok)
+            self.assertEqual(scheduler.run_pending(now + 120), [])
+            self.assertIsNone(scheduler.next_run())
+            self.assertEqual([job.next_run for job in scheduler], [None])
+
+    def test_recurring(self) -> None:
+        """
+        Test whether a recurring job runs once per matching time.
+
+        """
+        with Scheduler(self.path, sender=self.sender) as scheduler:
+            job = scheduler.add(
+                'minutely',
+                ['133713371337'],
+                cron='* * * * *',
+                destination=self.destination,
+            )
+            next_run = job.next_run
+            assert next_run is not None
+            self.assertEqual(next_run % 60, 0)
+            self.assertEqual(scheduler.run_pending(next_run - 1), [])
+            self.assertEqual(len(scheduler.run_pending(next_run)), 1)
+            self.assertEqual(scheduler.next_run(), next_run + 60)
+            # Missed runs are skipped.
+            self.assertEqual(len(scheduler.run_pending(next_run + 600)), 1)
+            self.assertEqual(scheduler.next_run(), next_run + 660)
+            self.assertEqual(scheduler.run_pending(next_run + 630), [])
+
+    def test_restart(self) -> None:
+        """
+        Test whether the next run times survive a restart.
+
+        """
+        now = time.time()
+        with Scheduler(self.path, sender=self.sender) as scheduler:
+            scheduler.add(
+                'once', ['133713371337'], at=now, destination=self.destination
+            )
+            recurring = scheduler.add(
+                'hourly', ['133713371337'], cron='@hourly', destination=self.destination
+            )
+            self.assertEqual(len(scheduler.run_pending(now)), 1)
+        with Scheduler(self.path, sender=self.sender) as scheduler:
+            self.assertEqual(len(scheduler), 2)
+            # Adding the same jobs again keeps their state.
+            scheduler.add(
+                'once', ['133713371337'], at=now, destination=self.destination
+            )
+            scheduler.add(
+                'hourly', ['133713371337'], cron='@hourly', destination=self.destination
+            )
+            self.assertEqual(scheduler.run_pending(now), [])
+            self.assertEqual(scheduler.next_run(), recurring.next_run)
+            # Changing a one-shot job which already ran doesn’t run it again,
+            # unless its time changes.
+            scheduler.add(
+                'once',
+                ['133713371338'],
+                at=now,
+                destination=self.destination._replace(port=7),
+            )
+            self.assertEqual(scheduler.run_pending(now), [])
+            scheduler.add(
+                'once', ['133713371338'], at=now + 1, destination=self.destination
+            )
+            self.assertEqual(
+                [job.name for job in scheduler.run_pending(now + 1)], ['once']
+            )
+            self.assertTrue(scheduler.remove('hourly'))
+            self.assertFalse(scheduler.remove('hourly'))
+        with Scheduler(self.path, sender=self.sender) as scheduler:
+            self.assertEqual([job.name for job in scheduler], ['once'])
+            self.assertIsNone(scheduler.next_run())
+
+    def test_invalid(self) -> None:
+        """
+        Test whether invalid jobs and state are rejected.
+
+        """
+        with Scheduler(self.path, sender=self.sender) as scheduler:
+            with self.assertRaises(ValueError):
+                scheduler.add('job', ['133713371337'])
+            with self.assertRaises(ValueError):
+                scheduler.add('job', ['133713371337'], at=0, cron='@daily')
+            with self.assertRaises(ValueError):
+                scheduler.add('job', ['invalid'], at=0)
+            with self.assertRaises(ValueError):
+                scheduler.add('job', ['133713371337'], cron='@often')
+            self.assertEqual(len(scheduler), 0)
+        os.makedirs(os.path.dirname(self.path))
+        for content in ('{', '{"version": 2, "jobs": []}', '{"version": 1}'):
+            with self.subTest(content):
+                with open(self.path, 'w') as file:
+                    file.write(content)
+                with self.assertRaises(ValueError):
+                    Scheduler(self.path, sender=self.sender)
+
+    def test_many_jobs(self) -> None:
+        """
+        Test whether many jobs run in order.
+
+        """
+        runs = []
+        with Scheduler(
+            self.path, sender=mock.Mock(), on_run=lambda job, result: runs.append(job)
+        ) as scheduler:
+            for index in range(20000):
+                scheduler.add(
+                    str(index), ['133713371337'], at=(index * 7919) % 20000, save=False
+                )
+            for index in range(0, 20000, 2):
+                scheduler.remove(str(index), save=False)
+            scheduler.save()
+            self.assertEqual(len(scheduler.run_pending(9999.5)), 5000)
+            self.assertEqual(len(scheduler.run_pending(20000)), 5000)
+        self.assertEqual(
+            [job.next_run for job in runs], sorted(job.next_run for job in runs)
+        )
+        self.assertEqual(len(Scheduler(self.path, sender=self.sender)), 10000)
+
+    def test_run(self) -> None:
+        """
+        Test whether the scheduler runs jobs until it’s stopped.
+
+        """
+        scheduler = Scheduler(self.path, sender=self.sender)
+        thread = threading.Thread(target=scheduler.run)
+        thread.start()
+        scheduler.add(
+            'once', ['133713371337'], at=time.time() + 0.1, destination=self.destination
+        )
+        self.assertEqual(self.sink.recv(1024), create_magic_packet('133713371337'))
+        scheduler.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def test_read_jobs(self) -> None:
+        """
+        Test parsing a jobs file.
+
+        """
+        jobs = list(
+            read_jobs(
+                [
+                    '# Wake the office computers on workdays\n',
+                    '30  7 * * 1-5 00:11:22:33:44:55 66:77:88:99:aa:bb\n',
+                    '\n',
+                    '@daily 133713371337\n',
+                    '2026-10-20T07:30 133713371337\n',
+                    '0,15-45 7 * * * 133713371337\n',
+                ]
+            )
+        )
+        at = datetime.datetime(2026, 10, 20, 7, 30).timestamp()
+        self.assertEqual(
+            jobs,
+            [
+                (
+                    '30 7 * * 1-5 00:11:22:33:44:55 66:77:88:99:aa:bb',
+                    ['00:11:22:33:44:55', '66:77:88:99:aa:bb'],
+                    {'cron': '30 7 * * 1-5'},
+                ),
+                ('@daily 133713371337', ['133713371337'], {'cron': '@daily'}),
+                ('2026-10-20T07:30 133713371337', ['133713371337'], {'at': at}),
+                (
+                    '0,15-45 7 * * * 133713371337',
+                    ['133713371337'],
+                    {'cron': '0,15-45 7 * * *'},
+                ),
+            ],
+        )
+        for line in ('* * * * *', '@daily', '2026-13-01T00:00 133713371337'):
+            with self.assertRaises(ValueError):
+                list(read_jobs([line]))
+
+    @mock.patch('wakeonlan.schedule.Scheduler.run')
+    def test_main(self, run: mock.Mock) -> None:
+        """
+        Test the ``wakeonlan schedule`` command.
+
+        """
+        jobs = os.path.join(os.path.dirname(os.path.dirname(self.path)), 'jobs')
+        with open(jobs, 'w') as file:
+            file.write('@daily 133713371337\n@hourly 133713371338\n')
+        main(['schedule', jobs, '--state', self.path, '-o', '127.0.0.1'])
+        run.assert_called_once_with()
+        with Scheduler(self.path, sender=self.sender) as scheduler:
+            self.assertEqual(
+                sorted((job.name, job.destination.host) for job in scheduler),
+                [
+                    ('@daily 133713371337', '127.0.0.1'),
+                    ('@hourly 133713371338', '127.0.0.1'),
+                ],
+            )
+        with open(jobs, 'w') as file:
+            file.write('@daily 133713371337\n')
+        main(['schedule', jobs, '--state', self.path, '-o', '127.0.0.1'])
+        with Scheduler(self.path, sender=self.sender) as scheduler:
+            self.assertEqual([job.name for job in scheduler], ['@daily 133713371337'])
+        with open(jobs, 'w') as file:
+            file.write('@daily invalid\n')
+        with mock.patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                main(['schedule', jobs, '--state', self.path])
+            with self.assertRaises(SystemExit):
+                main(['schedule', jobs + '.missing', '--state', self.path])
+
+
+class TestBench(unittest.TestCase):
+    """
+    Test :mod:`wakeonlan.bench`.
+
+    """
+
+    def test_measure(self) -> None:
+        """
+        Test whether a mode is measured per call.
+
+        """
+        calls = [mock.Mock()] * 3
+        result = bench.measure('mode', calls, 6, 'note')
+        self.assertEqual(calls[0].call_count, 6)
+        self.assertEqual((result.mode, result.total, result.note), ('mode', 6, 'note'))
+        assert result.p50 is not None
+        assert result.p99 is not None
+        self.assertLessEqual(result.p50, result.p99)
+        self.assertLessEqual(result.p99, result.elapsed)
+        self.assertIsNotNone(result.peak)
+
+    def test_main(self) -> None:
+        """
+        Test whether the benchmarks run against the loopback interface.
+
+        """
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            bench.main(['send', 'socket', 'wake', '--count', '3'])
+        modes = [line.split()[:2] for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            modes,
+            [
+                ['send', 'loop'],
+                ['send', 'batch'],
+                ['send', 'buffer'],
+                ['send', 'template'],
+                ['socket', 'create'],
+                ['socket', 'cached'],
+                ['socket', 'pooled'],
+                ['wake', 'single'],
+                ['wake', 'batched'],
+                ['wake', 'pooled'],
+                ['wake', 'async'],
+            ],
+        )
+        self.assertEqual(bench.resolve_cache.ttl, 0)
+
+    def test_import(self) -> None:
+        """
+        Test whether the import time is measured per module.
+
+        """
+        results = bench.bench_import(1)
+        self.assertEqual([result.mode for result in results], ['library', 'cli'])
+        for result in results:
+            self.assertEqual((result.total, result.unit), (1, 'imports'))
+            self.assertGreater(result.elapsed, 0)
+        with self.assertRaises(ValueError):
+            bench.import_time('sys')
+
+
+class TestImport(unittest.TestCase):
+    """
+    Test the modules imported by :mod:`wakeonlan`.
+
+    """
+
+    def test_lazy_imports(self) -> None:
+        """
+        Test whether modules only needed by some features aren’t imported.
+
+        """
+        lazy = [
+            'argparse',
+            'asyncio',
+            'concurrent.futures',
+            'ipaddress',
+            'json',
+            'random',
+            'tempfile',
+            'typing_extensions',
+            'wakeonlan._deprecated',
+            'wakeonlan.cli',
+        ]
+        code = (
+            f'import sys, wakeonlan; print(*(m for m in {lazy!r} if m in sys.modules))'
+        )
+        process = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, check=True, text=True
+        )
+        self.assertEqual(process.stdout.split(), [])
+
+
+class TestSendMagicPacket(unittest.TestCase):
+    """
+    Test :func:`send_magic_packet`.
+
+    """
+
+    @mock.patch('wakeonlan.wake')
+    def test_main(self, wake: mock.Mock) -> None:
+        """
+        Test if processed arguments are passed to wake.
+
+        """
+        warnings.filterwarnings('ignore')
+        send_magic_packet('00:11:22:33:44:55')
+        send_magic_packet(
+            '00:11:22:33:44:55',
+            ip_address='example.com',
+            port=1234,
+            interface='192.168.1.1',
+            address_family=socket.AF_INET,
+        )
+        self.assertEqual(
+            wake.mock_calls,
+            [
+                mock.call(
+                    '00:11:22:33:44:55',
+                    host='255.255.255.255',
+                    port=9,
+                    interface=None,
+                    family=socket.AF_UNSPEC,
+                ),
+                mock.call(
+                    '00:11:22:33:44:55',
+                    host='example.com',
+                    port=1234,
+                    interface='192.168.1.1',
+                    family=socket.AF_INET,
+                ),
+            ],
+        )
+
+
+class TestMain(unittest.TestCase):
+    """
+    Test :func:`main`.
+
+    """
+
+    @mock.patch('wakeonlan.wake')
+    def test_main(self, wake: mock.Mock) -> None:
+        """
+        Test if processed arguments are passed to wake.
+
+        """
+        main(['00:11:22:33:44:55'])
+        main(['00:11:22:33:44:55', '-o', 'host.example', '-p', '1337'])
+        main(
+            [
+                '00:11:22:33:44:55',
+                '-o',
+                'host.example',
+                '-p',
+                '1337',
+                '-n',
+                '192.168.0.2',
+            ]
+        )
+        main(['00:11:22:33:44:55', '-o', 'host.example', '-p', '1337', '-4'])
+        main(['00:11:22:33:44:55', '-o', 'host.example', '-p', '1337', '-6'])
+        main(['00:11:22:33:44:55', '-o', 'host.example', '-p', '1337', '-6', '-4'])
+        with mock.patch('wakeonlan.resolve_cache') as resolve_cache:
+            main(['00:11:22:33:44:55', '--resolve-ttl', '30'])
+        resolve_cache.configure.assert_called_once_with(ttl=30)
+        with self.assertRaises(SystemExit), mock.patch('sys.stderr'):
+            main([])
+        self.assertEqual(
+            wake.mock_calls,
+            [
+                mock.call(
+                    '00:11:22:33:44:55',
+                    host='255.255.255.255',
+                    port=9,
+                    interface=None,
+                    family=socket.AF_UNSPEC,
+                ),
+                mock.call(
+                    '00:11:22:33:44:55',
+                    host='host.example',
+                    port=1337,
+                    interface=None,
+                    family=socket.AF_UNSPEC,
+                ),
                 mock.call(
                     '00:11:22:33:44:55',
                     host='host.example',
@@ -709,8 +3198,295 @@ class TestMain(unittest.TestCase):
                     interface=None,
                     family=socket.AF_UNSPEC,
                 ),
+                mock.call(
+                    '00:11:22:33:44:55',
+                    host='255.255.255.255',
+                    port=9,
+                    interface=None,
+                    family=socket.AF_UNSPEC,
+                ),
+            ],
+        )
+
+    @mock.patch('wakeonlan.wake')
+    def test_pacer(self, wake: mock.Mock) -> None:
+        """
+        Test if rate limiting options are passed to wake as a pacer.
+
+        """
+        with self.assertRaises(SystemExit), mock.patch('sys.stderr'):
+            main(['00:11:22:33:44:55', '--rate', '0'])
+        main(['00:11:22:33:44:55', '--rate', '100', '--burst', '10'])
+        pacer = wake.call_args.kwargs['pacer']
+        self.assertEqual((pacer.rate, pacer.burst, pacer.wave_size), (100, 10, None))
+        main(['00:11:22:33:44:55', '--wave-size', '50', '--wave-interval', '2'])
+        pacer = wake.call_args.kwargs['pacer']
+        self.assertEqual(
+            (pacer.rate, pacer.wave_size, pacer.wave_interval), (None, 50, 2)
+        )
+
+    @mock.patch('wakeonlan.wake')
+    def test_repeat(self, wake: mock.Mock) -> None:
+        """
+        Test if repeat options are passed to wake.
+
+        """
+        main(['00:11:22:33:44:55', '-r', '3', '--interval', '0.5', '--jitter', '0.1'])
+        self.assertEqual(
+            wake.call_args,
+            mock.call(
+                '00:11:22:33:44:55',
+                host='255.255.255.255',
+                port=9,
+                interface=None,
+                family=socket.AF_UNSPEC,
+                repeat=3,
+                interval=0.5,
+                jitter=0.1,
+            ),
+        )
+        with self.assertRaises(SystemExit), mock.patch('sys.stderr'):
+            main(['00:11:22:33:44:55', '--repeat', '0'])
+
+    @mock.patch('wakeonlan.wake')
+    def test_json(self, wake: mock.Mock) -> None:
+        """
+        Test if a JSON summary is printed.
+
+        """
+        result = WakeResult()
+        wake.return_value = result
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            main(['00:11:22:33:44:55', '--json'])
+        self.assertEqual(json.loads(stdout.getvalue()), result.summary())
+
+        result._add(
+            Destination(),
+            ['00:11:22:33:44:55'],
+            create_magic_packets(['00:11:22:33:44:55']),
+            0,
+            OSError('Failed'),
+        )
+        wake.side_effect = WakeError(result)
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            with self.assertRaises(SystemExit):
+                main(['00:11:22:33:44:55', '--json'])
+        self.assertEqual(json.loads(stdout.getvalue())['failed'], 1)
+        with self.assertRaises(WakeError):
+            main(['00:11:22:33:44:55'])
+
+    @mock.patch('wakeonlan.wake_many')
+    def test_targets(self, wake_many: mock.Mock) -> None:
+        """
+        Test if targets are read from a file.
+
+        """
+        received: list[list[tuple[str, Destination]]] = []
+
+        def wake_side_effect(
+            targets: Iterable[tuple[str, Destination]], **kwargs: object
+        ) -> mock.Mock:
+            received.append(list(targets))
+            return mock.Mock(ok=True, destination_errors={})
+
+        wake_many.side_effect = wake_side_effect
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as file:
+            file.write('00:11:22:33:44:55 10.0.0.0/8\n')
+            file.flush()
+            main(['-t', file.name, 'ffffffffffff', '-p', '7'])
+        self.assertEqual(
+            received,
+            [
+                [
+                    ('ffffffffffff', Destination('255.255.255.255', 7)),
+                    (
+                        '00:11:22:33:44:55',
+                        Destination('10.255.255.255', 9, None, socket.AF_INET),
+                    ),
+                ]
+            ],
+        )
+        with self.assertRaises(SystemExit), mock.patch('sys.stderr'):
+            main(['-t', '-', '-f', '-'])
+        self.assertIsNone(wake_many.call_args.kwargs['max_workers'])
+
+        wake_many.side_effect = None
+        wake_many.return_value = mock.Mock(
+            ok=False, destination_errors={Destination('10.0.0.1'): OSError('Failed')}
+        )
+        with (
+            mock.patch('sys.stdin', io.StringIO('')),
+            mock.patch('sys.stderr', new_callable=io.StringIO) as stderr,
+        ):
+            with self.assertRaises(SystemExit) as context:
+                main(['-t', '-', '-j', '4', '00:11:22:33:44:55'])
+        self.assertEqual(context.exception.code, 1)
+        self.assertEqual(stderr.getvalue(), '10.0.0.1 port 9: Failed\n')
+        self.assertEqual(wake_many.call_args.kwargs['max_workers'], 4)
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            with self.assertRaises(SystemExit):
+                main(['-j', '4', '00:11:22:33:44:55'])
+        self.assertIn(
+            '--max-workers can only be used with --targets', stderr.getvalue()
+        )
+
+    @mock.patch('wakeonlan.wake_stream')
+    def test_from_file(self, wake_stream: mock.Mock) -> None:
+        """
+        Test if mac addresses are streamed from a file or stdin.
+
+        """
+        received: list[list[str]] = []
+        wake_stream.side_effect = lambda macs, **kwargs: received.append(list(macs))
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as file:
+            file.write('00:11:22:33:44:55\n# comment\n66:77:88:99:aa:bb\n')
+            file.flush()
+            main(['-f', file.name, 'ffffffffffff'])
+        with mock.patch('sys.stdin', io.StringIO('00:11:22:33:44:55\n')):
+            main(['--from-file', '-', '-p', '1337'])
+        self.assertEqual(
+            received,
+            [
+                ['ffffffffffff', '00:11:22:33:44:55', '66:77:88:99:aa:bb'],
+                ['00:11:22:33:44:55'],
             ],
         )
+        self.assertEqual(wake_stream.call_args.kwargs['port'], 1337)
+
+    def test_from_file_json(self) -> None:
+        """
+        Test if a JSON summary is printed for mac addresses from a file.
+
+        """
+        macs = [f'{index:012x}' for index in range(1500)]
+        sock = mock.MagicMock()
+        sock.__enter__.return_value = sock
+        stdin = io.StringIO('\n'.join(macs))
+        with (
+            mock.patch('wakeonlan.create_socket', return_value=sock),
+            mock.patch('sys.stdin', stdin),
+            mock.patch('sys.stdout', new_callable=io.StringIO) as stdout,
+        ):
+            main(['-f', '-', '--json'])
+        summary = json.loads(stdout.getvalue())
+        self.assertEqual((summary['sent'], summary['failed']), (1500, 0))
+        self.assertLessEqual(set(summary), set(WakeResult().summary()))
+
+        sock.send.side_effect = [None] * 1030 + [OSError('Failed')]
+        stdin = io.StringIO('\n'.join(macs))
+        with (
+            mock.patch('wakeonlan.create_socket', return_value=sock),
+            mock.patch('sys.stdin', stdin),
+            mock.patch('sys.stdout', new_callable=io.StringIO) as stdout,
+        ):
+            with self.assertRaises(SystemExit) as context:
+                main(['-f', '-', '--json'])
+        self.assertEqual(context.exception.code, 1)
+        summary = json.loads(stdout.getvalue())
+        self.assertEqual((summary['sent'], summary['failed']), (1030, 470))
+        self.assertEqual(summary['failures'][0]['mac'], macs[1030])
+        self.assertEqual(summary['failures'][0]['error'], 'Failed')
+
+    @mock.patch('wakeonlan.wake')
+    def test_inventory(self, wake: mock.Mock) -> None:
+        """
+        Test if host names and tags are looked up in the inventory.
+
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/ethers'
+            with open(path, 'w') as file:
+                file.write('00:11:22:33:44:55 alpha @rack\n')
+                file.write('66:77:88:99:aa:bb beta @rack\n')
+            with mock.patch.dict('os.environ', {'XDG_CACHE_HOME': directory}):
+                main(['-i', path, 'ffffffffffff', '@rack'])
+                with mock.patch('sys.stderr', new_callable=io.StringIO):
+                    with self.assertRaises(SystemExit):
+                        main(['-i', path, 'gamma'])
+                    with self.assertRaises(SystemExit):
+                        main(['-i', f'{directory}/missing', 'alpha'])
+        self.assertEqual(
+            wake.call_args.args,
+            ('ffffffffffff', '00:11:22:33:44:55', '66:77:88:99:aa:bb'),
+        )
+
+    @mock.patch('wakeonlan.wake')
+    def test_ethernet(self, wake: mock.Mock) -> None:
+        """
+        Test if raw Ethernet frames are sent on the given interface.
+
+        """
+        main(['-e', 'veth0', '00:11:22:33:44:55'])
+        transport = wake.call_args.kwargs['transport']
+        self.assertIsInstance(transport, EthernetTransport)
+        self.assertEqual(transport.interface, 'veth0')
+        with mock.patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                main(['-e', 'veth0', '--server', '00:11:22:33:44:55'])
+
+    @mock.patch('wakeonlan.wake')
+    def test_ipv6_multicast(self, wake: mock.Mock) -> None:
+        """
+        Test if IPv6 defaults to the all nodes multicast group.
+
+        """
+        main(['00:11:22:33:44:55', '-6', '-n', 'eth0', '--hops', '2'])
+        wake.assert_called_once_with(
+            '00:11:22:33:44:55',
+            host='ff02::1',
+            port=9,
+            interface='eth0',
+            family=socket.AF_INET6,
+            hops=2,
+        )
+        # The link-local multicast group needs an interface to send on.
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            with self.assertRaises(SystemExit):
+                main(['00:11:22:33:44:55', '-6'])
+        self.assertIn('requires --interface', stderr.getvalue())
+
+    def test_ipv6_multicast_send(self) -> None:
+        """
+        Test if IPv6 magic packets reach the all nodes multicast group.
+
+        """
+        for index, name in socket.if_nameindex():
+            try:
+                create_socket(host=IPV6_ALL_NODES, interface=name).close()
+            except OSError:
+                continue
+            break
+        else:
+            self.skipTest('No network interface supports IPv6 multicast')
+        with socket.socket(socket.AF_INET6, socket.SOCK_DGRAM) as sock:
+            sock.bind(('::', 0))
+            sock.settimeout(1)
+            port = sock.getsockname()[1]
+            main(['133713371337', '-6', '-n', name, '-p', str(port)])
+            self.assertEqual(sock.recv(1024), create_magic_packet('133713371337'))
+
+    @mock.patch('wakeonlan.interfaces.wake_all_interfaces')
+    def test_all_interfaces(self, wake_all_interfaces: mock.Mock) -> None:
+        """
+        Test if magic packets are sent on all interfaces.
+
+        """
+        wake_all_interfaces.return_value = WakeResult()
+        main(['-a', '00:11:22:33:44:55', '-p', '7', '-r', '2'])
+        wake_all_interfaces.assert_called_once_with(
+            '00:11:22:33:44:55', port=7, repeat=2, interval=1.0, jitter=0.0
+        )
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            for argv in [
+                ['-a', '-o', 'example.com', '00:11:22:33:44:55'],
+                ['-a', '-t', '-', '00:11:22:33:44:55'],
+            ]:
+                with self.assertRaises(SystemExit):
+                    main(argv)
+            wake_all_interfaces.side_effect = OSError('No network interface')
+            with self.assertRaises(SystemExit):
+                main(['-a', '00:11:22:33:44:55'])
+        self.assertIn('No network interface', stderr.getvalue())
 
 
 if __name__ == '__main__':
@@ -4,18 +4,185 @@ Small module for use with the wake on lan protocol.
 
 """
 
-import argparse
+import array
+import bisect
+import contextlib
+import functools
+import itertools
+import math
+import operator
+import os
 import socket
-
-
-try:  # pragma: nocover
-    from warnings import deprecated
-except ImportError:  # pragma: nocover
-    from typing_extensions import deprecated
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, NamedTuple, overload
 
 
 BROADCAST_IP = '255.255.255.255'
 DEFAULT_PORT = 9
+#: The IPv6 multicast group of all nodes on the local network.
+IPV6_ALL_NODES = 'ff02::1'
+
+# The maximum number of messages the kernel accepts in a single sendmmsg call.
+_UIO_MAXIOV = 1024
+
+
+_MAGIC_PACKET_HEADER = b'\xff' * 6
+
+
+def _parse_hex6(value: str, message: str) -> bytes:
+    # The hexadecimal digits may be separated into groups of 2 or 4 digits
+    # using a consistent separator character.
+    length = len(value)
+    if length == 17:
+        separator = value[2]
+        if value[2::3] != separator * 5:
+            raise ValueError(message)
+        value = value.replace(separator, '')
+    elif length == 14:
+        separator = value[4]
+        if value[4::5] != separator * 2:
+            raise ValueError(message)
+        value = value.replace(separator, '')
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        raise ValueError(message) from None
+    # This also rejects whitespace, which bytes.fromhex() skips.
+    if len(raw) != 6:
+        raise ValueError(message)
+    return raw
+
+
+def parse_mac(macaddress: str) -> bytes:
+    """
+    Parse a mac address into its 6 byte binary form.
+
+    Args:
+        macaddress: The mac address to parse. The hexadecimal digits may be
+            separated into groups of 2 or 4 digits by any separator, for
+            example ``01:23:45:67:89:ab``, ``01-23-45-67-89-ab``,
+            ``0123.4567.89ab``, or not be separated at all.
+
+    Returns:
+        The 6 bytes of the mac address.
+
+    Raises:
+        ValueError: If the mac address is not valid.
+
+    """
+    return _parse_hex6(macaddress, 'Incorrect MAC address format')
+
+
+def _create_magic_packet(macaddress: str) -> bytes:
+    if '/' not in macaddress:
+        return (
+            _MAGIC_PACKET_HEADER
+            + _parse_hex6(macaddress, 'Incorrect MAC address format') * 16
+        )
+    macaddress, _, secureon = macaddress.partition('/')
+    packet = (
+        _MAGIC_PACKET_HEADER
+        + _parse_hex6(macaddress, 'Incorrect MAC address format') * 16
+    )
+    if secureon:
+        packet += _parse_hex6(secureon, 'Incorrect SecureOn password format')
+    return packet
+
+
+class PacketCache:
+    """
+    A cache of magic packets keyed by the mac address string they were created from.
+
+    This avoids parsing the same mac addresses over and over again when waking
+    the same computers repeatedly. The cache is used by
+    :func:`create_magic_packet`. It is disabled by default. Enable it by
+    configuring a positive ``maxsize``.
+
+    Args:
+        maxsize: The maximum number of packets to cache. If the cache is full,
+            the least recently used packet is discarded. If this is ``0``,
+            caching is disabled.
+
+    """
+
+    def __init__(self, *, maxsize: int = 0) -> None:
+        """
+        Create an empty cache.
+
+        """
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._packets: OrderedDict[str, bytes] = OrderedDict()
+        self.configure(maxsize=maxsize)
+
+    def __len__(self) -> int:
+        """
+        Get the number of cached packets.
+
+        """
+        return len(self._packets)
+
+    def configure(self, *, maxsize: int) -> None:
+        """
+        Change the cache settings.
+
+        Args:
+            maxsize: The maximum number of packets to cache.
+
+        """
+        if maxsize < 0:
+            raise ValueError('maxsize must not be negative')
+        self.maxsize = maxsize
+        with self._lock:
+            while len(self._packets) > maxsize:
+                self._packets.popitem(last=False)
+
+    def get(self, macaddress: str) -> bytes:
+        """
+        Get the magic packet for a mac address, creating it if needed.
+
+        Args:
+            macaddress: the mac address or a "mac address/secureon password"
+                tuple.
+
+        Returns:
+            The magic packet.
+
+        """
+        if not self.maxsize:
+            return _create_magic_packet(macaddress)
+
+        with self._lock:
+            packet = self._packets.get(macaddress)
+            if packet is not None:
+                self._packets.move_to_end(macaddress)
+                self.hits += 1
+                return packet
+            self.misses += 1
+
+        packet = _create_magic_packet(macaddress)
+        with self._lock:
+            self._packets[macaddress] = packet
+            while len(self._packets) > self.maxsize:
+                self._packets.popitem(last=False)
+        return packet
+
+    def clear(self) -> None:
+        """
+        Remove all cached packets.
+
+        """
+        with self._lock:
+            self._packets.clear()
+
+
+#: The packet cache used by :func:`create_magic_packet`.
+packet_cache = PacketCache()
 
 
 def create_magic_packet(macaddress: str) -> bytes:
@@ -31,30 +198,568 @@ def create_magic_packet(macaddress: str) -> bytes:
             that should be parsed into a magic packet.
 
     """
-    secureon = ''
-    if '/' in macaddress:
-        (macaddress, secureon) = macaddress.split('/')
+    if packet_cache.maxsize:
+        return packet_cache.get(macaddress)
+    return _create_magic_packet(macaddress)
+
+
+class MagicPackets(Sequence[memoryview]):
+    """
+    Magic packets stored back to back in a single contiguous buffer.
+
+    Items are zero-copy :class:`memoryview` slices of :attr:`buffer`. Use
+    :func:`create_magic_packets` to create an instance.
+
+    Args:
+        buffer: The buffer holding all packets.
+        offsets: The offset of each packet in the buffer, followed by the end
+            offset of the last packet. If all packets have the same size, this
+            is a :class:`range`.
+
+    """
+
+    __slots__ = ('buffer', 'offsets')
+
+    def __init__(self, buffer: bytearray, offsets: Sequence[int]) -> None:
+        """
+        Wrap a buffer holding magic packets.
+
+        """
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        """
+        Get the number of packets.
+
+        """
+        return len(self.offsets) - 1
+
+    @overload
+    def __getitem__(self, index: int) -> memoryview: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> 'MagicPackets': ...
 
-    if len(macaddress) == 17:
-        sep = macaddress[2]
-        macaddress = macaddress.replace(sep, '')
-    elif len(macaddress) == 14:
-        sep = macaddress[4]
-        macaddress = macaddress.replace(sep, '')
-    if len(macaddress) != 12:
+    def __getitem__(self, index: int | slice) -> 'memoryview | MagicPackets':
+        """
+        Get a packet as a memoryview, or a slice of packets sharing the buffer.
+
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('MagicPackets slices don’t support steps')
+            return MagicPackets(self.buffer, self.offsets[start : max(start, stop) + 1])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('MagicPackets index out of range')
+        return memoryview(self.buffer)[self.offsets[index] : self.offsets[index + 1]]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        """
+        Iterate over the packets as memoryviews.
+
+        """
+        view = memoryview(self.buffer)
+        offsets = self.offsets
+        for index in range(len(offsets) - 1):
+            yield view[offsets[index] : offsets[index + 1]]
+
+
+def _fill_magic_packets(
+    raw_macs: bytes | bytearray, secureons: bytes | bytearray = b''
+) -> MagicPackets:
+    # Write each byte column of all packets at once using strided slice
+    # assignment, so the work per packet happens in C rather than Python.
+    count = len(raw_macs) // 6
+    size = 108 if secureons else 102
+    buffer = bytearray(count * size)
+    buffer[0::size] = b'\xff' * count
+    for column in range(1, 6):
+        buffer[column::size] = buffer[0::size]
+    for column in range(6):
+        values = raw_macs[column::6]
+        for repetition in range(16):
+            buffer[6 + repetition * 6 + column :: size] = values
+        if secureons:
+            buffer[102 + column :: size] = secureons[column::6]
+    return MagicPackets(buffer, range(0, count * size + 1, size))
+
+
+def create_magic_packets(macs: Iterable[str] | Iterable[int]) -> MagicPackets:
+    """
+    Create magic packets for many mac addresses at once.
+
+    All packets are written into a single preallocated buffer. This is faster
+    and uses less memory than calling :func:`create_magic_packet` for each mac
+    address.
+
+    Args:
+        macs: The mac addresses or "mac address/secureon password" tuples to
+            create magic packets for. Alternatively mac addresses may be given
+            as 48-bit integers, for example as an :class:`array.array` of type
+            ``'Q'``.
+
+    Returns:
+        The magic packets in the same order as the given mac addresses.
+
+    """
+    if isinstance(macs, array.array):
+        integers = macs
+    else:
+        iterator = iter(macs)
+        first = next(iterator, None)
+        if not isinstance(first, int):
+            strings = itertools.chain([first], iterator) if first is not None else ()
+            return _create_magic_packets_from_strings(strings)  # type: ignore[arg-type]
+        try:
+            integers = array.array('Q', [first])
+            integers.extend(iterator)  # type: ignore[arg-type]
+        except (OverflowError, TypeError):
+            raise ValueError('Incorrect MAC address format') from None
+    if integers and (max(integers) >> 48 or min(integers) < 0):
         raise ValueError('Incorrect MAC address format')
+    words = array.array('Q', integers).tobytes()
+    # Each 8 byte word holds the 6 mac address bytes in big endian order.
+    if sys.byteorder == 'little':
+        columns = [words[5 - column :: 8] for column in range(6)]
+    else:  # pragma: nocover
+        columns = [words[2 + column :: 8] for column in range(6)]
+    raw_macs = bytearray(len(integers) * 6)
+    for column, values in enumerate(columns):
+        raw_macs[column::6] = values
+    return _fill_magic_packets(raw_macs)
 
-    if secureon:
-        if len(secureon) == 17:
-            sep = secureon[2]
-            secureon = secureon.replace(sep, '')
-        elif len(secureon) == 14:
-            sep = secureon[4]
-            secureon = secureon.replace(sep, '')
-        if len(secureon) != 12:
-            raise ValueError('Incorrect SecureOn password format')
 
-    return bytes.fromhex('F' * 12 + macaddress * 16 + secureon)
+def _create_magic_packets_from_strings(macs: Iterable[str]) -> MagicPackets:
+    parse = _parse_hex6
+    message = 'Incorrect MAC address format'
+    raw_macs = bytearray()
+    secureons = bytearray()
+    secureon_indexes = []
+    for index, mac in enumerate(macs):
+        if '/' in mac:
+            mac, _, secureon = mac.partition('/')
+            if secureon:
+                secureons += parse(secureon, 'Incorrect SecureOn password format')
+                secureon_indexes.append(index)
+        raw_macs += parse(mac, message)
+    count = len(raw_macs) // 6
+    if len(secureon_indexes) in (0, count):
+        return _fill_magic_packets(raw_macs, secureons)
+    # Packets with and without a SecureOn password have different sizes.
+    buffer = bytearray()
+    offsets = array.array('Q', [0])
+    secureon_offset = 0
+    with_secureon = set(secureon_indexes)
+    for index in range(count):
+        buffer += _MAGIC_PACKET_HEADER + raw_macs[index * 6 : index * 6 + 6] * 16
+        if index in with_secureon:
+            buffer += secureons[secureon_offset : secureon_offset + 6]
+            secureon_offset += 6
+        offsets.append(len(buffer))
+    return MagicPackets(buffer, offsets)
+
+
+_AddressInfo = tuple[
+    socket.AddressFamily,
+    socket.SocketKind,
+    int,
+    str,
+    tuple[str, int] | tuple[str, int, int, int] | tuple[int, bytes],
+]
+
+
+class ResolveCache:
+    """
+    A cache for :func:`socket.getaddrinfo` results.
+
+    Resolving a host name may require a DNS round trip. The cache is used by
+    :func:`create_socket` and therefore by :func:`wake` and :func:`main`. It
+    is disabled by default. Enable it by configuring a positive ``ttl``.
+
+    Args:
+        ttl: The number of seconds a resolution result is cached. If this is
+            ``0``, caching is disabled.
+        maxsize: The maximum number of results to cache. If the cache is full,
+            the least recently used result is discarded.
+
+    """
+
+    def __init__(self, *, ttl: float = 0, maxsize: int = 256) -> None:
+        """
+        Create an empty cache.
+
+        """
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[
+            tuple[str, int, socket.AddressFamily],
+            tuple[tuple[_AddressInfo, ...], float],
+        ] = OrderedDict()
+        self.configure(ttl=ttl, maxsize=maxsize)
+
+    def __len__(self) -> int:
+        """
+        Get the number of cached results.
+
+        """
+        return len(self._entries)
+
+    def configure(
+        self, *, ttl: float | None = None, maxsize: int | None = None
+    ) -> None:
+        """
+        Change the cache settings.
+
+        Args:
+            ttl: The number of seconds a resolution result is cached.
+            maxsize: The maximum number of results to cache.
+
+        """
+        if ttl is not None:
+            if ttl < 0:
+                raise ValueError('ttl must not be negative')
+            self.ttl = ttl
+        if maxsize is not None:
+            if maxsize < 1:
+                raise ValueError('maxsize must be at least 1')
+            self.maxsize = maxsize
+        with self._lock:
+            if not self.ttl:
+                self._entries.clear()
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def getaddrinfo(
+        self, host: str, port: int, family: socket.AddressFamily = socket.AF_UNSPEC
+    ) -> tuple[_AddressInfo, ...]:
+        """
+        Resolve a host name for sending datagrams, using the cache if enabled.
+
+        Args:
+            host: The host name to resolve.
+            port: The port to resolve.
+            family: The address family to resolve.
+
+        Returns:
+            The result of :func:`socket.getaddrinfo` as a tuple. Cached results
+            are shared between callers, so they can’t be modified.
+
+        """
+        if not self.ttl:
+            return tuple(socket.getaddrinfo(host, port, family, socket.SOCK_DGRAM))
+
+        key = (host, port, family)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        address_infos = tuple(socket.getaddrinfo(host, port, family, socket.SOCK_DGRAM))
+        with self._lock:
+            self._entries[key] = (address_infos, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return address_infos
+
+    def invalidate(self, host: str | None = None) -> None:
+        """
+        Remove cached results.
+
+        Args:
+            host: Only remove the results for this host name. If not specified,
+                all results are removed.
+
+        """
+        with self._lock:
+            if host is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == host]:
+                del self._entries[key]
+
+
+#: The resolve cache used by :func:`create_socket`.
+resolve_cache = ResolveCache()
+
+
+#: The events emitted by :data:`hooks`.
+EVENTS = ('parse', 'resolve', 'socket_open', 'send', 'error')
+
+
+class WakeEvent(NamedTuple):
+    """
+    Something that happened while waking computers.
+
+    """
+
+    #: One of :data:`EVENTS`.
+    name: str
+    #: The destination this event applies to. This is ``None`` for parsing.
+    destination: 'Destination | None'
+    #: The number of seconds the step took.
+    duration: float
+    #: The number of magic packets parsed or sent.
+    packets: int = 0
+    #: The error for ``error`` events.
+    error: OSError | None = None
+
+
+class Hooks:
+    """
+    A registry of callbacks which are called for :class:`WakeEvent` events.
+
+    The send pipeline checks :attr:`active` before doing any work for the
+    hooks, so there is no measurable overhead while no callbacks are
+    registered. Events are emitted per step, never per magic packet. A
+    ``send`` event is emitted for each round of packets sent to a
+    destination.
+
+    Callbacks may be called from multiple threads at once, for example by
+    :func:`wake_many`. Exceptions raised by callbacks are propagated.
+
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a registry without any callbacks.
+
+        """
+        self.active = False
+        self._callbacks: dict[str, tuple[Callable[[WakeEvent], object], ...]] = {
+            event: () for event in EVENTS
+        }
+
+    def register(
+        self,
+        callback: Callable[[WakeEvent], object],
+        events: Iterable[str] = EVENTS,
+    ) -> None:
+        """
+        Register a callback.
+
+        Args:
+            callback: The function to call with each event.
+            events: The names of the events to call the callback for. By
+                default the callback is called for all events.
+
+        """
+        events = list(events)
+        for event in events:
+            if event not in self._callbacks:
+                raise ValueError(f'Unknown event: {event}')
+        # Callbacks are stored in tuples, so emit() needs no lock.
+        for event in events:
+            self._callbacks[event] += (callback,)
+        self.active = True
+
+    def unregister(self, callback: Callable[[WakeEvent], object]) -> None:
+        """
+        Remove a callback from all events it was registered for.
+
+        Args:
+            callback: The callback to remove.
+
+        """
+        for event, callbacks in self._callbacks.items():
+            self._callbacks[event] = tuple(c for c in callbacks if c != callback)
+        self.active = any(self._callbacks.values())
+
+    def emit(self, event: WakeEvent) -> None:
+        """
+        Call the callbacks registered for an event.
+
+        Args:
+            event: The event to emit.
+
+        """
+        for callback in self._callbacks[event.name]:
+            callback(event)
+
+
+#: The hooks called by :func:`create_socket`, :func:`wake` and friends.
+hooks = Hooks()
+
+
+class Histogram:
+    """
+    A histogram of durations using fixed, exponentially growing buckets.
+
+    There are four buckets per power of ten, from one microsecond up to ten
+    seconds. Durations over ten seconds are counted in an overflow bucket.
+
+    """
+
+    #: The upper bound of each bucket in seconds.
+    BOUNDS = tuple(10 ** (exponent / 4) for exponent in range(-24, 5))
+
+    __slots__ = ('buckets', 'count', 'total')
+
+    def __init__(self) -> None:
+        """
+        Create an empty histogram.
+
+        """
+        self.buckets = array.array('Q', bytes(8 * (len(self.BOUNDS) + 1)))
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, duration: float) -> None:
+        """
+        Add a duration to the histogram.
+
+        Args:
+            duration: The number of seconds to add.
+
+        """
+        self.buckets[bisect.bisect_left(self.BOUNDS, duration)] += 1
+        self.count += 1
+        self.total += duration
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile of the observed durations.
+
+        Args:
+            q: The quantile to estimate, between 0 and 1.
+
+        Returns:
+            The upper bound of the bucket containing the quantile, or
+            ``math.inf`` if it’s in the overflow bucket. If nothing was
+            observed, this is ``0.0``.
+
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, cumulative in zip(self.BOUNDS, itertools.accumulate(self.buckets)):
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+
+class Metrics:
+    """
+    Counters and latency histograms, collected from :class:`WakeEvent` events.
+
+    Register an instance to start collecting:
+
+    .. code-block:: python
+
+        metrics = Metrics()
+        hooks.register(metrics)
+
+    """
+
+    def __init__(self) -> None:
+        """
+        Create metrics with all counters at zero.
+
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Reset all counters and histograms to zero.
+
+        """
+        with self._lock:
+            #: The number of times each event was emitted.
+            self.events = dict.fromkeys(EVENTS, 0)
+            #: The number of magic packets parsed.
+            self.packets_parsed = 0
+            #: The number of magic packets sent.
+            self.packets_sent = 0
+            #: The durations per event, except for ``error``.
+            self.histograms = {
+                event: Histogram() for event in EVENTS if event != 'error'
+            }
+
+    def __call__(self, event: WakeEvent) -> None:
+        """
+        Collect an event.
+
+        Args:
+            event: The event to add to the counters and histograms.
+
+        """
+        with self._lock:
+            self.events[event.name] += 1
+            if event.name == 'error':
+                return
+            if event.name == 'parse':
+                self.packets_parsed += event.packets
+            elif event.name == 'send':
+                self.packets_sent += event.packets
+            self.histograms[event.name].observe(event.duration)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Get the current values, for example to export them to monitoring.
+
+        Returns:
+            A dict with the event counts, the number of
+            packets parsed and sent, and the count, total, median and 99th
+            percentile duration per event.
+
+        """
+        with self._lock:
+            return {
+                'events': dict(self.events),
+                'packets_parsed': self.packets_parsed,
+                'packets_sent': self.packets_sent,
+                'latency': {
+                    event: {
+                        'count': histogram.count,
+                        'total': histogram.total,
+                        'p50': histogram.quantile(0.5),
+                        'p99': histogram.quantile(0.99),
+                    }
+                    for event, histogram in self.histograms.items()
+                },
+            }
+
+
+def _interface_index(interface: str) -> int | None:
+    if interface.isdigit():
+        return int(interface)
+    try:
+        return socket.if_nametoindex(interface)
+    except OSError:
+        # This is an ip address rather than an interface name.
+        return None
+
+
+def _prepare_multicast(
+    sock: socket.socket,
+    addr: tuple[Any, ...],
+    interface: str | None,
+    hops: int | None,
+) -> tuple[Any, ...]:
+    # IPv6 multicast packets are sent on a single interface, which is chosen
+    # by index. Connecting to a link local group fails without one.
+    host, port, flowinfo, scope_id = addr
+    if interface:
+        index = _interface_index(interface)
+        if index is None:
+            sock.bind((interface, 0))
+        else:
+            scope_id = index
+    if scope_id:
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, scope_id)
+    if hops is not None:
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, hops)
+    return (host.partition('%')[0], port, flowinfo, scope_id)
 
 
 def create_socket(
@@ -63,53 +768,1073 @@ def create_socket(
     port: int = DEFAULT_PORT,
     interface: str | None = None,
     family: socket.AddressFamily = socket.AF_UNSPEC,
+    hops: int | None = None,
 ) -> socket.socket:
     """
     Create a socket that’s suitable for sending magic packets.
 
     Args:
-        host: The hostname to connect to.
+        host: The hostname to connect to. This may be an IPv6 multicast
+            group, such as :data:`IPV6_ALL_NODES`.
         port: The port to connect to.
-        interface: The IP address of the network adapter to use.
+        interface: The IP address of the network adapter to use. For IPv6
+            multicast this may also be the name or index of the network
+            interface to send on.
         family: The address family to send the magic packet to. Use this
             to force the use of IPv4 or IPv6. The default is to auto detect.
+        hops: The hop limit of IPv6 multicast packets. Defaults to the system
+            default, which is 1.
 
     Returns:
         A socket you can use for sending magic packets.
 
     """
+    if hops is not None and not 0 <= hops <= 255:
+        raise ValueError('hops must be between 0 and 255')
     # This is based on the example for a connection that supports both IPv4
     # and IPv6 in https://docs.python.org/3/library/socket.html#example
     # This also matches the getaddrinfo man page, which states applications
     # should try using the addresses in order.
     # https://man7.org/linux/man-pages/man3/getaddrinfo.3.html
-    address_infos = socket.getaddrinfo(host, port, family, socket.SOCK_DGRAM)
+    active = hooks.active
+    if active:
+        destination = Destination(host, port, interface, family, hops)
+        start = time.perf_counter()
+    try:
+        address_infos = resolve_cache.getaddrinfo(host, port, family)
+    except OSError as error:
+        if active:
+            duration = time.perf_counter() - start
+            hooks.emit(WakeEvent('error', destination, duration, error=error))
+        raise
+    if active:
+        now = time.perf_counter()
+        hooks.emit(WakeEvent('resolve', destination, now - start))
+        start = now
     sock: socket.socket | None = None
     for index, (family, type, proto, canonname, addr) in enumerate(address_infos, 1):
         try:  # pragma: nocover
             sock = socket.socket(family, type, proto)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            if interface:
-                sock.bind((interface, 0))
+            address = addr[0]
+            if (
+                family == socket.AF_INET6
+                and isinstance(address, str)
+                and address[:2].lower() == 'ff'
+            ):
+                addr = _prepare_multicast(sock, addr, interface, hops)
+            else:
+                if family == socket.AF_INET:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                if interface:
+                    sock.bind((interface, 0))
             sock.connect(addr)
             break
-        except OSError:  # pragma: nocover
+        except OSError as error:  # pragma: nocover
             if sock:
                 sock.close()
             sock = None
             if index == len(address_infos):
+                if active:
+                    duration = time.perf_counter() - start
+                    hooks.emit(WakeEvent('error', destination, duration, error=error))
                 raise
     assert sock, 'sock should be defined at this point'
+    if active:
+        hooks.emit(WakeEvent('socket_open', destination, time.perf_counter() - start))
     return sock
 
 
+@functools.cache
+def _load_sendmmsg() -> (
+    Callable[[socket.socket, Sequence[bytes] | MagicPackets], int] | None
+):
+    """
+    Look up a ``sendmmsg`` implementation for the current platform.
+
+    CPython doesn’t expose ``sendmmsg``, so on Linux it’s called from libc
+    using :mod:`ctypes`. On other platforms ``None`` is returned.
+
+    """
+    if not sys.platform.startswith('linux'):  # pragma: nocover
+        return None
+
+    import ctypes
+
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc_sendmmsg = libc.sendmmsg
+    except (AttributeError, OSError):  # pragma: nocover
+        return None
+
+    class MsgHdr(ctypes.Structure):
+        _fields_ = [
+            ('msg_name', ctypes.c_void_p),
+            ('msg_namelen', ctypes.c_uint32),
+            ('msg_iov', ctypes.c_void_p),
+            ('msg_iovlen', ctypes.c_size_t),
+            ('msg_control', ctypes.c_void_p),
+            ('msg_controllen', ctypes.c_size_t),
+            ('msg_flags', ctypes.c_int),
+        ]
+
+    class MMsgHdr(ctypes.Structure):
+        _fields_ = [
+            ('msg_hdr', MsgHdr),
+            ('msg_len', ctypes.c_uint),
+        ]
+
+    libc_sendmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(MMsgHdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+    ]
+    libc_sendmmsg.restype = ctypes.c_int
+
+    # Fill the message headers using strided array assignment rather than
+    # setting structure fields one packet at a time, which would make the
+    # batched path slower than calling send() in a loop.
+    word = ctypes.sizeof(ctypes.c_void_p)
+    message_words = ctypes.sizeof(MMsgHdr) // word
+    iov_word = MsgHdr.msg_iov.offset // word
+    iovlen_word = MsgHdr.msg_iovlen.offset // word
+    array_type = {4: 'I', 8: 'Q'}[word]
+
+    def sendmmsg(sock: socket.socket, packets: Sequence[bytes] | MagicPackets) -> int:
+        count = len(packets)
+        if isinstance(packets, MagicPackets):
+            # The packets are already contiguous, so they can be sent in place.
+            buffer: ctypes.Array[ctypes.c_char] = (
+                ctypes.c_char * len(packets.buffer)
+            ).from_buffer(packets.buffer)
+            offsets = packets.offsets
+        else:
+            # Copy all packets into a single buffer, so only one allocation is
+            # needed regardless of the number of packets.
+            buffer = ctypes.create_string_buffer(b''.join(packets))
+            offsets = array.array(
+                'Q', itertools.accumulate(map(len, packets), initial=0)
+            )
+        address = ctypes.addressof(buffer)
+        iovecs = array.array(array_type, bytes(2 * word * count))
+        iovecs[0::2] = array.array(array_type, map(address.__add__, offsets[:-1]))
+        iovecs[1::2] = array.array(
+            array_type, map(operator.sub, offsets[1:], offsets[:-1])
+        )
+        iovecs_address = iovecs.buffer_info()[0]
+        messages = array.array(array_type, bytes(message_words * word * count))
+        messages[iov_word::message_words] = array.array(
+            array_type,
+            range(iovecs_address, iovecs_address + 2 * word * count, 2 * word),
+        )
+        messages[iovlen_word::message_words] = array.array(array_type, [1]) * count
+        sent: int = libc_sendmmsg(
+            sock.fileno(),
+            ctypes.cast(messages.buffer_info()[0], ctypes.POINTER(MMsgHdr)),
+            count,
+            0,
+        )
+        if sent < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return sent
+
+    return sendmmsg
+
+
+def send_packets(
+    sock: socket.socket, packets: Sequence[bytes] | MagicPackets
+) -> list[int]:
+    """
+    Send magic packets over a connected socket using as few system calls as possible.
+
+    If the platform supports ``sendmmsg``, up to 1024 packets are sent per
+    system call. Otherwise every packet is sent using :meth:`socket.socket.send`.
+
+    Args:
+        sock: A connected socket, for example one created by
+            :func:`create_socket`.
+        packets: The magic packets to send. Packets created by
+            :func:`create_magic_packets` are sent without being copied.
+
+    Returns:
+        The number of packets sent by each system call.
+
+    """
+    try:
+        return _send_batches(sock, packets)
+    except _PartialSendError as partial:
+        raise partial.error from None
+
+
+def _send_batches(
+    sock: socket.socket, packets: Sequence[bytes] | MagicPackets
+) -> list[int]:
+    # Like send_packets(), but if sending fails the number of packets which
+    # were sent before is raised along with the error.
+    sendmmsg = _load_sendmmsg()
+    counts: list[int] = []
+    offset = 0
+    try:
+        if sendmmsg is None:  # pragma: nocover
+            for packet in packets:
+                sock.send(packet)
+                counts.append(1)
+            return counts
+
+        while offset < len(packets):
+            sent = sendmmsg(sock, packets[offset : offset + _UIO_MAXIOV])
+            counts.append(sent)
+            offset += sent
+    except OSError as error:
+        raise _PartialSendError(sum(counts), error) from error
+    return counts
+
+
+class PacketTemplate:
+    """
+    A single magic packet buffer which is reused for every mac address.
+
+    The header and the SecureOn password are written once. For each mac
+    address only the 16 repetitions are patched in place through a
+    :class:`memoryview`, so sending doesn’t allocate memory per packet. This
+    keeps memory use constant no matter how many computers are woken, unlike
+    :func:`create_magic_packets`, which builds all packets up front.
+
+    Args:
+        secureon: The SecureOn password to append to every packet.
+
+    Raises:
+        ValueError: If the SecureOn password is invalid.
+
+    """
+
+    def __init__(self, secureon: str | None = None) -> None:
+        """
+        Create the template, with the mac address still zeroed.
+
+        """
+        size = 102
+        if secureon:
+            size = 108
+        self.buffer = bytearray(_MAGIC_PACKET_HEADER + bytes(size - 6))
+        if secureon:
+            self.buffer[102:] = _parse_hex6(
+                secureon, 'Incorrect SecureOn password format'
+            )
+        view = memoryview(self.buffer)
+        self._view = view
+        self._mac = slice(6, 12)
+        # Fill the 16 repetitions by doubling the ones written so far. The
+        # slices and source views are created once, so patching a packet
+        # creates no objects.
+        self._copies = [
+            (slice(6 + length, 6 + 2 * length), view[6 : 6 + length])
+            for length in (6, 12, 24, 48)
+        ]
+
+    def fill(self, mac: bytes | bytearray | memoryview) -> memoryview:
+        """
+        Write a mac address into the packet.
+
+        Args:
+            mac: The mac address as 6 bytes, for example as returned by
+                :func:`parse_mac`.
+
+        Returns:
+            A view of the packet. It’s overwritten by the next call.
+
+        Raises:
+            ValueError: If the mac address isn’t 6 bytes long.
+
+        """
+        view = self._view
+        view[self._mac] = mac
+        for target, source in self._copies:
+            view[target] = source
+        return view
+
+    def send(
+        self, sock: socket.socket, macs: Iterable[bytes | bytearray | memoryview]
+    ) -> None:
+        """
+        Send a magic packet for each mac address over a connected socket.
+
+        Every packet is sent using :meth:`socket.socket.send` as soon as it’s
+        patched. Use :func:`send_packets` with :func:`create_magic_packets` to
+        send many packets using fewer system calls instead.
+
+        Args:
+            sock: A connected socket, for example one created by
+                :func:`create_socket`.
+            macs: The mac addresses as 6 bytes each, for example as returned
+                by :func:`parse_mac`.
+
+        """
+        view = self._view
+        mac_slot = self._mac
+        copies = self._copies
+        send = sock.send
+        for mac in macs:
+            view[mac_slot] = mac
+            for target, source in copies:
+                view[target] = source
+            send(view)
+
+
+# Waits shorter than this are spun rather than slept, because sleeping is too
+# coarse to pace thousands of packets per second accurately.
+_SPIN_THRESHOLD = 0.002
+
+
+class Pacer:
+    """
+    Limit the rate at which magic packets are sent.
+
+    Sending thousands of magic packets back to back may overrun switch buffers,
+    and waking all computers at once may trip breakers. A pacer supports two
+    strategies, which may be combined.
+
+    A token bucket limits the sustained rate to ``rate`` packets per second,
+    while allowing bursts of up to ``burst`` packets.
+
+    Waves send ``wave_size`` packets at once, and then wait until
+    ``wave_interval`` seconds after the start of the wave before sending the
+    next wave.
+
+    Args:
+        rate: The maximum number of packets per second.
+        burst: The maximum number of packets to send at once when using
+            ``rate``.
+        wave_size: The number of packets per wave.
+        wave_interval: The number of seconds between the start of two waves.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float | None = None,
+        burst: int = 1,
+        wave_size: int | None = None,
+        wave_interval: float = 0.0,
+    ) -> None:
+        """
+        Create a pacer which hasn’t sent any packets yet.
+
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+        if wave_size is not None and wave_size < 1:
+            raise ValueError('wave_size must be at least 1')
+        if wave_interval < 0:
+            raise ValueError('wave_interval must not be negative')
+        self.rate = rate
+        self.burst = burst
+        self.wave_size = wave_size
+        self.wave_interval = wave_interval
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated: float | None = None
+        self._wave_start: float | None = None
+        self._wave_count = 0
+
+    @property
+    def chunk_size(self) -> int:
+        """
+        The maximum number of packets that may be acquired at once.
+
+        """
+        sizes = []
+        if self.rate is not None:
+            sizes.append(self.burst)
+        if self.wave_size is not None:
+            sizes.append(self.wave_size)
+        return min(sizes, default=_UIO_MAXIOV)
+
+    @staticmethod
+    def _wait_until(deadline: float) -> None:
+        remaining = deadline - time.perf_counter()
+        if remaining > _SPIN_THRESHOLD:
+            time.sleep(remaining - _SPIN_THRESHOLD)
+        while time.perf_counter() < deadline:
+            pass
+
+    def acquire(self, count: int = 1) -> None:
+        """
+        Block until ``count`` packets may be sent.
+
+        Args:
+            count: The number of packets that will be sent. This may not
+                exceed :attr:`chunk_size`.
+
+        """
+        if count > self.chunk_size:
+            raise ValueError(f'count must not exceed {self.chunk_size}')
+        with self._lock:
+            if self.wave_size is not None:
+                now = time.perf_counter()
+                if self._wave_start is None:
+                    self._wave_start = now
+                elif self._wave_count + count > self.wave_size:
+                    deadline = self._wave_start + self.wave_interval
+                    self._wait_until(deadline)
+                    self._wave_start = max(deadline, now)
+                    self._wave_count = 0
+                self._wave_count += count
+
+            if self.rate is not None:
+                now = time.perf_counter()
+                if self._updated is not None:
+                    self._tokens = min(
+                        self.burst, self._tokens + (now - self._updated) * self.rate
+                    )
+                self._updated = now
+                if self._tokens < count:
+                    deadline = now + (count - self._tokens) / self.rate
+                    self._wait_until(deadline)
+                    # Refill from the deadline rather than the actual wake up
+                    # time, so oversleeping doesn’t lower the rate.
+                    self._tokens = count
+                    self._updated = deadline
+                self._tokens -= count
+
+
+class Destination(NamedTuple):
+    """
+    Where to send magic packets to.
+
+    The fields have the same meaning as the keyword arguments of :func:`wake`.
+
+    """
+
+    host: str = BROADCAST_IP
+    port: int = DEFAULT_PORT
+    interface: str | None = None
+    family: socket.AddressFamily = socket.AF_UNSPEC
+    hops: int | None = None
+
+    @classmethod
+    def parse(
+        cls,
+        value: str,
+        *,
+        port: int = DEFAULT_PORT,
+        interface: str | None = None,
+    ) -> 'Destination':
+        """
+        Create a destination from a host name, ip address, or IPv4 subnet.
+
+        A subnet in CIDR notation, such as ``192.168.1.0/24``, is translated
+        into its directed broadcast address.
+
+        Args:
+            value: The host name, ip address, or subnet.
+            port: The port to send magic packets to.
+            interface: The ip address of the network adapter to use.
+
+        Returns:
+            The parsed destination.
+
+        """
+        if '/' in value:
+            import ipaddress
+
+            network = ipaddress.ip_network(value, strict=False)
+            if not isinstance(network, ipaddress.IPv4Network):
+                raise ValueError('Only IPv4 subnets have a broadcast address')
+            return cls(
+                str(network.broadcast_address),
+                port,
+                interface,
+                socket.AF_INET,
+            )
+        return cls(value, port, interface)
+
+
+class Transport:
+    """
+    How magic packets are sent to a destination.
+
+    This base class sends the magic packets as UDP datagrams using
+    :func:`create_socket`. Subclasses may send them differently, for example
+    :class:`wakeonlan.ethernet.EthernetTransport` sends raw Ethernet frames.
+
+    """
+
+    def open(self, destination: Destination) -> socket.socket:
+        """
+        Open a socket to send magic packets to a destination.
+
+        Args:
+            destination: Where to send the magic packets.
+
+        Returns:
+            A socket the messages returned by :meth:`frame` can be sent over
+            using :meth:`socket.socket.send` or :func:`send_packets`.
+
+        """
+        return create_socket(**destination._asdict())
+
+    def frame(self, sock: socket.socket, packets: MagicPackets) -> MagicPackets:
+        """
+        Create the messages to send over a socket opened by :meth:`open`.
+
+        The messages are created once, before the first packet is sent, so
+        repetitions send the same buffer again.
+
+        Args:
+            sock: The socket the messages are sent over.
+            packets: The magic packets to send.
+
+        Returns:
+            The messages, in the same order as the magic packets. UDP sends
+            the magic packets as they are.
+
+        """
+        return packets
+
+
+class MacResult(NamedTuple):
+    """
+    The outcome of waking a single mac address.
+
+    """
+
+    #: The mac address as it was given.
+    mac: str
+    #: Where the magic packet was sent to.
+    destination: Destination
+    #: The number of bytes sent for this mac address, including repetitions.
+    bytes_sent: int
+    #: The error that prevented the magic packet from being sent, if any.
+    error: OSError | None
+
+
+class WakeResult:
+    """
+    The outcome of waking many mac addresses.
+
+    The per mac address data is stored in compact arrays. Iterate over the
+    result or index it to get :class:`MacResult` objects.
+
+    A mac address counts as sent if its magic packet was sent as many times
+    as requested using ``repeat``. If a repetition fails, the mac address
+    counts as failed, and :attr:`MacResult.bytes_sent` tells how much of it
+    was sent.
+
+    """
+
+    __slots__ = (
+        'macs',
+        'destinations',
+        'destination_indexes',
+        'bytes_sent',
+        'errors',
+        'duplicates',
+        'suppressed',
+        'parse_time',
+        'resolve_time',
+        'send_time',
+    )
+
+    def __init__(self) -> None:
+        """
+        Create an empty result.
+
+        """
+        #: The mac addresses, grouped by destination.
+        self.macs: list[str] = []
+        #: The unique destinations.
+        self.destinations: list[Destination] = []
+        #: The index in :attr:`destinations` per mac address.
+        self.destination_indexes = array.array('I')
+        #: The number of bytes sent per mac address.
+        self.bytes_sent = array.array('Q')
+        #: The errors of mac addresses which weren’t sent by index.
+        self.errors: dict[int, OSError] = {}
+        #: The number of mac addresses skipped, because they were given more
+        #: than once.
+        self.duplicates = 0
+        #: The number of mac addresses skipped, because they were woken
+        #: recently. See :class:`RecentWakes`.
+        self.suppressed = 0
+        #: The number of seconds spent parsing mac addresses.
+        self.parse_time = 0.0
+        #: The number of seconds spent resolving hosts and creating sockets.
+        self.resolve_time = 0.0
+        #: The number of seconds spent sending magic packets.
+        self.send_time = 0.0
+
+    def __len__(self) -> int:
+        """
+        Get the number of mac addresses.
+
+        """
+        return len(self.macs)
+
+    def __getitem__(self, index: int) -> MacResult:
+        """
+        Get the result of the mac address at the given index.
+
+        """
+        if index < 0:
+            index += len(self)
+        return MacResult(
+            self.macs[index],
+            self.destinations[self.destination_indexes[index]],
+            self.bytes_sent[index],
+            self.errors.get(index),
+        )
+
+    def __iter__(self) -> Iterator[MacResult]:
+        """
+        Iterate over the result of each mac address.
+
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        """
+        Show how many mac addresses were sent and failed.
+
+        """
+        return f'<WakeResult sent={len(self) - len(self.errors)} failed={len(self.errors)}>'
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether all magic packets were sent.
+
+        """
+        return not self.errors
+
+    @property
+    def failed(self) -> list[str]:
+        """
+        The mac addresses whose magic packets weren’t sent.
+
+        """
+        return [self.macs[index] for index in sorted(self.errors)]
+
+    @property
+    def destination_errors(self) -> dict[Destination, OSError]:
+        """
+        The errors per destination.
+
+        """
+        return {
+            self.destinations[self.destination_indexes[index]]: error
+            for index, error in self.errors.items()
+        }
+
+    def _add(
+        self,
+        destination: Destination,
+        macs: list[str],
+        packets: MagicPackets,
+        sent: int,
+        error: OSError | None,
+        repeat: int = 1,
+    ) -> None:
+        # Packets are always sent in order, round after round, so the number
+        # of packets sent for each mac address follows from the total.
+        count = len(macs)
+        start = len(self.macs)
+        self.macs.extend(macs)
+        self.destination_indexes.extend(
+            array.array('I', [len(self.destinations)]) * count
+        )
+        self.destinations.append(destination)
+        rounds, remainder = divmod(sent, count) if count else (0, 0)
+        offsets = packets.offsets
+        sizes = array.array('Q', map(operator.sub, offsets[1:], offsets[:-1]))
+        bytes_sent = array.array(
+            'Q', map(operator.mul, sizes, itertools.repeat(rounds))
+        )
+        bytes_sent[:remainder] = array.array(
+            'Q', map(operator.add, bytes_sent[:remainder], sizes[:remainder])
+        )
+        self.bytes_sent.extend(bytes_sent)
+        if error is not None:
+            # The mac addresses sent in the interrupted round only got all
+            # their repetitions if it was the last round.
+            first = remainder if rounds + 1 == repeat else 0
+            for index in range(start + first, start + count):
+                self.errors[index] = error
+
+    def _merge(self, other: 'WakeResult') -> None:
+        offset = len(self.macs)
+        destination_offset = len(self.destinations)
+        self.macs.extend(other.macs)
+        self.destinations.extend(other.destinations)
+        self.destination_indexes.extend(
+            array.array(
+                'I',
+                map(
+                    destination_offset.__add__,
+                    other.destination_indexes,
+                ),
+            )
+        )
+        self.bytes_sent.extend(other.bytes_sent)
+        for index, error in other.errors.items():
+            self.errors[offset + index] = error
+        self.duplicates += other.duplicates
+        self.suppressed += other.suppressed
+        self.parse_time += other.parse_time
+        self.resolve_time += other.resolve_time
+        self.send_time += other.send_time
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Summarize the result as JSON serializable data.
+
+        Returns:
+            The number of sent, failed and skipped mac addresses, the bytes
+            sent, the timings, and details of each failed mac address.
+
+        """
+        return {
+            'sent': len(self) - len(self.errors),
+            'failed': len(self.errors),
+            'duplicates': self.duplicates,
+            'suppressed': self.suppressed,
+            'bytes_sent': sum(self.bytes_sent),
+            'parse_time': self.parse_time,
+            'resolve_time': self.resolve_time,
+            'send_time': self.send_time,
+            'failures': [
+                {
+                    'mac': mac.mac,
+                    'host': mac.destination.host,
+                    'port': mac.destination.port,
+                    'interface': mac.destination.interface,
+                    'error': str(mac.error),
+                }
+                for mac in map(self.__getitem__, sorted(self.errors))
+            ],
+        }
+
+
+class WakeError(OSError):
+    """
+    Raised if magic packets couldn’t be sent.
+
+    Args:
+        result: The result up to the point of failure.
+
+    """
+
+    def __init__(self, result: WakeResult) -> None:
+        """
+        Create the error from the first error in the result.
+
+        """
+        error = next(iter(result.errors.values()))
+        if error.errno is None:
+            super().__init__(str(error))
+        else:
+            super().__init__(error.errno, error.strerror)
+        #: The result up to the point of failure.
+        self.result = result
+
+
+class RecentWakes:
+    """
+    Remember which magic packets were sent recently, so they aren’t sent again.
+
+    Pass an instance as ``recent`` to :func:`wake`, :func:`wake_many` or
+    :meth:`WakeSender.wake`. A magic packet which was sent to the same
+    destination less than ``window`` seconds ago is skipped, and counted in
+    :attr:`WakeResult.suppressed`. Magic packets are compared in their binary
+    form, so mac addresses match regardless of their notation. Magic packets
+    which fail to send are forgotten, so they can be retried right away.
+
+    Args:
+        window: The number of seconds during which a magic packet isn’t sent
+            to the same destination again.
+
+    """
+
+    def __init__(self, window: float) -> None:
+        """
+        Create an instance which hasn’t seen any magic packets yet.
+
+        """
+        if window < 0:
+            raise ValueError('window must not be negative')
+        self.window = window
+        self._lock = threading.Lock()
+        # Entries are never updated, so they are ordered by time.
+        self._sent: dict[tuple[bytes, Destination], float] = {}
+
+    def __len__(self) -> int:
+        """
+        Get the number of magic packets remembered.
+
+        """
+        return len(self._sent)
+
+    def claim(
+        self, packets: Iterable[bytes | memoryview], destination: Destination
+    ) -> list[bool]:
+        """
+        Record magic packets as sent, unless they were sent recently.
+
+        Args:
+            packets: The magic packets about to be sent.
+            destination: Where the magic packets are sent to.
+
+        Returns:
+            Per magic packet whether it should be sent.
+
+        """
+        now = time.monotonic()
+        claimed = []
+        with self._lock:
+            while self._sent:
+                key, sent = next(iter(self._sent.items()))
+                if now - sent < self.window:
+                    break
+                del self._sent[key]
+            for packet in packets:
+                key = (bytes(packet), destination)
+                if key in self._sent:
+                    claimed.append(False)
+                else:
+                    self._sent[key] = now
+                    claimed.append(True)
+        return claimed
+
+    def release(
+        self, packets: Iterable[bytes | memoryview], destination: Destination
+    ) -> None:
+        """
+        Forget that magic packets were sent.
+
+        Args:
+            packets: The magic packets to forget.
+            destination: Where the magic packets were sent to.
+
+        """
+        with self._lock:
+            for packet in packets:
+                self._sent.pop((bytes(packet), destination), None)
+
+
+def _deduplicate(
+    result: WakeResult,
+    destination: Destination,
+    macs: list[str],
+    packets: MagicPackets,
+    *,
+    deduplicate: bool,
+    recent: RecentWakes | None,
+) -> tuple[list[str], MagicPackets]:
+    if not deduplicate and recent is None:
+        return macs, packets
+    keep: Iterable[int] = range(len(packets))
+    if deduplicate:
+        first: dict[bytes, int] = {}
+        for index, packet in enumerate(packets):
+            first.setdefault(packet.tobytes(), index)
+        result.duplicates += len(packets) - len(first)
+        keep = first.values()
+    keep = list(keep)
+    if recent is not None:
+        claimed = recent.claim(map(packets.__getitem__, keep), destination)
+        result.suppressed += claimed.count(False)
+        keep = list(itertools.compress(keep, claimed))
+    if len(keep) == len(macs):
+        return macs, packets
+    # Duplicates are rare, so parsing the remaining mac addresses again is
+    # simpler than copying their magic packets.
+    macs = [macs[index] for index in keep]
+    return macs, create_magic_packets(macs)
+
+
+def _release_failed(result: WakeResult, recent: RecentWakes | None) -> None:
+    if recent is None:
+        return
+    for index in result.errors:
+        recent.release(
+            [create_magic_packet(result.macs[index])],
+            result.destinations[result.destination_indexes[index]],
+        )
+
+
+class _PartialSendError(Exception):
+    # Raised from an OSError that interrupted sending, to tell how many packets
+    # were sent before the error occurred.
+
+    def __init__(self, sent: int, error: OSError) -> None:
+        super().__init__(sent, error)
+        self.sent = sent
+        self.error = error
+
+
+def _pause(interval: float, jitter: float) -> None:
+    if jitter:
+        # Most callers don’t use jitter, so random is imported on demand.
+        import random
+
+        interval += random.uniform(0, jitter)
+    time.sleep(interval)
+
+
+def _send_all(
+    sock: socket.socket,
+    packets: Sequence[bytes] | MagicPackets,
+    *,
+    batch: bool,
+    pacer: Pacer | None,
+    repeat: int = 1,
+    interval: float = 1.0,
+    jitter: float = 0.0,
+    destination: Destination | None = None,
+) -> None:
+    # Every round sends each packet once, so a host never receives a burst of
+    # its own packets.
+    for repetition in range(repeat):
+        if repetition:
+            _pause(interval, jitter)
+        try:
+            _send_round(
+                sock, packets, batch=batch, pacer=pacer, destination=destination
+            )
+        except _PartialSendError as partial:
+            raise _PartialSendError(
+                repetition * len(packets) + partial.sent, partial.error
+            ) from partial.error
+
+
+def _send_round(
+    sock: socket.socket,
+    packets: Sequence[bytes] | MagicPackets,
+    *,
+    batch: bool,
+    pacer: Pacer | None,
+    destination: Destination | None = None,
+) -> None:
+    sent = 0
+    active = hooks.active
+    if active:
+        start = time.perf_counter()
+    try:
+        if not batch:
+            if pacer is None:
+                for packet in packets:
+                    sock.send(packet)
+                    sent += 1
+            else:
+                for packet in packets:
+                    pacer.acquire()
+                    sock.send(packet)
+                    sent += 1
+        elif pacer is None:
+            sent += sum(_send_batches(sock, packets))
+        else:
+            chunk_size = pacer.chunk_size
+            for offset in range(0, len(packets), chunk_size):
+                chunk = packets[offset : offset + chunk_size]
+                pacer.acquire(len(chunk))
+                sent += sum(_send_batches(sock, chunk))
+    except _PartialSendError as partial:
+        # Packets sent by earlier system calls of the batch did go out.
+        sent += partial.sent
+        failure = partial.error
+    except OSError as error:
+        failure = error
+    else:
+        if active:
+            duration = time.perf_counter() - start
+            hooks.emit(WakeEvent('send', destination, duration, sent))
+        return
+    if active:
+        duration = time.perf_counter() - start
+        hooks.emit(WakeEvent('send', destination, duration, sent))
+        hooks.emit(WakeEvent('error', destination, duration, error=failure))
+    raise _PartialSendError(sent, failure) from failure
+
+
+def _wake_destination(
+    result: WakeResult,
+    destination: Destination,
+    macs: list[str],
+    packets: MagicPackets,
+    *,
+    batch: bool,
+    pacer: Pacer | None,
+    repeat: int,
+    interval: float,
+    jitter: float,
+    transport: Transport | None = None,
+) -> None:
+    start = time.perf_counter()
+    try:
+        if transport is None:
+            sock = create_socket(**destination._asdict())
+        else:
+            sock = transport.open(destination)
+    except OSError as error:
+        result.resolve_time += time.perf_counter() - start
+        result._add(destination, macs, packets, 0, error)
+        return
+    result.resolve_time += time.perf_counter() - start
+
+    start = time.perf_counter()
+    sent = len(packets) * repeat
+    send_error = None
+    with sock:
+        if transport is not None:
+            packets = transport.frame(sock, packets)
+        try:
+            _send_all(
+                sock,
+                packets,
+                batch=batch,
+                pacer=pacer,
+                repeat=repeat,
+                interval=interval,
+                jitter=jitter,
+                destination=destination,
+            )
+        except _PartialSendError as partial:
+            sent = partial.sent
+            send_error = partial.error
+    result.send_time += time.perf_counter() - start
+    result._add(destination, macs, packets, sent, send_error, repeat)
+
+
+def _check_repeat(repeat: int, interval: float, jitter: float) -> None:
+    if repeat < 1:
+        raise ValueError('repeat must be at least 1')
+    if interval < 0:
+        raise ValueError('interval must not be negative')
+    if jitter < 0:
+        raise ValueError('jitter must not be negative')
+
+
 def wake(
     *macs: str,
     host: str = BROADCAST_IP,
     port: int = DEFAULT_PORT,
     interface: str | None = None,
     family: socket.AddressFamily = socket.AF_UNSPEC,
-) -> None:
+    hops: int | None = None,
+    batch: bool = False,
+    pacer: Pacer | None = None,
+    repeat: int = 1,
+    interval: float = 1.0,
+    jitter: float = 0.0,
+    deduplicate: bool = True,
+    recent: RecentWakes | None = None,
+    transport: Transport | None = None,
+) -> WakeResult:
     """
     Wake up computers having any of the given mac addresses.
 
@@ -124,105 +1849,682 @@ def wake(
             to.
         port: the port of the host to send the magic packet to.
         interface: the ip address of the network adapter to route the
-            magic packet through.
+            magic packet through. For IPv6 multicast this may also be the
+            name or index of the network interface.
         family: the address family of the ip address to initiate
             connection with. When not specificied, chosen automatically
             between IPv4 and IPv6.
+        hops: the hop limit of IPv6 multicast packets.
+        batch: send the magic packets using as few system calls as possible.
+            See :func:`send_packets`.
+        pacer: limit the rate at which the magic packets are sent.
+        repeat: the number of times to send each magic packet. Magic packets
+            may get lost, because they are sent over UDP. All packets are sent
+            once before any packet is sent again.
+        interval: the number of seconds to wait between repetitions.
+        jitter: the maximum number of seconds to randomly add to each
+            interval.
+        deduplicate: send the magic packet only once if a mac address is
+            given multiple times, possibly in different notations.
+        recent: skip the mac addresses which were woken recently.
+        transport: how to send the magic packets. By default they are sent as
+            UDP datagrams. See :class:`Transport`.
+
+    Returns:
+        Which magic packets were sent. Skipped mac addresses aren’t included,
+        but counted in :attr:`WakeResult.duplicates` and
+        :attr:`WakeResult.suppressed`.
+
+    Raises:
+        WakeError: If a magic packet couldn’t be sent. The partial result is
+            available as :attr:`WakeError.result`.
 
     """
-    packets = [create_magic_packet(mac) for mac in macs]
+    _check_repeat(repeat, interval, jitter)
+    result = WakeResult()
+    destination = Destination(host, port, interface, family, hops)
+    start = time.perf_counter()
+    packets = create_magic_packets(macs)
+    unique, packets = _deduplicate(
+        result,
+        destination,
+        list(macs),
+        packets,
+        deduplicate=deduplicate,
+        recent=recent,
+    )
+    result.parse_time = time.perf_counter() - start
+    if hooks.active:
+        hooks.emit(WakeEvent('parse', None, result.parse_time, len(packets)))
+    if not packets:
+        return result
 
-    with create_socket(
-        host=host,
-        port=port,
-        interface=interface,
-        family=family,
-    ) as sock:
-        for packet in packets:
-            sock.send(packet)
+    _wake_destination(
+        result,
+        destination,
+        unique,
+        packets,
+        batch=batch,
+        pacer=pacer,
+        repeat=repeat,
+        interval=interval,
+        jitter=jitter,
+        transport=transport,
+    )
+    if result.errors:
+        _release_failed(result, recent)
+        raise WakeError(result) from next(iter(result.errors.values()))
+    return result
 
 
-@deprecated('Use wake() instead')
-def send_magic_packet(
-    *macs: str,
-    ip_address: str = BROADCAST_IP,
+def read_macs(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Read mac addresses from lines of text, for example an open file.
+
+    Mac addresses may be separated by newlines, commas or whitespace. Anything
+    following a ``#`` on a line is ignored.
+
+    Args:
+        lines: The lines to read the mac addresses from.
+
+    Yields:
+        The mac addresses or "mac address/secureon password" tuples.
+
+    """
+    for line in lines:
+        line = line.partition('#')[0]
+        for field in line.replace(',', ' ').split():
+            yield field
+
+
+def wake_stream(
+    macs: Iterable[str],
+    *,
+    host: str = BROADCAST_IP,
     port: int = DEFAULT_PORT,
     interface: str | None = None,
-    address_family: socket.AddressFamily = socket.AF_UNSPEC,
-) -> None:
+    family: socket.AddressFamily = socket.AF_UNSPEC,
+    hops: int | None = None,
+    batch: bool = False,
+    pacer: Pacer | None = None,
+    repeat: int = 1,
+    interval: float = 1.0,
+    jitter: float = 0.0,
+    chunk_size: int = 1024,
+) -> int:
+    """
+    Wake up computers from a possibly very large iterable of mac addresses.
+
+    Unlike :func:`wake`, the mac addresses aren’t all loaded into memory. They
+    are consumed in chunks, and the magic packets of each chunk are sent
+    before the next chunk is read. If an invalid mac address is encountered,
+    the packets of previous chunks have already been sent. Mac addresses
+    aren’t deduplicated, because that would require remembering all of them.
+
+    Args:
+        macs: The mac addresses or "mac address/secureon password" tuples of
+            machines to wake.
+
+    Keyword Args:
+        host: the ip address of the host to send the magic packet to.
+        port: the port of the host to send the magic packet to.
+        interface: the ip address of the network adapter to route the
+            magic packet through.
+        family: the address family of the ip address to initiate
+            connection with.
+        hops: the hop limit of IPv6 multicast packets.
+        batch: send the magic packets using as few system calls as possible.
+        pacer: limit the rate at which the magic packets are sent.
+        repeat: the number of times to send each magic packet. The
+            repetitions are sent per chunk.
+        interval: the number of seconds to wait between repetitions.
+        jitter: the maximum number of seconds to randomly add to each
+            interval.
+        chunk_size: the number of mac addresses to process at once.
+
+    Returns:
+        The number of magic packets sent.
+
+    Raises:
+        WakeError: If the magic packets couldn’t be sent. The result only
+            covers the chunk that failed, the chunks before it were sent.
+
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+    _check_repeat(repeat, interval, jitter)
+    iterator = iter(macs)
+    sent = 0
+    destination = Destination(host, port, interface, family, hops)
+    with create_socket(**destination._asdict()) as sock:
+        while True:
+            start = time.perf_counter()
+            chunk = list(itertools.islice(iterator, chunk_size))
+            packets = create_magic_packets(chunk)
+            if not packets:
+                return sent
+            if hooks.active:
+                duration = time.perf_counter() - start
+                hooks.emit(WakeEvent('parse', None, duration, len(packets)))
+            try:
+                _send_all(
+                    sock,
+                    packets,
+                    batch=batch,
+                    pacer=pacer,
+                    repeat=repeat,
+                    interval=interval,
+                    jitter=jitter,
+                    destination=destination,
+                )
+            except _PartialSendError as partial:
+                result = WakeResult()
+                result._add(
+                    destination, chunk, packets, partial.sent, partial.error, repeat
+                )
+                raise WakeError(result) from partial.error
+            sent += len(packets)
+
+
+def read_targets(lines: Iterable[str]) -> Iterator[tuple[str, Destination]]:
+    """
+    Read mac addresses and their destinations from lines of text.
+
+    Each line contains a mac address, a destination, and optionally a port
+    and the ip address of a network adapter. These fields may be separated by
+    commas or whitespace. The destination is parsed using
+    :meth:`Destination.parse`. Anything following a ``#`` on a line is
+    ignored.
+
+    Args:
+        lines: The lines to read the targets from.
+
+    Yields:
+        Tuples of a mac address and its destination.
+
+    """
+    for line in lines:
+        fields = line.partition('#')[0].replace(',', ' ').split()
+        if not fields:
+            continue
+        if not 2 <= len(fields) <= 4:
+            raise ValueError(f'Incorrect target format: {line.strip()}')
+        mac, destination, *rest = fields
+        yield (
+            mac,
+            Destination.parse(
+                destination,
+                port=int(rest[0]) if rest else DEFAULT_PORT,
+                interface=rest[1] if len(rest) > 1 else None,
+            ),
+        )
+
+
+# The number of packets sent to a destination before moving on to the next.
+_FAN_OUT_CHUNK_SIZE = 64
+
+
+def wake_many(
+    targets: Mapping[str, Destination | str] | Iterable[tuple[str, Destination | str]],
+    *,
+    batch: bool = False,
+    pacer: Pacer | None = None,
+    repeat: int = 1,
+    interval: float = 1.0,
+    jitter: float = 0.0,
+    max_workers: int | None = None,
+    deduplicate: bool = True,
+    recent: RecentWakes | None = None,
+) -> WakeResult:
+    """
+    Wake up computers spread over multiple destinations.
+
+    The mac addresses are grouped by destination, and one socket is created
+    per destination. The packets are then sent to all destinations in turn, so
+    no destination has to wait until another destination is done.
+
+    If creating a socket or sending to a destination fails, the error is
+    recorded and the other destinations are still woken.
+
+    Args:
+        targets: A mapping of mac address to destination, or an iterable of
+            mac address and destination tuples. A destination may be given as
+            a string, which is parsed using :meth:`Destination.parse`.
+
+    Keyword Args:
+        batch: send the magic packets using as few system calls as possible.
+        pacer: limit the rate at which the magic packets are sent. The pacer
+            is shared by all destinations.
+        repeat: the number of times to send each magic packet.
+        interval: the number of seconds to wait between repetitions.
+        jitter: the maximum number of seconds to randomly add to each
+            interval.
+        max_workers: resolve and send to destinations in parallel using a
+            pool of this many threads. This prevents a destination which is
+            slow to resolve or bind from holding up other destinations.
+        deduplicate: send the magic packet only once if a mac address is
+            given multiple times for the same destination.
+        recent: skip the mac addresses which were woken recently.
+
+    Returns:
+        Which magic packets were sent. The mac addresses are grouped by
+        destination.
+
     """
-    Use :func:`wake` instead.
+    _check_repeat(repeat, interval, jitter)
+    if max_workers is not None and max_workers < 1:
+        raise ValueError('max_workers must be at least 1')
+    if isinstance(targets, Mapping):
+        targets = targets.items()
+    groups: dict[Destination, list[str]] = {}
+    for mac, destination in targets:
+        if isinstance(destination, str):
+            destination = Destination.parse(destination)
+        groups.setdefault(destination, []).append(mac)
+    # Validate all mac addresses before anything is sent.
+    result = WakeResult()
+    start = time.perf_counter()
+    packets_per_destination = {
+        destination: create_magic_packets(macs) for destination, macs in groups.items()
+    }
+    for destination in list(groups):
+        macs, packets = _deduplicate(
+            result,
+            destination,
+            groups[destination],
+            packets_per_destination[destination],
+            deduplicate=deduplicate,
+            recent=recent,
+        )
+        if macs:
+            groups[destination] = macs
+            packets_per_destination[destination] = packets
+        else:
+            del groups[destination]
+            del packets_per_destination[destination]
+    result.parse_time = time.perf_counter() - start
+    if hooks.active:
+        count = sum(map(len, packets_per_destination.values()))
+        hooks.emit(WakeEvent('parse', None, result.parse_time, count))
 
-    :meta private:
+    if max_workers is not None:
+
+        def wake_destination(destination: Destination) -> WakeResult:
+            destination_result = WakeResult()
+            _wake_destination(
+                destination_result,
+                destination,
+                groups[destination],
+                packets_per_destination[destination],
+                batch=batch,
+                pacer=pacer,
+                repeat=repeat,
+                interval=interval,
+                jitter=jitter,
+            )
+            return destination_result
+
+        import concurrent.futures
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            for destination_result in executor.map(wake_destination, groups):
+                result._merge(destination_result)
+        _release_failed(result, recent)
+        return result
+
+    with contextlib.ExitStack() as stack:
+        sockets: dict[Destination, socket.socket] = {}
+        sent = dict.fromkeys(groups, 0)
+        errors: dict[Destination, OSError] = {}
+        start = time.perf_counter()
+        for destination in groups:
+            try:
+                sockets[destination] = stack.enter_context(
+                    create_socket(**destination._asdict())
+                )
+            except OSError as error:
+                errors[destination] = error
+        result.resolve_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        longest = max(map(len, packets_per_destination.values()), default=0)
+        for repetition in range(repeat):
+            if repetition:
+                _pause(interval, jitter)
+            for offset in range(0, longest, _FAN_OUT_CHUNK_SIZE):
+                for destination, sock in list(sockets.items()):
+                    chunk = packets_per_destination[destination][
+                        offset : offset + _FAN_OUT_CHUNK_SIZE
+                    ]
+                    if not chunk:
+                        continue
+                    try:
+                        _send_round(
+                            sock,
+                            chunk,
+                            batch=batch,
+                            pacer=pacer,
+                            destination=destination,
+                        )
+                    except _PartialSendError as partial:
+                        sent[destination] += partial.sent
+                        errors[destination] = partial.error
+                        del sockets[destination]
+                    else:
+                        sent[destination] += len(chunk)
+        result.send_time = time.perf_counter() - start
+
+    for destination, macs in groups.items():
+        result._add(
+            destination,
+            macs,
+            packets_per_destination[destination],
+            sent[destination],
+            errors.get(destination),
+            repeat,
+        )
+    _release_failed(result, recent)
+    return result
+
+
+class WakeSender:
     """
-    wake(
-        *macs,
-        host=ip_address,
-        port=port,
-        interface=interface,
-        family=address_family,
+    Send magic packets using a pool of long lived sockets.
+
+    Creating a socket using :func:`create_socket` is relatively expensive.
+    This keeps connected sockets around per destination, so they can be reused
+    for subsequent wakes. Sockets which haven’t been used for ``idle_timeout``
+    seconds are closed, and if more than ``max_sockets`` sockets are open, the
+    least recently used one is closed.
+
+    The sender may be used as a context manager, which closes all sockets on
+    exit.
+
+    Args:
+        max_sockets: The maximum number of sockets to keep open.
+        idle_timeout: The number of seconds after which an unused socket is
+            closed.
+
+    """
+
+    def __init__(self, *, max_sockets: int = 16, idle_timeout: float = 60.0) -> None:
+        """
+        Create a sender without any open sockets.
+
+        """
+        if max_sockets < 1:
+            raise ValueError('max_sockets must be at least 1')
+        self.max_sockets = max_sockets
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sockets: OrderedDict[Destination, tuple[socket.socket, float]] = (
+            OrderedDict()
+        )
+
+    def __enter__(self) -> 'WakeSender':
+        """
+        Enter the context, returning the sender itself.
+
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """
+        Close all pooled sockets.
+
+        """
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        Get the number of open sockets.
+
+        """
+        return len(self._sockets)
+
+    def _evict(self, now: float) -> None:
+        # Sockets are ordered by last use, so only the head needs checking.
+        while self._sockets:
+            key, (sock, last_used) = next(iter(self._sockets.items()))
+            if (
+                len(self._sockets) <= self.max_sockets
+                and now - last_used < self.idle_timeout
+            ):
+                break
+            del self._sockets[key]
+            sock.close()
+
+    def get_socket(
+        self,
+        *,
+        host: str = BROADCAST_IP,
+        port: int = DEFAULT_PORT,
+        interface: str | None = None,
+        family: socket.AddressFamily = socket.AF_UNSPEC,
+        hops: int | None = None,
+    ) -> socket.socket:
+        """
+        Get a pooled socket for a destination, creating it if needed.
+
+        The returned socket is owned by the sender and must not be closed.
+        Each IPv6 multicast scope gets its own socket.
+
+        Keyword Args:
+            host: the ip address of the host to send the magic packet to.
+            port: the port of the host to send the magic packet to.
+            interface: the ip address of the network adapter to route the
+                magic packet through.
+            family: the address family of the ip address to initiate
+                connection with.
+            hops: the hop limit of IPv6 multicast packets.
+
+        Returns:
+            A connected socket suitable for sending magic packets.
+
+        """
+        key = Destination(host, port, interface, family, hops)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sockets.pop(key, None)
+            if entry is not None and now - entry[1] < self.idle_timeout:
+                self._sockets[key] = (entry[0], now)
+                self._evict(now)
+                return entry[0]
+        if entry is not None:
+            entry[0].close()
+        # Creating a socket may block on host name resolution, so the lock
+        # isn’t held meanwhile. Other destinations can be used in the meantime.
+        sock = create_socket(**key._asdict())
+        surplus = None
+        with self._lock:
+            entry = self._sockets.get(key)
+            if entry is not None:
+                # Another thread created a socket for the destination first.
+                surplus = sock
+                sock = entry[0]
+            self._sockets[key] = (sock, now)
+            self._sockets.move_to_end(key)
+            self._evict(now)
+        if surplus is not None:
+            surplus.close()
+        return sock
+
+    def discard(
+        self,
+        *,
+        host: str = BROADCAST_IP,
+        port: int = DEFAULT_PORT,
+        interface: str | None = None,
+        family: socket.AddressFamily = socket.AF_UNSPEC,
+        hops: int | None = None,
+    ) -> None:
+        """
+        Close the pooled socket for a destination, if any.
+
+        """
+        key = Destination(host, port, interface, family, hops)
+        with self._lock:
+            entry = self._sockets.pop(key, None)
+        if entry is not None:
+            entry[0].close()
+
+    def wake(
+        self,
+        *macs: str,
+        host: str = BROADCAST_IP,
+        port: int = DEFAULT_PORT,
+        interface: str | None = None,
+        family: socket.AddressFamily = socket.AF_UNSPEC,
+        hops: int | None = None,
+        batch: bool = False,
+        pacer: Pacer | None = None,
+        repeat: int = 1,
+        interval: float = 1.0,
+        jitter: float = 0.0,
+        deduplicate: bool = True,
+        recent: RecentWakes | None = None,
+    ) -> WakeResult:
+        """
+        Wake up computers having any of the given mac addresses.
+
+        This accepts the same arguments and returns the same result as
+        :func:`wake`. If sending fails, the socket is replaced and the packets
+        are sent once more before the error is raised.
+
+        """
+        _check_repeat(repeat, interval, jitter)
+        result = WakeResult()
+        destination = Destination(host, port, interface, family, hops)
+        start = time.perf_counter()
+        unique, packets = _deduplicate(
+            result,
+            destination,
+            list(macs),
+            create_magic_packets(macs),
+            deduplicate=deduplicate,
+            recent=recent,
+        )
+        result.parse_time = time.perf_counter() - start
+        if hooks.active:
+            hooks.emit(WakeEvent('parse', None, result.parse_time, len(packets)))
+        if not packets:
+            return result
+        for attempt in range(2):
+            start = time.perf_counter()
+            try:
+                sock = self.get_socket(**destination._asdict())
+            except OSError as error:
+                result.resolve_time += time.perf_counter() - start
+                result._add(destination, unique, packets, 0, error)
+                _release_failed(result, recent)
+                raise WakeError(result) from error
+            result.resolve_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            try:
+                _send_all(
+                    sock,
+                    packets,
+                    batch=batch,
+                    pacer=pacer,
+                    repeat=repeat,
+                    interval=interval,
+                    jitter=jitter,
+                    destination=destination,
+                )
+            except _PartialSendError as partial:
+                result.send_time += time.perf_counter() - start
+                self.discard(**destination._asdict())
+                if attempt:
+                    result._add(
+                        destination,
+                        unique,
+                        packets,
+                        partial.sent,
+                        partial.error,
+                        repeat,
+                    )
+                    _release_failed(result, recent)
+                    raise WakeError(result) from partial.error
+            else:
+                result.send_time += time.perf_counter() - start
+                result._add(destination, unique, packets, len(packets) * repeat, None)
+                return result
+        raise AssertionError('unreachable')  # pragma: nocover
+
+    def close(self) -> None:
+        """
+        Close all pooled sockets.
+
+        """
+        with self._lock:
+            sockets = [sock for sock, last_used in self._sockets.values()]
+            self._sockets.clear()
+        for sock in sockets:
+            sock.close()
+
+
+if TYPE_CHECKING:
+    # Type checkers see the deprecated decorator, so they flag callers.
+    from wakeonlan._deprecated import send_magic_packet as send_magic_packet
+
+
+def __getattr__(name: str) -> Any:
+    # The deprecated API is imported on first use, because the deprecated
+    # decorator is slow to import.
+    if name == 'send_magic_packet':
+        from wakeonlan._deprecated import send_magic_packet
+
+        return send_magic_packet
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def _cache_dir() -> str:
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
     )
+    return os.path.join(cache_home, 'wakeonlan')
+
+
+def _write_atomic(path: str, data: bytes | bytearray, *, durable: bool = False) -> None:
+    # Write to a temporary file first, so concurrent readers never see a
+    # partially written file. Durable writes are flushed to disk before the
+    # file is replaced, so a power loss leaves either the old or new data.
+    import tempfile
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        file.write(data)
+        if durable:
+            file.flush()
+            os.fsync(file.fileno())
+    try:
+        os.replace(file.name, path)
+    except OSError:
+        os.unlink(file.name)
+        raise
+
+
+def _write_cache(path: str, data: bytes | bytearray) -> None:
+    # Caches are an optimization, so errors are ignored.
+    try:
+        _write_atomic(path, data)
+    except OSError:
+        pass
 
 
 def main(argv: list[str] | None = None) -> None:
     """
     Run wake on lan as a CLI application.
 
+    The command line interface is implemented in :mod:`wakeonlan.cli`, so
+    importing this module doesn’t have to import :mod:`argparse`.
+
     """
-    parser = argparse.ArgumentParser(
-        description='Wake one or more computers using the wake on lan protocol.',
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-    )
-    parser.add_argument(
-        'macs',
-        metavar='mac address',
-        nargs='+',
-        help='The mac addresses or "mac address/secureon password" tuples of the computers you are trying to wake.',
-    )
-    parser.add_argument(
-        '-o',
-        '--host',
-        default=BROADCAST_IP,
-        help='The host name to send the magic packet to.',
-    )
-    parser.add_argument(
-        '-p',
-        '--port',
-        type=int,
-        default=DEFAULT_PORT,
-        help='The port of the host to send the magic packet to.',
-    )
-    parser.add_argument(
-        '-n',
-        '--interface',
-        help='The ip address of the network adapter to route the magic packet through.',
-    )
-    parser.add_argument(
-        '-4',
-        '--ipv4',
-        action='store_true',
-        help='To indicate ipv4 should be used.',
-    )
-    parser.add_argument(
-        '-6',
-        '--ipv6',
-        action='store_true',
-        help='To indicate ipv6 should be used.',
-    )
-    args = parser.parse_args(argv)
-    if args.ipv4 is args.ipv6:
-        family = socket.AF_UNSPEC
-    elif args.ipv4:
-        family = socket.AF_INET
-    else:
-        family = socket.AF_INET6
-    wake(
-        *args.macs,
-        host=args.host,
-        port=args.port,
-        interface=args.interface,
-        family=family,
-    )
+    from wakeonlan.cli import main as cli_main
+
+    cli_main(argv)
 
 
 if __name__ == '__main__':  # pragma: nocover
@@ -0,0 +1,37 @@
+"""
+Deprecated APIs, imported on first use by :mod:`wakeonlan`.
+
+"""
+
+import socket
+
+import wakeonlan
+from wakeonlan import BROADCAST_IP, DEFAULT_PORT
+
+
+try:  # pragma: nocover
+    from warnings import deprecated
+except ImportError:  # pragma: nocover
+    from typing_extensions import deprecated
+
+
+@deprecated('Use wake() instead')
+def send_magic_packet(
+    *macs: str,
+    ip_address: str = BROADCAST_IP,
+    port: int = DEFAULT_PORT,
+    interface: str | None = None,
+    address_family: socket.AddressFamily = socket.AF_UNSPEC,
+) -> None:
+    """
+    Use :func:`wake` instead.
+
+    :meta private:
+    """
+    wakeonlan.wake(
+        *macs,
+        host=ip_address,
+        port=port,
+        interface=interface,
+        family=address_family,
+    )
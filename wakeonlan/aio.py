@@ -0,0 +1,427 @@
+"""
+Asyncio support for the wake on lan protocol.
+
+"""
+
+import asyncio
+import contextlib
+import functools
+import socket
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from typing import NamedTuple, cast
+
+from wakeonlan import BROADCAST_IP, DEFAULT_PORT, create_magic_packets
+
+
+_Destination = tuple[str, int, str | None, socket.AddressFamily]
+
+
+class _WakeProtocol(asyncio.DatagramProtocol):
+    """
+    A datagram protocol that removes its endpoint from the sender when lost.
+
+    """
+
+    def __init__(self, sender: 'AsyncWakeSender', destination: _Destination) -> None:
+        self.sender = sender
+        self.destination = destination
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.sender._endpoints.pop(self.destination, None)
+
+
+class AsyncWakeSender:
+    """
+    Send magic packets from asyncio code without blocking the event loop.
+
+    One datagram endpoint is created per destination and shared by all
+    concurrent calls to :meth:`wake` for that destination. The sender may be
+    used as an async context manager, which closes all endpoints on exit.
+
+    """
+
+    def __init__(self) -> None:
+        """
+        Create a sender without any endpoints.
+
+        """
+        self._endpoints: dict[
+            _Destination, asyncio.Future[asyncio.DatagramTransport]
+        ] = {}
+
+    async def __aenter__(self) -> 'AsyncWakeSender':
+        """
+        Enter the context, returning the sender itself.
+
+        """
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        """
+        Close all endpoints.
+
+        """
+        await self.close()
+
+    async def _create_endpoint(
+        self, destination: _Destination
+    ) -> asyncio.DatagramTransport:
+        host, port, interface, family = destination
+        loop = asyncio.get_running_loop()
+        # Try the addresses in order, just like create_socket().
+        address_infos = await loop.getaddrinfo(
+            host, port, family=family, type=socket.SOCK_DGRAM
+        )
+        for index, (family, type, proto, canonname, addr) in enumerate(
+            address_infos, 1
+        ):
+            try:
+                transport, protocol = await loop.create_datagram_endpoint(
+                    lambda: _WakeProtocol(self, destination),
+                    local_addr=(interface, 0) if interface else None,
+                    # IPv6 addresses are 4-tuples, which asyncio accepts too.
+                    remote_addr=cast(tuple[str, int], addr),
+                    family=family,
+                    proto=proto,
+                    allow_broadcast=True,
+                )
+                return transport
+            except OSError:  # pragma: nocover
+                if index == len(address_infos):
+                    raise
+        raise AssertionError('getaddrinfo returned no addresses')  # pragma: nocover
+
+    async def get_endpoint(
+        self,
+        *,
+        host: str = BROADCAST_IP,
+        port: int = DEFAULT_PORT,
+        interface: str | None = None,
+        family: socket.AddressFamily = socket.AF_UNSPEC,
+    ) -> asyncio.DatagramTransport:
+        """
+        Get the datagram transport for a destination, creating it if needed.
+
+        Concurrent callers asking for the same destination wait for the same
+        endpoint to be created.
+
+        Keyword Args:
+            host: the ip address of the host to send the magic packet to.
+            port: the port of the host to send the magic packet to.
+            interface: the ip address of the network adapter to route the
+                magic packet through.
+            family: the address family of the ip address to initiate
+                connection with.
+
+        Returns:
+            The datagram transport connected to the destination.
+
+        """
+        destination = (host, port, interface, family)
+        future = self._endpoints.get(destination)
+        if future is None:
+            future = asyncio.ensure_future(self._create_endpoint(destination))
+            self._endpoints[destination] = future
+        try:
+            return await asyncio.shield(future)
+        except BaseException:
+            if future.done() and self._endpoints.get(destination) is future:
+                del self._endpoints[destination]
+            raise
+
+    async def wake(
+        self,
+        *macs: str,
+        host: str = BROADCAST_IP,
+        port: int = DEFAULT_PORT,
+        interface: str | None = None,
+        family: socket.AddressFamily = socket.AF_UNSPEC,
+    ) -> None:
+        """
+        Wake up computers having any of the given mac addresses.
+
+        This accepts the same arguments as :func:`wakeonlan.wake`.
+
+        """
+        packets = create_magic_packets(macs)
+        transport = await self.get_endpoint(
+            host=host, port=port, interface=interface, family=family
+        )
+        for packet in packets:
+            transport.sendto(packet)
+
+    async def close(self) -> None:
+        """
+        Close all endpoints.
+
+        """
+        futures = list(self._endpoints.values())
+        self._endpoints.clear()
+        for future in futures:
+            if not future.done():
+                future.cancel()
+            elif not future.cancelled() and future.exception() is None:
+                future.result().close()
+        # Give the transports a chance to call connection_lost.
+        await asyncio.sleep(0)
+
+
+async def async_wake(
+    *macs: str,
+    host: str = BROADCAST_IP,
+    port: int = DEFAULT_PORT,
+    interface: str | None = None,
+    family: socket.AddressFamily = socket.AF_UNSPEC,
+    sender: AsyncWakeSender | None = None,
+) -> None:
+    """
+    Wake up computers having any of the given mac addresses without blocking.
+
+    Args:
+        macs: One or more mac addresses or "mac address/secureon password"
+            tuples of machines to wake.
+
+    Keyword Args:
+        host: the ip address of the host to send the magic packet to.
+        port: the port of the host to send the magic packet to.
+        interface: the ip address of the network adapter to route the magic
+            packet through.
+        family: the address family of the ip address to initiate connection
+            with.
+        sender: The sender to use. Pass a long lived sender to share endpoints
+            between calls. If not specified, a temporary sender is used.
+
+    """
+    if sender is not None:
+        await sender.wake(
+            *macs, host=host, port=port, interface=interface, family=family
+        )
+        return
+
+    async with AsyncWakeSender() as sender:
+        await sender.wake(
+            *macs, host=host, port=port, interface=interface, family=family
+        )
+
+
+async def probe_tcp(address: str, port: int, *, timeout: float = 1.0) -> bool:
+    """
+    Check whether a TCP connection can be made to a host.
+
+    Args:
+        address: The ip address or host name to connect to.
+        port: The port to connect to.
+
+    Keyword Args:
+        timeout: The number of seconds to wait for the connection.
+
+    Returns:
+        Whether the connection succeeded.
+
+    """
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(address, port), timeout
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    with contextlib.suppress(OSError):
+        await writer.wait_closed()
+    return True
+
+
+class _EchoProtocol(asyncio.DatagramProtocol):
+    """
+    A datagram protocol that resolves a future once anything is received.
+
+    """
+
+    def __init__(self) -> None:
+        self.reply: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data: bytes, addr: tuple[str | int, ...]) -> None:
+        if not self.reply.done():
+            self.reply.set_result(True)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.reply.done():
+            self.reply.set_result(False)
+
+
+async def probe_udp(address: str, port: int, *, timeout: float = 1.0) -> bool:
+    """
+    Check whether a host replies to a UDP datagram.
+
+    This works with an echo service, or any other service that replies to
+    arbitrary datagrams.
+
+    Args:
+        address: The ip address or host name to send the datagram to.
+        port: The port to send the datagram to.
+
+    Keyword Args:
+        timeout: The number of seconds to wait for a reply.
+
+    Returns:
+        Whether a reply was received.
+
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        transport, protocol = await loop.create_datagram_endpoint(
+            _EchoProtocol, remote_addr=(address, port)
+        )
+    except OSError:
+        return False
+    try:
+        transport.sendto(b'wakeonlan')
+        return await asyncio.wait_for(protocol.reply, timeout)
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        transport.close()
+
+
+#: The probes which can be used by :func:`wake_and_verify`, and their default
+#: ports.
+PROBES: dict[str, tuple[Callable[..., Awaitable[bool]], int]] = {
+    'tcp': (probe_tcp, 22),
+    'udp': (probe_udp, 7),
+}
+
+
+class VerifyResult(NamedTuple):
+    """
+    The outcome of waking a host and waiting for it to come up.
+
+    """
+
+    #: The mac address as it was given.
+    mac: str
+    #: The address that was probed.
+    address: str
+    #: The number of seconds from sending the first magic packet until the
+    #: host was reachable, or ``None`` if it didn’t come up in time.
+    time_to_up: float | None
+    #: The number of times the magic packet was sent.
+    attempts: int
+
+    @property
+    def up(self) -> bool:
+        """
+        Whether the host came up in time.
+
+        """
+        return self.time_to_up is not None
+
+
+async def wake_and_verify(
+    targets: Mapping[str, str] | Iterable[tuple[str, str]],
+    *,
+    host: str = BROADCAST_IP,
+    port: int = DEFAULT_PORT,
+    interface: str | None = None,
+    family: socket.AddressFamily = socket.AF_UNSPEC,
+    probe: str = 'tcp',
+    probe_port: int | None = None,
+    probe_timeout: float = 1.0,
+    probe_interval: float = 1.0,
+    timeout: float = 300.0,
+    resend_delay: float = 5.0,
+    backoff: float = 2.0,
+    max_resend_delay: float = 60.0,
+    max_probes: int = 256,
+    sender: AsyncWakeSender | None = None,
+) -> list[VerifyResult]:
+    """
+    Wake up computers and wait until they are reachable.
+
+    All magic packets are sent at once. Then every host is probed
+    concurrently until it responds or the timeout expires. Hosts which are
+    still down get their magic packet sent again, first after
+    ``resend_delay`` seconds, and then with the delay multiplied by
+    ``backoff`` each time. Errors while sending again are ignored, the next
+    attempt follows the same schedule.
+
+    Args:
+        targets: A mapping of mac address to the ip address or host name to
+            probe, or an iterable of mac address and address tuples.
+
+    Keyword Args:
+        host: the ip address of the host to send the magic packets to.
+        port: the port of the host to send the magic packets to.
+        interface: the ip address of the network adapter to route the
+            magic packets through.
+        family: the address family of the ip address to initiate
+            connection with.
+        probe: how to check whether a host is up. Either ``tcp`` to connect
+            to a TCP port, or ``udp`` to wait for a reply from a UDP echo
+            service.
+        probe_port: the port to probe. Defaults to 22 for ``tcp`` and 7 for
+            ``udp``.
+        probe_timeout: the number of seconds to wait for a single probe.
+        probe_interval: the number of seconds between probes of a host.
+        timeout: the number of seconds after which a host is considered
+            down.
+        resend_delay: the number of seconds before the magic packet is sent
+            again for the first time.
+        backoff: the factor by which the delay grows after each resend.
+        max_resend_delay: the maximum number of seconds between resends.
+        max_probes: the maximum number of probes in flight at once.
+        sender: The sender to use. If not specified, a temporary sender is
+            used.
+
+    Returns:
+        A result per mac address, in the order given.
+
+    """
+    if probe not in PROBES:
+        raise ValueError(f'Unknown probe: {probe}')
+    if max_probes < 1:
+        raise ValueError('max_probes must be at least 1')
+    probe_function, default_port = PROBES[probe]
+    check = functools.partial(
+        probe_function,
+        port=default_port if probe_port is None else probe_port,
+        timeout=probe_timeout,
+    )
+    if isinstance(targets, Mapping):
+        targets = targets.items()
+    targets = list(targets)
+    semaphore = asyncio.Semaphore(max_probes)
+    loop = asyncio.get_running_loop()
+
+    async with contextlib.AsyncExitStack() as stack:
+        if sender is None:
+            sender = await stack.enter_async_context(AsyncWakeSender())
+        send = functools.partial(
+            sender.wake, host=host, port=port, interface=interface, family=family
+        )
+        start = loop.time()
+        await send(*(mac for mac, address in targets))
+
+        async def verify(mac: str, address: str) -> VerifyResult:
+            attempts = 1
+            delay = resend_delay
+            next_resend = start + delay
+            while True:
+                async with semaphore:
+                    up = await check(address)
+                now = loop.time()
+                if up:
+                    return VerifyResult(mac, address, now - start, attempts)
+                if now - start >= timeout:
+                    return VerifyResult(mac, address, None, attempts)
+                if now >= next_resend:
+                    try:
+                        await send(mac)
+                    except OSError:
+                        pass
+                    else:
+                        attempts += 1
+                    delay = min(delay * backoff, max_resend_delay)
+                    next_resend = now + delay
+                await asyncio.sleep(min(probe_interval, start + timeout - now))
+
+        return await asyncio.gather(*(verify(mac, address) for mac, address in targets))
@@ -0,0 +1,542 @@
+"""
+Micro-benchmarks for the wake on lan hot paths.
+
+Run using ``python -m wakeonlan.bench``. Packets are sent to a UDP sink bound
+to the loopback interface, so no real network is needed.
+
+For every mode the throughput is reported. Modes which make many calls also
+report the median and 99th percentile latency per call. Where relevant, the
+peak memory allocated while running the mode is reported as well.
+
+The ``import`` benchmark measures the startup cost of the library and the
+command line interface. It runs every import in a new interpreter using
+``python -X importtime``.
+
+"""
+
+import argparse
+import array
+import asyncio
+import functools
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from wakeonlan import (
+    PacketCache,
+    PacketTemplate,
+    WakeSender,
+    create_magic_packet,
+    create_magic_packets,
+    create_socket,
+    parse_mac,
+    resolve_cache,
+    send_packets,
+    wake,
+)
+from wakeonlan.aio import AsyncWakeSender
+
+
+class Result(NamedTuple):
+    """
+    The result of a single benchmark mode.
+
+    """
+
+    #: The name of the mode that was measured.
+    mode: str
+    #: The number of seconds the mode took.
+    elapsed: float
+    #: The number of packets processed.
+    total: int
+    #: Additional information to display.
+    note: str = ''
+    #: The median number of seconds a single call took.
+    p50: float | None = None
+    #: The 99th percentile of the number of seconds a single call took.
+    p99: float | None = None
+    #: The peak number of bytes allocated while running the mode.
+    peak: int | None = None
+    #: What is counted.
+    unit: str = 'packets'
+
+
+def _percentiles(latencies: Sequence[float]) -> tuple[float, float]:
+    if len(latencies) < 2:
+        return latencies[0], latencies[0]
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return quantiles[49], quantiles[98]
+
+
+def measure(
+    mode: str, calls: Sequence[Callable[[], object]], count: int, note: str = ''
+) -> Result:
+    """
+    Measure the latency per call and the peak memory usage of a mode.
+
+    The calls are made twice. Once to measure the time, and once more while
+    tracing memory allocations, because tracing slows down the calls.
+
+    Args:
+        mode: The name of the mode.
+        calls: The calls to make.
+        count: The number of packets processed by all calls together.
+        note: Additional information to display.
+
+    Returns:
+        The result of the mode.
+
+    """
+    latencies = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for call in calls:
+        call_start = perf_counter()
+        call()
+        latencies.append(perf_counter() - call_start)
+    elapsed = perf_counter() - start
+
+    tracemalloc.start()
+    for call in calls:
+        call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50, p99 = _percentiles(latencies)
+    return Result(mode, elapsed, count, note, p50, p99, peak)
+
+
+async def measure_async(
+    mode: str, calls: Sequence[Callable[[], Awaitable[object]]], count: int
+) -> Result:
+    """
+    Measure the latency per call and the peak memory usage of an async mode.
+
+    This is the same as :func:`measure`, but for coroutine functions.
+
+    """
+    latencies = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for call in calls:
+        call_start = perf_counter()
+        await call()
+        latencies.append(perf_counter() - call_start)
+    elapsed = perf_counter() - start
+
+    tracemalloc.start()
+    for call in calls:
+        await call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50, p99 = _percentiles(latencies)
+    return Result(mode, elapsed, count, '', p50, p99, peak)
+
+
+@contextmanager
+def udp_sink() -> Iterator[int]:
+    """
+    Bind a UDP socket on the loopback interface that discards everything.
+
+    Yields:
+        The port the sink is bound to.
+
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sink:
+        sink.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        sink.bind(('127.0.0.1', 0))
+        yield sink.getsockname()[1]
+
+
+def generate_macs(count: int) -> list[str]:
+    """
+    Generate unique mac addresses.
+
+    Args:
+        count: The number of mac addresses to generate.
+
+    Returns:
+        A list of colon separated mac addresses.
+
+    """
+    macs = []
+    for index in range(count):
+        raw = index.to_bytes(6, 'big').hex()
+        macs.append(':'.join(raw[i : i + 2] for i in range(0, 12, 2)))
+    return macs
+
+
+def bench_send(count: int) -> list[Result]:
+    """
+    Compare sending packets one by one, in batches, and from a reused template.
+
+    Args:
+        count: The number of packets to send.
+
+    Returns:
+        The results per mode.
+
+    """
+    packets = [create_magic_packet(mac) for mac in generate_macs(count)]
+    results = []
+    with udp_sink() as port:
+        with create_socket(host='127.0.0.1', port=port) as sock:
+            start = time.perf_counter()
+            for packet in packets:
+                sock.send(packet)
+            elapsed = time.perf_counter() - start
+            results.append(Result('loop', elapsed, count, f'{count} system calls'))
+
+            start = time.perf_counter()
+            counts = send_packets(sock, packets)
+            elapsed = time.perf_counter() - start
+            results.append(
+                Result('batch', elapsed, count, f'{len(counts)} system calls')
+            )
+
+            buffer = create_magic_packets(generate_macs(count))
+            start = time.perf_counter()
+            counts = send_packets(sock, buffer)
+            elapsed = time.perf_counter() - start
+            results.append(
+                Result('buffer', elapsed, count, f'{len(counts)} system calls')
+            )
+
+            raw_macs = [parse_mac(mac) for mac in generate_macs(count)]
+            template = PacketTemplate()
+            start = time.perf_counter()
+            template.send(sock, raw_macs)
+            elapsed = time.perf_counter() - start
+            results.append(Result('template', elapsed, count, f'{count} system calls'))
+    return results
+
+
+def _legacy_create_magic_packet(macaddress: str) -> bytes:
+    # The string based implementation of create_magic_packet() from
+    # wakeonlan 3.3, kept as a baseline.
+    secureon = ''
+    if '/' in macaddress:
+        (macaddress, secureon) = macaddress.split('/')
+
+    if len(macaddress) == 17:
+        sep = macaddress[2]
+        macaddress = macaddress.replace(sep, '')
+    elif len(macaddress) == 14:
+        sep = macaddress[4]
+        macaddress = macaddress.replace(sep, '')
+    if len(macaddress) != 12:
+        raise ValueError('Incorrect MAC address format')
+
+    if secureon:
+        if len(secureon) == 17:
+            sep = secureon[2]
+            secureon = secureon.replace(sep, '')
+        elif len(secureon) == 14:
+            sep = secureon[4]
+            secureon = secureon.replace(sep, '')
+        if len(secureon) != 12:
+            raise ValueError('Incorrect SecureOn password format')
+
+    return bytes.fromhex('F' * 12 + macaddress * 16 + secureon)
+
+
+def bench_packet(count: int) -> list[Result]:
+    """
+    Compare the ways of creating magic packets.
+
+    Args:
+        count: The number of magic packets to create.
+
+    Returns:
+        The results per mode.
+
+    """
+    macs = generate_macs(count)
+    results = []
+    for mode, function in [
+        ('legacy', _legacy_create_magic_packet),
+        ('parse', create_magic_packet),
+        ('cached', PacketCache(maxsize=count).get),
+    ]:
+        calls = [functools.partial(function, mac) for mac in macs]
+        # Warm up, which also fills the cache.
+        for call in calls:
+            call()
+        results.append(measure(mode, calls, count))
+    return results
+
+
+def bench_build(count: int) -> list[Result]:
+    """
+    Compare building a list of magic packets to building a single buffer.
+
+    Args:
+        count: The number of magic packets to build.
+
+    Returns:
+        The results per mode, including the peak memory usage.
+
+    """
+    macs = generate_macs(count)
+    integers = array.array('Q', range(count))
+    modes: list[tuple[str, Callable[[], object]]] = [
+        ('list', lambda: [create_magic_packet(mac) for mac in macs]),
+        ('buffer', lambda: create_magic_packets(macs)),
+        ('integers', lambda: create_magic_packets(integers)),
+    ]
+    results = []
+    for mode, function in modes:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results.append(Result(mode, elapsed, count, peak=peak))
+    return results
+
+
+def bench_socket(count: int) -> list[Result]:
+    """
+    Compare creating a socket per wake to caching and pooling.
+
+    Args:
+        count: The number of sockets to get.
+
+    Returns:
+        The results per mode.
+
+    """
+    results = []
+    with udp_sink() as port:
+
+        def create_and_close() -> None:
+            create_socket(host='localhost', port=port).close()
+
+        results.append(
+            measure('create', [create_and_close] * count, count, '1 socket per call')
+        )
+
+        ttl = resolve_cache.ttl
+        resolve_cache.configure(ttl=60)
+        try:
+            results.append(
+                measure(
+                    'cached', [create_and_close] * count, count, '1 socket per call'
+                )
+            )
+        finally:
+            resolve_cache.configure(ttl=ttl)
+
+        with WakeSender() as sender:
+            get_socket = functools.partial(
+                sender.get_socket, host='localhost', port=port
+            )
+            results.append(
+                measure('pooled', [get_socket] * count, count, '1 socket per call')
+            )
+    return results
+
+
+_CHUNK_SIZE = 64
+
+
+def bench_wake(count: int) -> list[Result]:
+    """
+    Compare the ways of waking computers, from parsing to sending.
+
+    Args:
+        count: The number of computers to wake.
+
+    Returns:
+        The results per mode.
+
+    """
+    macs = generate_macs(count)
+    chunks = [macs[i : i + _CHUNK_SIZE] for i in range(0, count, _CHUNK_SIZE)]
+    results = []
+    with udp_sink() as port:
+        host = '127.0.0.1'
+        results.append(
+            measure(
+                'single',
+                [functools.partial(wake, mac, host=host, port=port) for mac in macs],
+                count,
+                '1 call per packet',
+            )
+        )
+        results.append(
+            measure(
+                'batched',
+                [
+                    functools.partial(wake, *chunk, batch=True, host=host, port=port)
+                    for chunk in chunks
+                ],
+                count,
+                f'{_CHUNK_SIZE} packets per call',
+            )
+        )
+        with WakeSender() as sender:
+            results.append(
+                measure(
+                    'pooled',
+                    [
+                        functools.partial(sender.wake, mac, host=host, port=port)
+                        for mac in macs
+                    ],
+                    count,
+                    '1 call per packet',
+                )
+            )
+
+        async def wake_async() -> Result:
+            async with AsyncWakeSender() as sender:
+                return await measure_async(
+                    'async',
+                    [
+                        functools.partial(sender.wake, mac, host=host, port=port)
+                        for mac in macs
+                    ],
+                    count,
+                )
+
+        results.append(asyncio.run(wake_async())._replace(note='1 call per packet'))
+    return results
+
+
+_IMPORT_RUNS = 20
+
+#: The modules imported by the import benchmark per mode.
+_IMPORTS = {'library': 'wakeonlan', 'cli': 'wakeonlan.cli'}
+
+
+def import_time(module: str) -> float:
+    """
+    Measure the time it takes to import a module in a new interpreter.
+
+    Args:
+        module: The name of the module to import.
+
+    Returns:
+        The number of seconds the import took, including the modules it
+        imports.
+
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    # Every line looks like "import time: self [us] | cumulative | name".
+    for line in process.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1e6
+    raise ValueError(f'No import time reported for {module}')
+
+
+def bench_import(count: int) -> list[Result]:
+    """
+    Measure the time it takes to import the library and the CLI.
+
+    Every import starts a new interpreter, so at most 20 imports are measured
+    per mode.
+
+    Args:
+        count: The number of times to import each module.
+
+    Returns:
+        The results per mode.
+
+    """
+    runs = min(count, _IMPORT_RUNS)
+    results = []
+    for mode, module in _IMPORTS.items():
+        # Warm up, which also writes the bytecode cache.
+        import_time(module)
+        latencies = [import_time(module) for run in range(runs)]
+        p50, p99 = _percentiles(latencies)
+        results.append(
+            Result(mode, sum(latencies), runs, module, p50, p99, unit='imports')
+        )
+    return results
+
+
+BENCHMARKS: dict[str, Callable[[int], list[Result]]] = {
+    'build': bench_build,
+    'import': bench_import,
+    'packet': bench_packet,
+    'send': bench_send,
+    'socket': bench_socket,
+    'wake': bench_wake,
+}
+
+
+def format_result(name: str, result: Result) -> str:
+    """
+    Format a benchmark result as a single line.
+
+    Args:
+        name: The name of the benchmark.
+        result: The result to format.
+
+    Returns:
+        The formatted line.
+
+    """
+    rate = result.total / result.elapsed
+    line = f'{name:>8} {result.mode:<8} {rate:>14,.0f} {result.unit + "/s":<9}'
+    if result.p50 is None or result.p99 is None:
+        line += ' ' * 38
+    else:
+        p50 = result.p50 * 1e6
+        p99 = result.p99 * 1e6
+        line += f'  p50 {p50:>9,.1f} µs  p99 {p99:>9,.1f} µs'
+    if result.peak is None:
+        line += ' ' * 18
+    else:
+        line += f'  {result.peak / 1024:>9,.0f} KiB peak'
+    if result.note:
+        line += f'  {result.note}'
+    return line.rstrip()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Run the benchmarks and print the results.
+
+    """
+    parser = argparse.ArgumentParser(description='Benchmark wakeonlan.')
+    parser.add_argument(
+        'benchmarks',
+        nargs='*',
+        metavar='benchmark',
+        help=f'The benchmarks to run. Choose from {", ".join(BENCHMARKS)}. By default all benchmarks are run.',
+    )
+    parser.add_argument(
+        '-c',
+        '--count',
+        type=int,
+        default=5000,
+        help='The number of mac addresses to use.',
+    )
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+    for name in args.benchmarks or BENCHMARKS:
+        for result in BENCHMARKS[name](args.count):
+            print(format_result(name, result))
+
+
+if __name__ == '__main__':  # pragma: nocover
+    main()
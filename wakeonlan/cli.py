@@ -0,0 +1,467 @@
+"""
+The ``wakeonlan`` command line interface.
+
+This is kept out of :mod:`wakeonlan`, so using the library doesn’t require
+importing :mod:`argparse`, and modules only needed for some options are
+imported when those options are used.
+
+"""
+
+import argparse
+import contextlib
+import itertools
+import socket
+import sys
+from collections.abc import Iterable, Iterator
+from typing import Any, TextIO
+
+import wakeonlan
+from wakeonlan import (
+    BROADCAST_IP,
+    DEFAULT_PORT,
+    IPV6_ALL_NODES,
+    Destination,
+    Pacer,
+    WakeError,
+    WakeResult,
+    _check_repeat,
+    _create_magic_packet,
+    read_macs,
+    read_targets,
+)
+
+
+def _open_input(path: str) -> contextlib.AbstractContextManager[TextIO]:
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin)
+    return open(path)
+
+
+def _print_json(value: object) -> None:
+    # json is only imported when --json is used.
+    import json
+
+    print(json.dumps(value))
+
+
+def _stream_summary(sent: int, result: WakeResult) -> dict[str, Any]:
+    # Streaming doesn’t keep the mac addresses which were sent, so only the
+    # counts and the failures of the chunk that failed are reported, using
+    # the keys of WakeResult.summary().
+    summary = result.summary()
+    return {
+        'sent': sent + summary['sent'],
+        'failed': summary['failed'],
+        'duplicates': 0,
+        'suppressed': 0,
+        'failures': summary['failures'],
+    }
+
+
+def _report(args: argparse.Namespace, result: WakeResult) -> None:
+    # Report the result of waking multiple destinations, which doesn’t raise
+    # if some of them fail.
+    if args.json:
+        _print_json(result.summary())
+    else:
+        for destination, error in result.destination_errors.items():
+            print(
+                f'{destination.host} port {destination.port}: {error}',
+                file=sys.stderr,
+            )
+    if not result.ok:
+        raise SystemExit(1)
+
+
+def _is_mac(value: str) -> bool:
+    try:
+        _create_magic_packet(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_ip_address(value: str) -> bool:
+    import ipaddress
+
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _lookup_names(
+    parser: argparse.ArgumentParser, names: list[str], path: str
+) -> list[str]:
+    if all(map(_is_mac, names)):
+        return names
+
+    from wakeonlan.inventory import Inventory, load_inventory
+    from wakeonlan.neighbors import lookup_macs
+
+    addresses = [name for name in names if _is_ip_address(name)]
+    neighbors = lookup_macs(addresses) if addresses else {}
+    inventory: Inventory | None = None
+    macs = []
+    for name in names:
+        if _is_mac(name):
+            macs.append(name)
+        elif name in neighbors:
+            macs.append(neighbors[name])
+        elif name in addresses:
+            parser.error(f'{name} is not found in the neighbor table')
+        else:
+            if inventory is None:
+                try:
+                    inventory = load_inventory(path)
+                except (OSError, ValueError) as error:
+                    parser.error(
+                        f'{name} is not a mac address and the inventory can’t be read: {error}'
+                    )
+            found = inventory.lookup(name)
+            if not found:
+                parser.error(f'{name} is not a mac address and not found in {path}')
+            macs.extend(found)
+    if inventory is not None:
+        inventory.close()
+    return macs
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Create the argument parser of the ``wakeonlan`` command.
+
+    Returns:
+        The argument parser.
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Wake one or more computers using the wake on lan protocol.',
+        epilog='Run "wakeonlan serve" to start a daemon which keeps sockets and caches warm. See "wakeonlan serve --help". Run "wakeonlan schedule" to wake computers at scheduled times. See "wakeonlan schedule --help".',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        'macs',
+        metavar='mac address',
+        nargs='*',
+        help='The mac addresses or "mac address/secureon password" tuples of the computers you are trying to wake. Ip addresses are looked up in the neighbor table. Host names, aliases and @tags are looked up in the inventory.',
+    )
+    parser.add_argument(
+        '-f',
+        '--from-file',
+        metavar='PATH',
+        help='Read mac addresses from a file, or from stdin if this is "-". Mac addresses may be separated by newlines, commas or whitespace. Lines may contain comments starting with "#".',
+    )
+    parser.add_argument(
+        '-o',
+        '--host',
+        help=f'The host name to send the magic packet to. Defaults to {BROADCAST_IP}, or to the IPv6 multicast group {IPV6_ALL_NODES} when using --ipv6, which then requires --interface.',
+    )
+    parser.add_argument(
+        '-p',
+        '--port',
+        type=int,
+        default=DEFAULT_PORT,
+        help='The port of the host to send the magic packet to.',
+    )
+    parser.add_argument(
+        '-n',
+        '--interface',
+        help='The ip address of the network adapter to route the magic packet through. For IPv6 multicast this may also be the name or index of the network interface.',
+    )
+    parser.add_argument(
+        '--hops',
+        type=int,
+        metavar='N',
+        help='The hop limit of IPv6 multicast packets.',
+    )
+    parser.add_argument(
+        '-a',
+        '--all-interfaces',
+        action='store_true',
+        help='Send the magic packets to the broadcast address of every local IPv4 network interface.',
+    )
+    parser.add_argument(
+        '-e',
+        '--ethernet',
+        metavar='INTERFACE',
+        help='Send the magic packets in raw Ethernet frames on this network interface instead of over UDP. This requires root privileges.',
+    )
+    parser.add_argument(
+        '-4',
+        '--ipv4',
+        action='store_true',
+        help='To indicate ipv4 should be used.',
+    )
+    parser.add_argument(
+        '-6',
+        '--ipv6',
+        action='store_true',
+        help='To indicate ipv6 should be used.',
+    )
+    parser.add_argument(
+        '--resolve-ttl',
+        type=float,
+        metavar='SECONDS',
+        help='Cache host name resolution results for this many seconds.',
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        metavar='PPS',
+        help='The maximum number of magic packets to send per second.',
+    )
+    parser.add_argument(
+        '--burst',
+        type=int,
+        default=1,
+        help='The maximum number of magic packets to send at once when using --rate.',
+    )
+    parser.add_argument(
+        '--wave-size',
+        type=int,
+        metavar='N',
+        help='Send the magic packets in waves of this many packets.',
+    )
+    parser.add_argument(
+        '--wave-interval',
+        type=float,
+        default=0.0,
+        metavar='SECONDS',
+        help='The number of seconds between the start of two waves.',
+    )
+    parser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        default=1,
+        help='The number of times to send each magic packet.',
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=1.0,
+        metavar='SECONDS',
+        help='The number of seconds to wait between repetitions.',
+    )
+    parser.add_argument(
+        '--jitter',
+        type=float,
+        default=0.0,
+        metavar='SECONDS',
+        help='The maximum number of seconds to randomly add to each interval.',
+    )
+    parser.add_argument(
+        '-t',
+        '--targets',
+        metavar='PATH',
+        help='Read mac addresses and their destinations from a file, or from stdin if this is "-". Each line contains a mac address, a host name, ip address or IPv4 subnet, and optionally a port and the ip address of a network adapter.',
+    )
+    parser.add_argument(
+        '-j',
+        '--max-workers',
+        type=int,
+        metavar='N',
+        help='Resolve and send to the destinations given using --targets in parallel using this many threads.',
+    )
+    parser.add_argument(
+        '-i',
+        '--inventory',
+        metavar='PATH',
+        default='/etc/ethers',
+        help='Look up host names, aliases and @tags given instead of mac addresses in this /etc/ethers style or CSV file.',
+    )
+    parser.add_argument(
+        '--server',
+        nargs='?',
+        const='',
+        metavar='PATH',
+        help='Ask a daemon started using "wakeonlan serve" listening on this socket to send the magic packets. If PATH is omitted, the default socket is used.',
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print a JSON summary of the magic packets that were sent and failed.',
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Run wake on lan as a CLI application.
+
+    Args:
+        argv: The command line arguments. Defaults to ``sys.argv[1:]``.
+
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ['serve']:
+        from wakeonlan.server import main as serve
+
+        serve(argv[1:])
+        return
+    if argv[:1] == ['schedule']:
+        from wakeonlan.schedule import main as schedule
+
+        schedule(argv[1:])
+        return
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.macs and args.from_file is None and args.targets is None:
+        parser.error('at least one mac address, --from-file or --targets is required')
+    if args.from_file is not None and args.targets is not None:
+        parser.error('--from-file and --targets can’t be combined')
+    if args.max_workers is not None and args.targets is None:
+        parser.error('--max-workers can only be used with --targets')
+    if args.resolve_ttl is not None:
+        wakeonlan.resolve_cache.configure(ttl=args.resolve_ttl)
+    args.macs = _lookup_names(parser, args.macs, args.inventory)
+    if args.ipv4 is args.ipv6:
+        family = socket.AF_UNSPEC
+    elif args.ipv4:
+        family = socket.AF_INET
+    else:
+        family = socket.AF_INET6
+    if args.host is None:
+        host = IPV6_ALL_NODES if family == socket.AF_INET6 else BROADCAST_IP
+        # A link-local multicast group is only reachable on a given link.
+        if family == socket.AF_INET6 and args.interface is None:
+            parser.error('--ipv6 without --host requires --interface')
+    else:
+        host = args.host
+    destination: dict[str, Any] = {
+        'host': host,
+        'port': args.port,
+        'interface': args.interface,
+        'family': family,
+    }
+    if args.hops is not None:
+        destination['hops'] = args.hops
+    options: dict[str, Any] = {}
+    if args.rate is not None or args.wave_size is not None:
+        try:
+            options['pacer'] = Pacer(
+                rate=args.rate,
+                burst=args.burst,
+                wave_size=args.wave_size,
+                wave_interval=args.wave_interval,
+            )
+        except ValueError as error:
+            parser.error(str(error))
+    if args.repeat != 1:
+        try:
+            _check_repeat(args.repeat, args.interval, args.jitter)
+        except ValueError as error:
+            parser.error(str(error))
+        options.update(repeat=args.repeat, interval=args.interval, jitter=args.jitter)
+    if args.ethernet is not None:
+        if (
+            args.server is not None
+            or args.from_file is not None
+            or args.targets is not None
+        ):
+            parser.error(
+                '--ethernet can’t be combined with --from-file, --targets or --server'
+            )
+        from wakeonlan.ethernet import EthernetTransport
+
+        options['transport'] = EthernetTransport(args.ethernet)
+    if args.all_interfaces:
+        if (
+            args.host is not None
+            or args.interface is not None
+            or args.ipv6
+            or args.ethernet is not None
+        ):
+            parser.error(
+                '--all-interfaces can’t be combined with --host, --interface, --ipv6 or --ethernet'
+            )
+        if (
+            args.server is not None
+            or args.from_file is not None
+            or args.targets is not None
+        ):
+            parser.error(
+                '--all-interfaces can’t be combined with --from-file, --targets or --server'
+            )
+        from wakeonlan.interfaces import wake_all_interfaces
+
+        try:
+            result = wake_all_interfaces(*args.macs, port=args.port, **options)
+        except OSError as error:
+            parser.error(str(error))
+        _report(args, result)
+        return
+    if args.server is not None:
+        if args.from_file is not None or args.targets is not None:
+            parser.error('--server can’t be combined with --from-file or --targets')
+        if options:
+            parser.error(
+                '--server can’t be combined with --rate, --wave-size or --repeat'
+            )
+        from wakeonlan.server import WakeClient
+
+        with WakeClient(args.server or None) as client:
+            response = client.wake(*args.macs, **destination)
+        if args.json:
+            _print_json(response)
+        else:
+            for failure in response['failures']:
+                print(f'{failure["mac"]}: {failure["error"]}', file=sys.stderr)
+        if response['failed']:
+            raise SystemExit(1)
+        return
+    if args.targets is not None:
+        default = Destination(**destination)
+        with _open_input(args.targets) as file:
+            result = wakeonlan.wake_many(
+                itertools.chain(
+                    ((mac, default) for mac in args.macs), read_targets(file)
+                ),
+                max_workers=args.max_workers,
+                **options,
+            )
+        _report(args, result)
+        return
+    if args.from_file is not None:
+        read = 0
+
+        def count(macs: Iterable[str]) -> Iterator[str]:
+            nonlocal read
+            for mac in macs:
+                read += 1
+                yield mac
+
+        with _open_input(args.from_file) as file:
+            try:
+                sent = wakeonlan.wake_stream(
+                    count(itertools.chain(args.macs, read_macs(file))),
+                    **destination,
+                    **options,
+                )
+            except WakeError as error:
+                if not args.json:
+                    raise
+                # The chunks read before the one that failed were sent.
+                sent = read - len(error.result)
+                _print_json(_stream_summary(sent, error.result))
+                raise SystemExit(1)
+        if args.json:
+            _print_json(_stream_summary(sent, WakeResult()))
+        return
+    try:
+        result = wakeonlan.wake(*args.macs, **destination, **options)
+    except WakeError as error:
+        if not args.json:
+            raise
+        _print_json(error.result.summary())
+        raise SystemExit(1)
+    if args.json:
+        _print_json(result.summary())
+
+
+if __name__ == '__main__':  # pragma: nocover
+    main()
@@ -0,0 +1,172 @@
+"""
+Send magic packets in raw Ethernet frames.
+
+Magic packets sent over UDP need an ip address, a route and a host name
+lookup. A magic packet may also be sent directly in an Ethernet frame of
+EtherType 0x0842, which reaches computers on the same Ethernet segment even
+if no ip address is configured at all. This is what ``etherwake`` does.
+
+Raw sockets are only available on Linux, and require root privileges or the
+``CAP_NET_RAW`` capability.
+
+"""
+
+import array
+import socket
+import struct
+import time
+from collections.abc import Iterable
+
+from wakeonlan import (
+    Destination,
+    MagicPackets,
+    Transport,
+    WakeEvent,
+    hooks,
+)
+
+
+#: The EtherType of wake on lan frames.
+ETH_P_WOL = 0x0842
+
+#: The Ethernet broadcast address.
+BROADCAST_MAC = b'\xff' * 6
+
+_ETHERTYPE = struct.pack('!H', ETH_P_WOL)
+
+
+def create_ethernet_socket(interface: str) -> socket.socket:
+    """
+    Create a raw socket that sends wake on lan frames on a network interface.
+
+    Args:
+        interface: The name of the network interface, for example ``eth0``.
+
+    Returns:
+        A socket bound to the interface. Frames passed to
+        :meth:`socket.socket.send` or :func:`wakeonlan.send_packets` must
+        include the Ethernet header. See :func:`build_frames`.
+
+    Raises:
+        PermissionError: If the process isn’t allowed to open raw sockets.
+        OSError: If the interface doesn’t exist.
+
+    """
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_WOL))
+    try:
+        sock.bind((interface, ETH_P_WOL))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def build_frames(
+    packets: Iterable[bytes | memoryview], source: bytes, *, broadcast: bool = True
+) -> MagicPackets:
+    """
+    Wrap magic packets in Ethernet frames.
+
+    All frames are written into a single buffer, so they can be sent in
+    batches using :func:`wakeonlan.send_packets` without being copied.
+
+    Args:
+        packets: The magic packets to wrap, for example created by
+            :func:`wakeonlan.create_magic_packets`.
+        source: The mac address of the sending network interface as 6 bytes.
+
+    Keyword Args:
+        broadcast: Whether to address the frames to the Ethernet broadcast
+            address. Otherwise each frame is addressed to the mac address in
+            its magic packet.
+
+    Returns:
+        The frames in the same order as the magic packets.
+
+    """
+    if len(source) != 6:
+        raise ValueError('Incorrect MAC address format')
+    header = source + _ETHERTYPE
+    buffer = bytearray()
+    offsets = array.array('Q', [0])
+    for packet in packets:
+        buffer += BROADCAST_MAC if broadcast else packet[6:12]
+        buffer += header
+        buffer += packet
+        offsets.append(len(buffer))
+    return MagicPackets(buffer, offsets)
+
+
+class EthernetTransport(Transport):
+    """
+    Send magic packets in raw Ethernet frames of EtherType 0x0842.
+
+    The frames are sent on the given network interface. The host, port and
+    family of the destination are ignored.
+
+    Args:
+        interface: The name of the network interface, for example ``eth0``.
+
+    Keyword Args:
+        broadcast: See :func:`build_frames`.
+        source: The mac address to send the frames from as 6 bytes. Defaults
+            to the mac address of the network interface.
+
+    """
+
+    def __init__(
+        self, interface: str, *, broadcast: bool = True, source: bytes | None = None
+    ) -> None:
+        """
+        Create a transport for the network interface.
+
+        """
+        self.interface = interface
+        self.broadcast = broadcast
+        self.source = source
+
+    def open(self, destination: Destination) -> socket.socket:
+        """
+        Open a raw socket on the network interface.
+
+        Args:
+            destination: The destination, used for reporting only.
+
+        Returns:
+            The socket, see :func:`create_ethernet_socket`.
+
+        """
+        active = hooks.active
+        if active:
+            start = time.perf_counter()
+        try:
+            sock = create_ethernet_socket(self.interface)
+        except OSError as error:
+            if active:
+                duration = time.perf_counter() - start
+                hooks.emit(WakeEvent('error', destination, duration, error=error))
+            raise
+        if active:
+            hooks.emit(
+                WakeEvent('socket_open', destination, time.perf_counter() - start)
+            )
+        return sock
+
+    def frame(self, sock: socket.socket, packets: MagicPackets) -> MagicPackets:
+        """
+        Wrap the magic packets in Ethernet frames.
+
+        Args:
+            sock: The socket the frames are sent over.
+            packets: The magic packets to send.
+
+        Returns:
+            The frames, see :func:`build_frames`.
+
+        """
+        source = self.source
+        if source is None:
+            # The address of a packet socket is (interface, protocol, packet
+            # type, hardware type, hardware address).
+            source = sock.getsockname()[4]
+        return build_frames(packets, source, broadcast=self.broadcast)
@@ -0,0 +1,295 @@
+"""
+Send magic packets on every local network interface.
+
+A magic packet sent to ``255.255.255.255`` leaves through a single route. On a
+computer with multiple network interfaces, computers on the other networks
+aren’t woken. Instead, the magic packets can be sent to the broadcast address
+of every IPv4 network interface, using one socket bound to each interface.
+
+The interfaces are enumerated using rtnetlink, which is only available on
+Linux.
+
+"""
+
+import os
+import socket
+import struct
+import threading
+import time
+from collections.abc import Iterator
+from typing import NamedTuple
+
+from wakeonlan import (
+    DEFAULT_PORT,
+    Destination,
+    Pacer,
+    RecentWakes,
+    WakeResult,
+    wake_many,
+)
+
+
+# From linux/netlink.h and linux/rtnetlink.h.
+_NLMSG_ERROR = 2
+_NLMSG_DONE = 3
+_NLM_F_REQUEST = 0x1
+_NLM_F_DUMP = 0x300
+_RTM_NEWADDR = 20
+_RTM_GETADDR = 22
+_RT_SCOPE_HOST = 254
+# From linux/if_addr.h.
+_IFA_ADDRESS = 1
+_IFA_LOCAL = 2
+_IFA_LABEL = 3
+_IFA_BROADCAST = 4
+
+# length, type, flags, sequence number, port id
+_NLMSGHDR = struct.Struct('=IHHII')
+# family, prefix length, flags, scope, interface index
+_IFADDRMSG = struct.Struct('=BBBBI')
+# length, type
+_RTATTR = struct.Struct('=HH')
+
+
+class InterfaceAddress(NamedTuple):
+    """
+    An IPv4 address of a local network interface.
+
+    """
+
+    #: The name of the network interface.
+    name: str
+    #: The ip address of the network interface.
+    address: str
+    #: The broadcast address of the network.
+    broadcast: str
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _messages(data: bytes) -> Iterator[tuple[int, memoryview]]:
+    view = memoryview(data)
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(view):
+        length, kind, flags, sequence, port_id = _NLMSGHDR.unpack_from(view, offset)
+        if length < _NLMSGHDR.size:
+            raise OSError('Malformed netlink message')
+        yield kind, view[offset + _NLMSGHDR.size : offset + length]
+        offset += _align(length)
+
+
+def _parse_address(payload: memoryview) -> InterfaceAddress | None:
+    family, prefixlen, flags, scope, index = _IFADDRMSG.unpack_from(payload)
+    if family != socket.AF_INET or scope == _RT_SCOPE_HOST:
+        return None
+    attributes = {}
+    offset = _IFADDRMSG.size
+    while offset + _RTATTR.size <= len(payload):
+        length, kind = _RTATTR.unpack_from(payload, offset)
+        if length < _RTATTR.size:
+            break
+        attributes[kind] = bytes(payload[offset + _RTATTR.size : offset + length])
+        offset += _align(length)
+    # For point to point links the address is the peer, and there is no
+    # broadcast address.
+    address = attributes.get(_IFA_LOCAL, attributes.get(_IFA_ADDRESS))
+    broadcast = attributes.get(_IFA_BROADCAST)
+    if address is None or broadcast is None:
+        return None
+    label = attributes.get(_IFA_LABEL)
+    if label is None:
+        name = socket.if_indextoname(index)
+    else:
+        name = label.rstrip(b'\0').decode()
+    return InterfaceAddress(
+        name, socket.inet_ntoa(address), socket.inet_ntoa(broadcast)
+    )
+
+
+def _dump_addresses(sock: socket.socket) -> list[InterfaceAddress]:
+    request = _NLMSGHDR.pack(
+        _NLMSGHDR.size + _IFADDRMSG.size,
+        _RTM_GETADDR,
+        _NLM_F_REQUEST | _NLM_F_DUMP,
+        1,
+        0,
+    ) + _IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)
+    sock.send(request)
+    interfaces: list[InterfaceAddress] = []
+    while True:
+        for kind, payload in _messages(sock.recv(65536)):
+            if kind == _NLMSG_DONE:
+                return interfaces
+            if kind == _NLMSG_ERROR:
+                (error,) = struct.unpack_from('=i', payload)
+                if error:
+                    raise OSError(-error, os.strerror(-error))
+            elif kind == _RTM_NEWADDR:
+                interface = _parse_address(payload)
+                if interface is not None:
+                    interfaces.append(interface)
+
+
+def read_interfaces() -> list[InterfaceAddress]:
+    """
+    Read the IPv4 addresses of the local network interfaces.
+
+    Loopback addresses and addresses without a broadcast address, for example
+    those of point to point links, are left out.
+
+    Returns:
+        The addresses in the order reported by the kernel.
+
+    Raises:
+        OSError: If the addresses can’t be read, for example because the
+            platform isn’t Linux.
+
+    """
+    if not hasattr(socket, 'AF_NETLINK'):  # pragma: nocover
+        raise OSError('Enumerating network interfaces requires Linux')
+    with socket.socket(
+        socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE
+    ) as sock:
+        sock.bind((0, 0))
+        return _dump_addresses(sock)
+
+
+class InterfaceCache:
+    """
+    A cache for :func:`read_interfaces` results.
+
+    Network interfaces rarely change, so they are enumerated at most once per
+    ``ttl`` seconds.
+
+    Args:
+        ttl: The number of seconds the interfaces are cached. If this is
+            ``0``, caching is disabled.
+
+    """
+
+    def __init__(self, *, ttl: float = 30.0) -> None:
+        """
+        Create an empty cache.
+
+        """
+        self._lock = threading.Lock()
+        self._entry: tuple[list[InterfaceAddress], float] | None = None
+        self.configure(ttl=ttl)
+
+    def configure(self, *, ttl: float) -> None:
+        """
+        Change the cache settings.
+
+        Args:
+            ttl: The number of seconds the interfaces are cached.
+
+        """
+        if ttl < 0:
+            raise ValueError('ttl must not be negative')
+        self.ttl = ttl
+        self.invalidate()
+
+    def get(self) -> list[InterfaceAddress]:
+        """
+        Get the IPv4 addresses of the local network interfaces.
+
+        Returns:
+            The result of :func:`read_interfaces`, possibly from the cache.
+
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._entry is not None and self._entry[1] > now:
+                return list(self._entry[0])
+        interfaces = read_interfaces()
+        if self.ttl:
+            with self._lock:
+                self._entry = (interfaces, now + self.ttl)
+        return list(interfaces)
+
+    def invalidate(self) -> None:
+        """
+        Remove the cached interfaces.
+
+        """
+        with self._lock:
+            self._entry = None
+
+
+#: The interface cache used by :func:`broadcast_destinations`.
+interface_cache = InterfaceCache()
+
+
+def broadcast_destinations(port: int = DEFAULT_PORT) -> list[Destination]:
+    """
+    Get a destination for the broadcast address of every network interface.
+
+    Args:
+        port: The port to send magic packets to.
+
+    Returns:
+        The destinations. Each is bound to the address of its interface, so
+        the magic packets leave through that interface.
+
+    """
+    return [
+        Destination(interface.broadcast, port, interface.address, socket.AF_INET)
+        for interface in interface_cache.get()
+    ]
+
+
+def wake_all_interfaces(
+    *macs: str,
+    port: int = DEFAULT_PORT,
+    batch: bool = False,
+    pacer: Pacer | None = None,
+    repeat: int = 1,
+    interval: float = 1.0,
+    jitter: float = 0.0,
+    deduplicate: bool = True,
+    recent: RecentWakes | None = None,
+) -> WakeResult:
+    """
+    Wake up computers on the networks of all local network interfaces.
+
+    The magic packets are sent to the broadcast address of every IPv4 network
+    interface at the same time, using a thread per interface. If sending on
+    an interface fails, the others are still woken.
+
+    Args:
+        macs: One or more mac addresses or "mac address/secureon password"
+            tuples of machines to wake.
+
+    Keyword Args:
+        port: the port to send the magic packets to.
+        batch: see :func:`wakeonlan.wake_many`.
+        pacer: see :func:`wakeonlan.wake_many`.
+        repeat: see :func:`wakeonlan.wake_many`.
+        interval: see :func:`wakeonlan.wake_many`.
+        jitter: see :func:`wakeonlan.wake_many`.
+        deduplicate: see :func:`wakeonlan.wake_many`.
+        recent: see :func:`wakeonlan.wake_many`.
+
+    Returns:
+        Which magic packets were sent, grouped by interface.
+
+    Raises:
+        OSError: If no network interface has a broadcast address.
+
+    """
+    destinations = broadcast_destinations(port)
+    if not destinations:
+        raise OSError('No network interface has an IPv4 broadcast address')
+    return wake_many(
+        [(mac, destination) for destination in destinations for mac in macs],
+        batch=batch,
+        pacer=pacer,
+        repeat=repeat,
+        interval=interval,
+        jitter=jitter,
+        max_workers=len(destinations),
+        deduplicate=deduplicate,
+        recent=recent,
+    )
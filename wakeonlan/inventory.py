@@ -0,0 +1,361 @@
+"""
+Look up mac addresses by host name, alias or tag.
+
+An inventory is read from an ``/etc/ethers`` style file or a CSV file. It’s
+indexed into a compact binary format, which is cached on disk. Subsequent
+loads memory map the cached index, so looking up a name in a large inventory
+doesn’t require parsing the text again.
+
+"""
+
+import array
+import csv
+import hashlib
+import mmap
+import os
+import struct
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple
+
+from wakeonlan import _cache_dir, _write_cache, parse_mac
+
+
+# magic, source mtime in nanoseconds, source size, mac count, key count,
+# blob size. The size is a multiple of 4, so the arrays after it are aligned.
+_HEADER = struct.Struct('=8sQQIII')
+_MAGIC = b'WOLIDX1\n'
+# The number of integers per key: blob offset and postings offset. The table
+# ends with an extra entry, so the length of a key and its number of postings
+# follow from the next entry.
+_KEY_FIELDS = 2
+
+
+class InventoryEntry(NamedTuple):
+    """
+    A single computer in an inventory.
+
+    """
+
+    #: The mac address of the computer.
+    mac: str
+    #: The host name of the computer.
+    hostname: str
+    #: Alternative names of the computer.
+    aliases: tuple[str, ...] = ()
+    #: The groups the computer belongs to.
+    tags: tuple[str, ...] = ()
+
+
+def read_ethers(lines: Iterable[str]) -> Iterator[InventoryEntry]:
+    """
+    Read inventory entries from lines in the ``/etc/ethers`` format.
+
+    Each line contains a mac address and a host name, separated by
+    whitespace. Any further fields are aliases, or tags if they start with
+    ``@``. Everything after ``#`` is a comment.
+
+    Args:
+        lines: The lines to read.
+
+    Yields:
+        The entries in the order they are found.
+
+    """
+    for line in lines:
+        fields = line.split('#', 1)[0].split()
+        if not fields:
+            continue
+        if len(fields) < 2:
+            raise ValueError(f'Missing host name for {fields[0]}')
+        mac, hostname, *rest = fields
+        yield InventoryEntry(
+            mac,
+            hostname,
+            tuple(field for field in rest if not field.startswith('@')),
+            tuple(field[1:] for field in rest if field.startswith('@')),
+        )
+
+
+def _split(value: str | None) -> tuple[str, ...]:
+    if not value:
+        return ()
+    return tuple(value.replace(';', ' ').replace(',', ' ').split())
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[InventoryEntry]:
+    """
+    Read inventory entries from a CSV file with a header row.
+
+    The ``mac`` column is required. The host name is read from the
+    ``hostname`` or ``name`` column. The ``aliases`` and ``tags`` columns may
+    contain multiple values separated by whitespace, commas or semicolons.
+    Column names are case insensitive and other columns are ignored.
+
+    Args:
+        lines: The lines to read.
+
+    Yields:
+        The entries in the order they are found.
+
+    """
+    reader = csv.reader(lines)
+    header = [column.strip().lower() for column in next(reader, [])]
+    if 'mac' not in header:
+        raise ValueError('The inventory has no mac column')
+    mac_index = header.index('mac')
+    columns = {
+        name: header.index(name)
+        for name in ('hostname', 'name', 'aliases', 'tags')
+        if name in header
+    }
+    hostname_index = columns.get('hostname', columns.get('name'))
+    aliases_index = columns.get('aliases')
+    tags_index = columns.get('tags')
+    for row in reader:
+        if not row or not row[mac_index].strip():
+            continue
+        row += [''] * (len(header) - len(row))
+        yield InventoryEntry(
+            row[mac_index].strip(),
+            '' if hostname_index is None else row[hostname_index].strip(),
+            () if aliases_index is None else _split(row[aliases_index]),
+            () if tags_index is None else _split(row[tags_index]),
+        )
+
+
+def build_index(
+    entries: Iterable[InventoryEntry], *, mtime_ns: int = 0, size: int = 0
+) -> bytearray:
+    """
+    Build the binary index of an inventory.
+
+    The index consists of a header, the packed mac addresses, a table of keys
+    sorted by their UTF-8 encoding, the mac address numbers per key, and the
+    encoded keys. Host names and aliases are stored in lower case, tags in
+    lower case prefixed with ``@``.
+
+    Args:
+        entries: The entries to index.
+
+    Keyword Args:
+        mtime_ns: The modification time of the source file, used to check
+            whether a cached index is stale.
+        size: The size of the source file.
+
+    Returns:
+        The index, which can be passed to :class:`Inventory`.
+
+    Raises:
+        ValueError: If a mac address is invalid.
+
+    """
+    macs: dict[bytes, int] = {}
+    postings: dict[bytes, dict[int, None]] = {}
+    for entry in entries:
+        mac = parse_mac(entry.mac)
+        index = macs.setdefault(mac, len(macs))
+        names = [entry.hostname, *entry.aliases]
+        names += ['@' + tag for tag in entry.tags]
+        for name in names:
+            if name:
+                postings.setdefault(name.lower().encode(), {})[index] = None
+
+    keys = array.array('I')
+    values = array.array('I')
+    blob = bytearray()
+    for key in sorted(postings):
+        keys.extend((len(blob), len(values)))
+        values.extend(postings[key])
+        blob += key
+    keys.extend((len(blob), len(values)))
+
+    mac_bytes = b''.join(macs)
+    buffer = bytearray(
+        _HEADER.pack(_MAGIC, mtime_ns, size, len(macs), len(postings), len(blob))
+    )
+    buffer += mac_bytes
+    buffer += bytes(-len(mac_bytes) % 4)
+    buffer += keys.tobytes()
+    buffer += values.tobytes()
+    buffer += blob
+    return buffer
+
+
+class Inventory:
+    """
+    An index of mac addresses by host name, alias and tag.
+
+    Lookups are a binary search over the sorted keys, directly on the
+    underlying buffer. Nothing is parsed or copied up front, so opening a
+    memory mapped index is cheap regardless of its size.
+
+    Args:
+        buffer: A buffer created by :func:`build_index`.
+
+    """
+
+    def __init__(self, buffer: bytes | bytearray | mmap.mmap) -> None:
+        """
+        Open an index without copying the buffer.
+
+        """
+        if len(buffer) < _HEADER.size:
+            raise ValueError('Invalid inventory index')
+        magic, mtime_ns, size, mac_count, key_count, blob_size = _HEADER.unpack_from(
+            buffer
+        )
+        if magic != _MAGIC:
+            raise ValueError('Invalid inventory index')
+        self._buffer = buffer
+        #: The modification time and size of the file the index was built from.
+        self.source = (mtime_ns, size)
+        self._view = view = memoryview(buffer)
+        offset = _HEADER.size
+        self._macs = view[offset : offset + mac_count * 6]
+        offset += mac_count * 6 + -(mac_count * 6) % 4
+        self._key_count = key_count
+        key_size = (key_count + 1) * _KEY_FIELDS * 4
+        self._keys = view[offset : offset + key_size].cast('I')
+        offset += key_size
+        posting_count = self._keys[-1]
+        self._postings = view[offset : offset + posting_count * 4].cast('I')
+        self._blob_offset = offset + posting_count * 4
+        if self._blob_offset + blob_size != len(buffer):
+            raise ValueError('Invalid inventory index')
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[InventoryEntry]) -> 'Inventory':
+        """
+        Create an in memory inventory.
+
+        Args:
+            entries: The entries to index.
+
+        Returns:
+            The inventory.
+
+        """
+        return cls(build_index(entries))
+
+    def __len__(self) -> int:
+        """
+        Get the number of mac addresses.
+
+        """
+        return len(self._macs) // 6
+
+    def __contains__(self, name: object) -> bool:
+        """
+        Check whether a host name, alias or ``@tag`` is in the index.
+
+        """
+        return isinstance(name, str) and self._find(name) is not None
+
+    def _key(self, index: int) -> bytes | bytearray:
+        start = self._blob_offset + self._keys[index * _KEY_FIELDS]
+        end = self._blob_offset + self._keys[(index + 1) * _KEY_FIELDS]
+        return self._buffer[start:end]
+
+    def _find(self, name: str) -> int | None:
+        key = name.lower().encode()
+        low = 0
+        high = self._key_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._key_count and self._key(low) == key:
+            return low
+        return None
+
+    def lookup(self, name: str) -> list[str]:
+        """
+        Look up the mac addresses for a host name, alias or tag.
+
+        Args:
+            name: A host name or alias, or a tag prefixed with ``@``. Names
+                are case insensitive.
+
+        Returns:
+            The colon separated mac addresses, in the order they appear in
+            the inventory. The list is empty if the name is unknown.
+
+        """
+        index = self._find(name)
+        if index is None:
+            return []
+        start = index * _KEY_FIELDS + 1
+        return [
+            self._macs[number * 6 : number * 6 + 6].hex(':')
+            for number in self._postings[
+                self._keys[start] : self._keys[start + _KEY_FIELDS]
+            ]
+        ]
+
+    def close(self) -> None:
+        """
+        Release the underlying buffer.
+
+        """
+        self._macs.release()
+        self._keys.release()
+        self._postings.release()
+        self._view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def load_inventory(
+    path: str, *, cache: bool = True, cache_dir: str | None = None
+) -> Inventory:
+    """
+    Load an inventory file, using the cached index if it’s up to date.
+
+    Files ending in ``.csv`` are read using :func:`read_csv`, others using
+    :func:`read_ethers`. The index is rebuilt whenever the modification time
+    or size of the file changes. Failing to write the cache isn’t an error.
+
+    Args:
+        path: The inventory file to load.
+
+    Keyword Args:
+        cache: Whether to read and write the cached index.
+        cache_dir: The directory to store cached indexes in. Defaults to
+            ``$XDG_CACHE_HOME/wakeonlan``.
+
+    Returns:
+        The inventory.
+
+    """
+    stat = os.stat(path)
+    source = (stat.st_mtime_ns, stat.st_size)
+    if cache_dir is None:
+        cache_dir = _cache_dir()
+    digest = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, digest[:32] + '.idx')
+
+    if cache:
+        try:
+            with open(cache_path, 'rb') as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            pass
+        else:
+            try:
+                inventory = Inventory(buffer)
+            except ValueError:
+                buffer.close()
+            else:
+                if inventory.source == source:
+                    return inventory
+                inventory.close()
+
+    with open(path, newline='') as file:
+        entries = read_csv(file) if path.endswith('.csv') else read_ethers(file)
+        index = build_index(entries, mtime_ns=source[0], size=source[1])
+
+    if cache:
+        _write_cache(cache_path, index)
+    return Inventory(index)
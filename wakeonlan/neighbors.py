@@ -0,0 +1,136 @@
+"""
+Look up mac addresses by ip address using the kernel neighbor table.
+
+A computer which is asleep doesn’t answer ARP requests, so its entry in the
+neighbor table expires after a while. :class:`NeighborCache` remembers every
+mac address it has seen in the table, so it can still be woken by ip address
+afterwards.
+
+"""
+
+import ipaddress
+import json
+import os
+from collections.abc import Iterable
+
+from wakeonlan import _cache_dir, _write_cache
+
+
+#: The Linux ARP table.
+ARP_TABLE = '/proc/net/arp'
+
+# The flag for complete entries, from linux/if_arp.h.
+_ATF_COM = 0x02
+
+
+def read_arp_table(lines: Iterable[str]) -> dict[str, str]:
+    """
+    Read the complete entries from the lines of ``/proc/net/arp``.
+
+    Args:
+        lines: The lines to read, including the header.
+
+    Returns:
+        A mapping of ip address to colon separated mac address.
+
+    """
+    table = {}
+    iterator = iter(lines)
+    next(iterator, None)
+    for line in iterator:
+        fields = line.split()
+        if len(fields) < 4:
+            continue
+        address, hw_type, flags, mac = fields[:4]
+        if int(flags, 16) & _ATF_COM:
+            table[address] = mac.lower()
+    return table
+
+
+class NeighborCache:
+    """
+    A persistent mapping of ip address to mac address.
+
+    Every lookup reads the kernel neighbor table once, and merges all of its
+    complete entries into the cache. If an ip address is in the neighbor
+    table, its current mac address is used. Otherwise the last mac address
+    seen for it is used.
+
+    Args:
+        path: The JSON file to store the cache in. Defaults to
+            ``$XDG_CACHE_HOME/wakeonlan/neighbors.json``.
+
+    Keyword Args:
+        table: The neighbor table to read. Defaults to :data:`ARP_TABLE`.
+
+    """
+
+    def __init__(self, path: str | None = None, *, table: str | None = None) -> None:
+        """
+        Create a cache, which is only read once an ip address is resolved.
+
+        """
+        if path is None:
+            path = os.path.join(_cache_dir(), 'neighbors.json')
+        self.path = path
+        self.table = ARP_TABLE if table is None else table
+
+    def _load(self) -> dict[str, str]:
+        try:
+            with open(self.path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return entries
+
+    def lookup(self, addresses: Iterable[str]) -> dict[str, str]:
+        """
+        Look up the mac addresses for ip addresses.
+
+        Args:
+            addresses: The ip addresses to look up.
+
+        Returns:
+            A mapping of the given ip addresses to their mac addresses. Ip
+            addresses for which no mac address is known are left out.
+
+        Raises:
+            ValueError: If an ip address is invalid.
+
+        """
+        normalized = {
+            address: str(ipaddress.ip_address(address)) for address in addresses
+        }
+        try:
+            with open(self.table) as file:
+                table = read_arp_table(file)
+        except OSError:
+            table = {}
+        entries = self._load()
+        if any(entries.get(address) != mac for address, mac in table.items()):
+            entries.update(table)
+            _write_cache(self.path, json.dumps(entries).encode())
+        return {
+            address: entries[key]
+            for address, key in normalized.items()
+            if key in entries
+        }
+
+
+def lookup_macs(addresses: Iterable[str]) -> dict[str, str]:
+    """
+    Look up mac addresses by ip address using the default cache.
+
+    This is a shortcut for ``NeighborCache().lookup(addresses)``.
+
+    Args:
+        addresses: The ip addresses to look up.
+
+    Returns:
+        A mapping of the given ip addresses to their mac addresses. Ip
+        addresses for which no mac address is known are left out.
+
+    """
+    return NeighborCache().lookup(addresses)
@@ -0,0 +1,703 @@
+"""
+Wake computers at scheduled times.
+
+A :class:`Scheduler` holds one-shot jobs, which wake computers once at a given
+time, and recurring jobs, which wake computers according to a cron
+expression. All jobs are driven from a single process, using a single
+:class:`~wakeonlan.WakeSender`.
+
+Pending jobs are kept in a heap ordered by their next run time, so adding a
+job and finding the next due job take logarithmic time, even with tens of
+thousands of jobs.
+
+The jobs and their next run times are stored in a JSON file. When jobs are
+due, their next run times are stored before any magic packet is sent, so a
+job never fires twice, not even if the process is killed while sending. Jobs
+which became due while the scheduler wasn’t running fire once when it starts
+again.
+
+"""
+
+import argparse
+import bisect
+import datetime
+import heapq
+import json
+import os
+import re
+import signal
+import socket
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, NamedTuple
+
+from wakeonlan import (
+    BROADCAST_IP,
+    DEFAULT_PORT,
+    Destination,
+    WakeResult,
+    WakeSender,
+    _create_magic_packet,
+    _write_atomic,
+)
+
+
+#: The abbreviations which may be used instead of a cron expression.
+MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+# The name, minimum and maximum of each cron field.
+_FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day of month', 1, 31),
+    ('month', 1, 12),
+    ('day of week', 0, 7),
+)
+
+# A schedule which doesn’t match within this many years never matches. Every
+# day of the year falls on every day of the week within 28 years.
+_MAX_YEARS = 28
+
+# The version of the stored scheduler state.
+_VERSION = 1
+
+# The longest the scheduler sleeps, so it notices changes to the system clock.
+_MAX_SLEEP = 60.0
+
+# The start of an ISO 8601 date, which a cron field never looks like.
+_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def _parse_field(value: str, name: str, minimum: int, maximum: int) -> list[int]:
+    values: set[int] = set()
+    for part in value.split(','):
+        part, _, step_text = part.partition('/')
+        try:
+            step = int(step_text) if step_text else 1
+            if part == '*':
+                start, stop = minimum, maximum
+            elif '-' in part:
+                start_text, stop_text = part.split('-', 1)
+                start, stop = int(start_text), int(stop_text)
+            else:
+                start = int(part)
+                stop = maximum if step_text else start
+        except ValueError:
+            raise ValueError(f'Invalid {name} field: {value}') from None
+        if step < 1 or not minimum <= start <= stop <= maximum:
+            raise ValueError(f'Invalid {name} field: {value}')
+        values.update(range(start, stop + 1, step))
+    return sorted(values)
+
+
+class CronSchedule:
+    """
+    A recurring schedule described by a cron expression.
+
+    The expression consists of 5 fields: minute, hour, day of month, month
+    and day of week. Each field may be ``*``, a number, a range such as
+    ``1-5``, a step such as ``*/15``, or a comma separated list of these.
+    Sunday is day 0 or 7. Like in cron, if both the day of month and the day
+    of week are restricted, a day matching either one matches. The
+    abbreviations in :data:`MACROS` may be used as well.
+
+    Times are in the local time zone.
+
+    Args:
+        expression: The cron expression.
+
+    Raises:
+        ValueError: If the expression is invalid.
+
+    """
+
+    __slots__ = (
+        'days',
+        'expression',
+        'hours',
+        'minutes',
+        'months',
+        'weekdays',
+        '_any_day',
+        '_any_weekday',
+    )
+
+    def __init__(self, expression: str) -> None:
+        """
+        Parse the cron expression.
+
+        """
+        self.expression = expression
+        fields = MACROS.get(expression, expression).split()
+        if len(fields) != len(_FIELDS):
+            raise ValueError(f'A cron expression needs 5 fields: {expression}')
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(field, *spec) for field, spec in zip(fields, _FIELDS)
+        )
+        self.weekdays = sorted({weekday % 7 for weekday in weekdays})
+        self._any_day = fields[2].startswith('*')
+        self._any_weekday = fields[4].startswith('*')
+
+    def __repr__(self) -> str:
+        """
+        Show the cron expression.
+
+        """
+        return f'CronSchedule({self.expression!r})'
+
+    def _day_matches(self, moment: datetime.datetime) -> bool:
+        day = moment.day in self.days
+        # Python counts weekdays from Monday, cron from Sunday.
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, timestamp: float) -> float:
+        """
+        Get the first time after a given time which matches the schedule.
+
+        The result is always later than the given time, also while the clocks
+        go back.
+
+        Args:
+            timestamp: The time to start searching from, as a Unix timestamp.
+
+        Returns:
+            The matching time as a Unix timestamp.
+
+        Raises:
+            ValueError: If the schedule never matches, for example on the
+                31st of February.
+
+        """
+        moment = datetime.datetime.fromtimestamp(timestamp).replace(
+            second=0, microsecond=0
+        ) + datetime.timedelta(minutes=1)
+        last_year = moment.year + _MAX_YEARS
+        # Skip ahead a month, day or hour at a time until every field matches.
+        while moment.year <= last_year:
+            if moment.month not in self.months:
+                moment = (
+                    moment.replace(day=1, hour=0, minute=0)
+                    + datetime.timedelta(days=32)
+                ).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            else:
+                index = bisect.bisect_left(self.minutes, moment.minute)
+                if index == len(self.minutes):
+                    moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+                    continue
+                moment = moment.replace(minute=self.minutes[index])
+                # While the clocks go back, a local time occurs twice, and the
+                # first occurrence may have passed already.
+                for fold in (0, 1):
+                    result = moment.replace(fold=fold).timestamp()
+                    if result > timestamp:
+                        return result
+                moment += datetime.timedelta(minutes=1)
+        raise ValueError(f'The schedule never matches: {self.expression}')
+
+
+class Job(NamedTuple):
+    """
+    A scheduled wake.
+
+    """
+
+    #: The unique name of the job.
+    name: str
+    #: The mac addresses to wake.
+    macs: tuple[str, ...]
+    #: Where to send the magic packets.
+    destination: Destination
+    #: When a one-shot job is due as a Unix timestamp, or ``None`` for a
+    #: recurring job.
+    at: float | None
+    #: The cron expression of a recurring job, or ``None`` for a one-shot job.
+    cron: str | None
+    #: When the job runs next as a Unix timestamp, or ``None`` if a one-shot
+    #: job has already run.
+    next_run: float | None
+
+    def _definition(self) -> tuple[object, ...]:
+        return (self.macs, self.destination, self.at, self.cron)
+
+
+def default_state_path() -> str:
+    """
+    Get the default path of the scheduler state.
+
+    Returns:
+        ``wakeonlan/schedule.json`` in ``$XDG_STATE_HOME``, or in
+        ``~/.local/state`` if that isn’t set.
+
+    """
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.local', 'state'
+    )
+    return os.path.join(state_home, 'wakeonlan', 'schedule.json')
+
+
+class Scheduler:
+    """
+    Run scheduled wakes from a single process.
+
+    Args:
+        path: The JSON file to store the jobs in. Defaults to
+            :func:`default_state_path`.
+
+    Keyword Args:
+        sender: The sender used to send the magic packets. If not specified,
+            a new sender is created, which is closed by :meth:`close`.
+        on_run: Called with every job that ran and its result, or the error
+            if it failed.
+
+    Raises:
+        ValueError: If the stored state is invalid.
+
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        *,
+        sender: WakeSender | None = None,
+        on_run: Callable[[Job, WakeResult | OSError], object] | None = None,
+    ) -> None:
+        """
+        Create a scheduler with the stored jobs.
+
+        """
+        self.path = default_state_path() if path is None else path
+        self._own_sender = sender is None
+        self.sender = WakeSender() if sender is None else sender
+        self.on_run = on_run
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._jobs: dict[str, Job] = {}
+        self._schedules: dict[str, CronSchedule] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._load()
+
+    def __enter__(self) -> 'Scheduler':
+        """
+        Enter the context, returning the scheduler itself.
+
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """
+        Close the sender, if it was created by the scheduler.
+
+        """
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        Get the number of jobs.
+
+        """
+        return len(self._jobs)
+
+    def __iter__(self) -> Iterator[Job]:
+        """
+        Iterate over a snapshot of the jobs.
+
+        """
+        with self._lock:
+            return iter(list(self._jobs.values()))
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'rb') as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return
+        except ValueError as error:
+            raise ValueError(f'Invalid scheduler state in {self.path}') from error
+        try:
+            if state['version'] != _VERSION:
+                raise ValueError('Unsupported version')
+            for entry in state['jobs']:
+                destination = Destination(**entry['destination'])
+                family = socket.AddressFamily(destination.family)
+                self._put(
+                    Job(
+                        entry['name'],
+                        tuple(entry['macs']),
+                        destination._replace(family=family),
+                        entry['at'],
+                        entry['cron'],
+                        entry['next_run'],
+                    )
+                )
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f'Invalid scheduler state in {self.path}') from error
+
+    def save(self) -> None:
+        """
+        Store the jobs and their next run times.
+
+        This is only needed after adding or removing jobs with ``save=False``.
+
+        """
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        jobs = [
+            {
+                'name': job.name,
+                'macs': job.macs,
+                'destination': job.destination._asdict(),
+                'at': job.at,
+                'cron': job.cron,
+                'next_run': job.next_run,
+            }
+            for job in self._jobs.values()
+        ]
+        data = json.dumps({'version': _VERSION, 'jobs': jobs}).encode()
+        _write_atomic(self.path, data, durable=True)
+
+    def _put(self, job: Job) -> None:
+        if job.cron is not None and job.cron not in self._schedules:
+            self._schedules[job.cron] = CronSchedule(job.cron)
+        self._jobs[job.name] = job
+        if job.next_run is not None:
+            heapq.heappush(self._heap, (job.next_run, job.name))
+        # Replaced and removed jobs are left in the heap until they are
+        # popped. Rebuild it when they pile up.
+        if len(self._heap) > 2 * len(self._jobs) + 64:
+            self._heap = [
+                (job.next_run, job.name)
+                for job in self._jobs.values()
+                if job.next_run is not None
+            ]
+            heapq.heapify(self._heap)
+
+    def add(
+        self,
+        name: str,
+        macs: Iterable[str],
+        *,
+        at: float | None = None,
+        cron: str | None = None,
+        destination: Destination | None = None,
+        save: bool = True,
+    ) -> Job:
+        """
+        Add a job, or replace the job with the same name.
+
+        If a job with the same name, mac addresses, destination and schedule
+        already exists, it’s kept as is. This means adding the same jobs after
+        every restart doesn’t run them again. A one-shot job which already ran
+        only runs again if its time changes.
+
+        Args:
+            name: The unique name of the job.
+            macs: The mac addresses to wake.
+
+        Keyword Args:
+            at: When to run a one-shot job, as a Unix timestamp. If this is
+                in the past, the job runs as soon as possible.
+            cron: The cron expression of a recurring job. See
+                :class:`CronSchedule`.
+            destination: Where to send the magic packets.
+            save: Whether to store the jobs right away. When adding many jobs,
+                pass ``False`` and call :meth:`save` afterwards.
+
+        Returns:
+            The job.
+
+        Raises:
+            ValueError: If a mac address or the schedule is invalid.
+
+        """
+        if (at is None) is (cron is None):
+            raise ValueError('Either at or cron is required')
+        macs = tuple(macs)
+        for mac in macs:
+            _create_magic_packet(mac)
+        if destination is None:
+            destination = Destination()
+        if cron is None:
+            next_run = at
+        else:
+            # Many jobs usually share few schedules.
+            schedule = self._schedules.get(cron) or CronSchedule(cron)
+            next_run = schedule.next_after(time.time())
+        job = Job(name, macs, destination, at, cron, next_run)
+        with self._lock:
+            existing = self._jobs.get(name)
+            if existing is not None:
+                if existing._definition() == job._definition():
+                    return existing
+                if at is not None and existing.at == at and existing.next_run is None:
+                    job = job._replace(next_run=None)
+            self._put(job)
+            if save:
+                self._save()
+        self._wakeup.set()
+        return job
+
+    def remove(self, name: str, *, save: bool = True) -> bool:
+        """
+        Remove a job.
+
+        Args:
+            name: The name of the job.
+
+        Keyword Args:
+            save: Whether to store the jobs right away.
+
+        Returns:
+            Whether the job existed.
+
+        """
+        with self._lock:
+            if self._jobs.pop(name, None) is None:
+                return False
+            # The job is left in the heap, and skipped when it’s popped.
+            if save:
+                self._save()
+        return True
+
+    def next_run(self) -> float | None:
+        """
+        Get the time the next job is due.
+
+        Returns:
+            The Unix timestamp, or ``None`` if no job is pending.
+
+        """
+        with self._lock:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _discard_stale(self) -> None:
+        heap = self._heap
+        while heap:
+            when, name = heap[0]
+            job = self._jobs.get(name)
+            if job is not None and job.next_run == when:
+                return
+            heapq.heappop(heap)
+
+    def run_pending(self, now: float | None = None) -> list[Job]:
+        """
+        Run all jobs which are due.
+
+        A recurring job which missed several runs, runs only once.
+
+        Args:
+            now: The current time as a Unix timestamp. Defaults to the
+                current time.
+
+        Returns:
+            The jobs that ran.
+
+        """
+        if now is None:
+            now = time.time()
+        due = []
+        # Jobs sharing a schedule run next at the same time.
+        next_runs: dict[str, float] = {}
+        with self._lock:
+            self._discard_stale()
+            while self._heap and self._heap[0][0] <= now:
+                when, name = heapq.heappop(self._heap)
+                job = self._jobs[name]
+                next_run = None
+                if job.cron is not None:
+                    next_run = next_runs.get(job.cron)
+                    if next_run is None:
+                        next_run = self._schedules[job.cron].next_after(now)
+                        next_runs[job.cron] = next_run
+                self._put(job._replace(next_run=next_run))
+                due.append(job)
+                self._discard_stale()
+            if due:
+                # Store the next run times before sending anything, so a job
+                # can’t run twice.
+                self._save()
+
+        for job in due:
+            result: WakeResult | OSError
+            try:
+                result = self.sender.wake(*job.macs, **job.destination._asdict())
+            except OSError as error:
+                result = error
+            if self.on_run is not None:
+                self.on_run(job, result)
+        return due
+
+    def run(self) -> None:
+        """
+        Run jobs when they are due until :meth:`stop` is called.
+
+        """
+        while not self._stopped:
+            self.run_pending()
+            next_run = self.next_run()
+            timeout = _MAX_SLEEP
+            if next_run is not None:
+                timeout = min(max(next_run - time.time(), 0), _MAX_SLEEP)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def stop(self) -> None:
+        """
+        Make :meth:`run` return.
+
+        """
+        self._stopped = True
+        self._wakeup.set()
+
+    def close(self) -> None:
+        """
+        Close the sender, if it was created by the scheduler.
+
+        """
+        if self._own_sender:
+            self.sender.close()
+
+
+def read_jobs(lines: Iterable[str]) -> Iterator[tuple[str, list[str], dict[str, Any]]]:
+    """
+    Parse a crontab-like jobs file.
+
+    Every line starts with a schedule, followed by one or more mac addresses.
+    The schedule is either 5 cron fields, a macro such as ``@daily``, or an
+    ISO 8601 date and time in the local time zone for a one-shot job. Empty
+    lines and lines starting with ``#`` are ignored.
+
+    Args:
+        lines: The lines of the jobs file.
+
+    Yields:
+        The name of the job, its mac addresses, and the ``at`` or ``cron``
+        keyword argument of :meth:`Scheduler.add`. The name is the line
+        with normalized whitespace.
+
+    Raises:
+        ValueError: If a line is invalid.
+
+    """
+    for line in lines:
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+        if fields[0] in MACROS:
+            schedule: dict[str, Any] = {'cron': fields[0]}
+            macs = fields[1:]
+        elif _DATE.match(fields[0]):
+            moment = datetime.datetime.fromisoformat(fields[0])
+            schedule = {'at': moment.timestamp()}
+            macs = fields[1:]
+        else:
+            schedule = {'cron': ' '.join(fields[:5])}
+            macs = fields[5:]
+        if not macs:
+            raise ValueError(f'No mac address in line: {line.strip()}')
+        yield ' '.join(fields), macs, schedule
+
+
+def _exit(signum: int, frame: object) -> None:
+    raise SystemExit(0)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Run the scheduler on the jobs in a file.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='wakeonlan schedule',
+        description='Wake computers at the times listed in a crontab-like file. Every line starts with 5 cron fields, a macro such as @daily, or a date and time such as 2026-01-31T07:30 for a one-shot wake, followed by mac addresses.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        'jobs',
+        metavar='FILE',
+        help='The file listing the jobs. Jobs which are removed from the file are removed from the state as well.',
+    )
+    parser.add_argument(
+        '--state',
+        metavar='PATH',
+        default=default_state_path(),
+        help='The file to store the next run times in, so a restart doesn’t skip or repeat wakes.',
+    )
+    parser.add_argument(
+        '-o',
+        '--host',
+        default=BROADCAST_IP,
+        help='The ip address of the host to send the magic packets to.',
+    )
+    parser.add_argument(
+        '-p',
+        '--port',
+        default=DEFAULT_PORT,
+        type=int,
+        help='The port of the host to send the magic packets to.',
+    )
+    parser.add_argument(
+        '-n',
+        '--interface',
+        help='The ip address of the network adapter to route the magic packets through.',
+    )
+    args = parser.parse_args(argv)
+    destination = Destination(args.host, args.port, args.interface)
+    try:
+        with open(args.jobs, encoding='utf-8') as file:
+            jobs = list(read_jobs(file))
+    except (OSError, ValueError) as error:
+        parser.error(f'{args.jobs}: {error}')
+
+    def report(job: Job, result: WakeResult | OSError) -> None:
+        if isinstance(result, OSError):
+            print(f'{job.name}: {result}', file=sys.stderr)
+        else:
+            for mac in result.failed:
+                print(f'{job.name}: failed to wake {mac}', file=sys.stderr)
+
+    try:
+        scheduler = Scheduler(args.state, on_run=report)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    with scheduler:
+        try:
+            names = set()
+            for name, macs, schedule in jobs:
+                scheduler.add(
+                    name, macs, destination=destination, save=False, **schedule
+                )
+                names.add(name)
+            for job in scheduler:
+                if job.name not in names:
+                    scheduler.remove(job.name, save=False)
+            scheduler.save()
+        except OSError as error:
+            parser.error(f'{args.state}: {error}')
+        except ValueError as error:
+            parser.error(str(error))
+        signal.signal(signal.SIGTERM, _exit)
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,459 @@
+"""
+A long running wake on lan daemon, and a client to send it requests.
+
+Starting the ``wakeonlan`` command for every wake means paying for the Python
+startup, parsing the arguments and creating a socket each time. The daemon
+started by ``wakeonlan serve`` keeps sockets and caches warm, and accepts
+requests on a Unix domain socket. ``wakeonlan --server`` forwards a wake to
+the daemon instead of sending it itself.
+
+Requests and responses are JSON objects, one per line. A request looks like
+``{"macs": ["01:23:45:67:89:ab"], "host": "255.255.255.255", "port": 9}``.
+The ``host``, ``port``, ``interface``, ``family`` and ``hops`` fields are
+optional. The response contains the number of magic packets sent and failed,
+the number of mac addresses that were skipped because they were given more
+than once or woken recently, and the failures, using the keys of
+:meth:`~wakeonlan.WakeResult.summary`. Invalid requests get a response with an
+``error`` field.
+
+"""
+
+import argparse
+import itertools
+import json
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from wakeonlan import (
+    BROADCAST_IP,
+    DEFAULT_PORT,
+    Destination,
+    RecentWakes,
+    WakeError,
+    WakeResult,
+    WakeSender,
+    create_magic_packet,
+    packet_cache,
+    resolve_cache,
+)
+
+
+def default_socket_path() -> str:
+    """
+    Get the default path of the daemon socket.
+
+    Returns:
+        ``wakeonlan.sock`` in ``$XDG_RUNTIME_DIR``, or in the temporary
+        directory if that isn’t set.
+
+    """
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(directory, 'wakeonlan.sock')
+
+
+class _Batch:
+    """
+    The mac addresses waiting to be sent to a destination.
+
+    """
+
+    __slots__ = ('done', 'error', 'macs', 'result')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.error: Exception | None = None
+        self.macs: list[str] = []
+        self.result = WakeResult()
+
+
+def _response(
+    fresh: Sequence[str],
+    duplicates: int,
+    suppressed: int,
+    failures: list[dict[str, Any]],
+) -> dict[str, Any]:
+    # The counts use the keys of WakeResult.summary().
+    return {
+        'sent': len(fresh) - len(failures),
+        'failed': len(failures),
+        'duplicates': duplicates,
+        'suppressed': suppressed,
+        'failures': failures,
+    }
+
+
+class Coalescer:
+    """
+    Combine concurrent wake requests and skip recently woken mac addresses.
+
+    Requests for the same destination which arrive within ``delay`` seconds
+    of each other are sent together using a single call to
+    :meth:`WakeSender.wake`. A mac address which was sent to a destination
+    less than ``window`` seconds ago isn’t sent again. See
+    :class:`RecentWakes`.
+
+    Args:
+        sender: The sender used to send the magic packets.
+
+    Keyword Args:
+        delay: The number of seconds to wait for other requests before
+            sending.
+        window: The number of seconds during which a mac address isn’t sent
+            to the same destination again.
+
+    """
+
+    def __init__(
+        self, sender: WakeSender, *, delay: float = 0.005, window: float = 1.0
+    ) -> None:
+        """
+        Create a coalescer without any pending requests.
+
+        """
+        self.sender = sender
+        self.delay = delay
+        #: The magic packets sent recently.
+        self.recent = RecentWakes(window)
+        self._lock = threading.Lock()
+        self._pending: dict[Destination, _Batch] = {}
+
+    def submit(self, macs: Sequence[str], destination: Destination) -> dict[str, Any]:
+        """
+        Wake computers, possibly together with other requests.
+
+        Args:
+            macs: The mac addresses or "mac address/secureon password" tuples
+                of machines to wake.
+            destination: Where to send the magic packets.
+
+        Returns:
+            The number of mac addresses sent and failed, the number skipped
+            because they were given more than once as ``duplicates``, or
+            because they were woken recently as ``suppressed``, and the
+            failures, like :meth:`WakeResult.summary`.
+
+        Raises:
+            ValueError: If a mac address is invalid.
+            Exception: Any other error raised while sending the batch this
+                request was sent with.
+
+        """
+        packets = [create_magic_packet(mac) for mac in macs]
+        unique = len(set(packets))
+        with self._lock:
+            claimed = self.recent.claim(packets, destination)
+            fresh = list(itertools.compress(macs, claimed))
+            duplicates = len(macs) - unique
+            suppressed = unique - len(fresh)
+            if not fresh:
+                return _response(fresh, duplicates, suppressed, [])
+            batch = self._pending.get(destination)
+            leader = batch is None
+            if batch is None:
+                batch = self._pending[destination] = _Batch()
+            batch.macs += fresh
+
+        if leader:
+            self._send(batch, destination)
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        mine = set(fresh)
+        failures = [
+            failure
+            for failure in batch.result.summary()['failures']
+            if failure['mac'] in mine
+        ]
+        return _response(fresh, duplicates, suppressed, failures)
+
+    def _send(self, batch: _Batch, destination: Destination) -> None:
+        time.sleep(self.delay)
+        with self._lock:
+            del self._pending[destination]
+        # Unless the sender says otherwise, assume nothing was sent.
+        failed: Sequence[str] = batch.macs
+        try:
+            batch.result = self.sender.wake(*batch.macs, **destination._asdict())
+            failed = batch.result.failed
+        except WakeError as error:
+            batch.result = error.result
+            failed = batch.result.failed
+        except Exception as error:
+            # Every request in the batch fails with the same error.
+            batch.error = error
+        finally:
+            # Allow failed mac addresses to be retried right away.
+            self.recent.release(map(create_magic_packet, failed), destination)
+            batch.done.set()
+
+
+def _read_destination(request: dict[str, Any]) -> Destination:
+    # Reject invalid destinations before they join a batch, so they can’t
+    # make the other requests in the batch fail.
+    host = request.get('host', BROADCAST_IP)
+    port = request.get('port', DEFAULT_PORT)
+    interface = request.get('interface')
+    hops = request.get('hops')
+    if not isinstance(host, str):
+        raise TypeError('host must be a string')
+    if not isinstance(port, int) or not 0 <= port <= 65535:
+        raise ValueError('port must be between 0 and 65535')
+    if interface is not None and not isinstance(interface, str):
+        raise TypeError('interface must be a string')
+    if hops is not None and (not isinstance(hops, int) or not 0 <= hops <= 255):
+        raise ValueError('hops must be between 0 and 255')
+    family = socket.AddressFamily(request.get('family', socket.AF_UNSPEC))
+    return Destination(host, port, interface, family, hops)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: 'WakeServer'
+
+    def handle(self) -> None:
+        """
+        Answer each request line with a response line.
+
+        """
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                macs = request['macs']
+                if not isinstance(macs, list) or not all(
+                    isinstance(mac, str) for mac in macs
+                ):
+                    raise TypeError('macs must be a list of strings')
+                response = self.server.coalescer.submit(
+                    macs, _read_destination(request)
+                )
+            except (KeyError, TypeError, ValueError) as error:
+                response = {'error': str(error)}
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+
+class WakeServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A server which wakes computers on behalf of clients.
+
+    Each connection is handled in its own thread. All connections share a
+    single :class:`WakeSender` and :class:`Coalescer`.
+
+    Args:
+        path: The path of the Unix domain socket to listen on.
+
+    Keyword Args:
+        sender: The sender to use. If not specified, a new sender is created,
+            which is closed when the server is closed.
+        delay: See :class:`Coalescer`.
+        window: See :class:`Coalescer`.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        sender: WakeSender | None = None,
+        delay: float = 0.005,
+        window: float = 1.0,
+    ) -> None:
+        """
+        Start listening on the socket.
+
+        """
+        self._own_sender = sender is None
+        self.coalescer = Coalescer(
+            WakeSender() if sender is None else sender, delay=delay, window=window
+        )
+        super().__init__(path, _RequestHandler)
+
+    def server_close(self) -> None:
+        """
+        Close the server, its own sender and remove the socket file.
+
+        """
+        super().server_close()
+        if self._own_sender:
+            self.coalescer.sender.close()
+        try:
+            os.unlink(self.server_address)  # type: ignore[arg-type]
+        except FileNotFoundError:
+            pass
+
+
+class WakeClient:
+    """
+    A client for :class:`WakeServer`.
+
+    The connection is opened on first use and reused for subsequent
+    requests. The client may be used as a context manager, which closes the
+    connection on exit.
+
+    Args:
+        path: The path of the server socket. Defaults to
+            :func:`default_socket_path`.
+
+    Keyword Args:
+        timeout: The number of seconds to wait for the server.
+
+    """
+
+    def __init__(self, path: str | None = None, *, timeout: float = 30.0) -> None:
+        """
+        Create a client, which connects on first use.
+
+        """
+        self.path = default_socket_path() if path is None else path
+        self.timeout = timeout
+        self._file: Any = None
+        self._sock: socket.socket | None = None
+
+    def __enter__(self) -> 'WakeClient':
+        """
+        Enter the context, returning the client itself.
+
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """
+        Close the connection.
+
+        """
+        self.close()
+
+    def wake(
+        self,
+        *macs: str,
+        host: str = BROADCAST_IP,
+        port: int = DEFAULT_PORT,
+        interface: str | None = None,
+        family: socket.AddressFamily = socket.AF_UNSPEC,
+        hops: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Ask the server to wake up computers having any of the given macs.
+
+        This accepts the same arguments as :func:`wakeonlan.wake`.
+
+        Returns:
+            The response of the server. See :meth:`Coalescer.submit`.
+
+        Raises:
+            ValueError: If the server rejected the request.
+
+        """
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+            self._file = sock.makefile('rb')
+        request = {
+            'macs': macs,
+            'host': host,
+            'port': port,
+            'interface': interface,
+            'family': family,
+            'hops': hops,
+        }
+        self._sock.sendall(json.dumps(request).encode() + b'\n')
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise ConnectionError('The server closed the connection')
+        response: dict[str, Any] = json.loads(line)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    def close(self) -> None:
+        """
+        Close the connection to the server.
+
+        """
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = None
+            self._file = None
+
+
+def _exit(signum: int, frame: object) -> None:
+    raise SystemExit(0)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Run the wake on lan daemon.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='wakeonlan serve',
+        description='Run a daemon which wakes computers on behalf of "wakeonlan --server".',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        '-s',
+        '--socket',
+        metavar='PATH',
+        default=default_socket_path(),
+        help='The path of the Unix domain socket to listen on.',
+    )
+    parser.add_argument(
+        '--coalesce-delay',
+        type=float,
+        default=0.005,
+        metavar='SECONDS',
+        help='The number of seconds to wait for other requests to the same destination, so they are sent together.',
+    )
+    parser.add_argument(
+        '--dedupe-window',
+        type=float,
+        default=1.0,
+        metavar='SECONDS',
+        help='Don’t send a mac address to the same destination again within this many seconds.',
+    )
+    parser.add_argument(
+        '--resolve-ttl',
+        type=float,
+        default=60.0,
+        metavar='SECONDS',
+        help='Cache host name resolution results for this many seconds.',
+    )
+    args = parser.parse_args(argv)
+    resolve_cache.configure(ttl=args.resolve_ttl)
+    packet_cache.configure(maxsize=4096)
+    # Remove the socket of a server that didn’t shut down cleanly.
+    if os.path.exists(args.socket):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(args.socket)
+            except ConnectionRefusedError:
+                os.unlink(args.socket)
+            else:
+                parser.error(f'a server is already listening on {args.socket}')
+    with WakeServer(
+        args.socket, delay=args.coalesce_delay, window=args.dedupe_window
+    ) as server:
+        # Exit through the context manager on SIGTERM, so the socket is
+        # removed.
+        signal.signal(signal.SIGTERM, _exit)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass